@@ -0,0 +1,226 @@
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+# 长时间没有请求的客户端令牌桶会被清理；客户端数上限防止伪造地址撑大内存
+IDLE_CLIENT_SECONDS = 300.0
+MAX_CLIENTS = 1024
+
+# 拒绝原因: limited 超过速率, busy 同时执行的命令数已达上限
+OUTCOMES = ('admitted', 'limited', 'busy')
+
+
+@dataclass(frozen=True)
+class LanePolicy:
+    """一条通道的准入策略
+
+    rate / burst 是每个客户端的令牌桶（每秒补充数 / 容量），max_in_flight 是全部客户端同时执行数上限，
+    client_in_flight 是单个客户端的同时执行数上限；priority 为 0 的通道可以使用保留的名额。
+    """
+    rate: float
+    burst: float
+    max_in_flight: int
+    client_in_flight: int
+    priority: int = 1
+
+
+# control: 系统/窗口/应用，input: 音量/媒体/快捷键/宏，bulk: 批量命令
+DEFAULT_LANES = {
+    'control': LanePolicy(rate=10, burst=20, max_in_flight=4, client_in_flight=2, priority=0),
+    'input': LanePolicy(rate=20, burst=30, max_in_flight=6, client_in_flight=4),
+    'bulk': LanePolicy(rate=1, burst=3, max_in_flight=2, client_in_flight=1),
+}
+
+
+def parse_lanes(spec: str) -> Dict[str, LanePolicy]:
+    """解析通道配置，格式 "input=20:30:6:4,control=10:20:4:2:0"
+    （速率:容量:同时执行数:单客户端同时执行数[:优先级]），未出现的通道保留默认值"""
+    lanes = dict(DEFAULT_LANES)
+    for part in spec.split(','):
+        if not part.strip():
+            continue
+        name, _, values = part.partition('=')
+        fields = values.split(':')
+        if len(fields) not in (4, 5):
+            raise ValueError(f'无效的准入通道配置: {part}')
+        default = lanes.get(name.strip())
+        priority = int(fields[4]) if len(fields) == 5 else (default.priority if default else 1)
+        policy = LanePolicy(float(fields[0]), float(fields[1]), int(fields[2]), int(fields[3]), priority)
+        if policy.rate <= 0 or policy.burst < 1 or policy.max_in_flight < 1 or policy.client_in_flight < 1:
+            raise ValueError(f'无效的准入通道配置: {part}')
+        lanes[name.strip()] = policy
+    return lanes
+
+
+class AdmissionRejected(Exception):
+    """准入被拒绝；result 是返回给客户端的结果（HTTP 429）"""
+
+    def __init__(self, result: dict):
+        super().__init__(result['message'])
+        self.result = result
+
+    @property
+    def retry_after(self) -> float:
+        return self.result.get('retry_after', 1.0)
+
+
+class _Bucket:
+    __slots__ = ('tokens', 'updated', 'in_flight')
+
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.updated = now
+        self.in_flight = 0
+
+
+@dataclass
+class AdmissionTicket:
+    """已准入的命令，执行完后必须交回"""
+    lane: str
+    client: str
+    bucket: _Bucket
+
+
+class AdmissionController:
+    """准入控制 - 按客户端和通道限流、限制同时执行数，保证高优先级通道不被低优先级命令挤占
+
+    total_in_flight 是所有通道合计的同时执行数上限，其中 reserved 个名额只留给 priority 为 0 的通道，
+    所以音量/媒体连发最多占满 total_in_flight - reserved 个请求线程，锁屏等命令总能进来。
+    """
+
+    def __init__(self, lanes: Dict[str, LanePolicy], lane_for: Callable[[str], str],
+                 total_in_flight: int = 8, reserved: int = 2, enabled: bool = True,
+                 clock: Callable[[], float] = time.monotonic):
+        if reserved >= total_in_flight:
+            raise ValueError('保留名额必须小于同时执行数上限')
+        self.lanes = lanes
+        self.lane_for = lane_for
+        self.total_in_flight = total_in_flight
+        self.reserved = reserved
+        self.enabled = enabled
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._buckets: Dict[Tuple[str, str], _Bucket] = {}
+        self._lane_in_flight: Dict[str, int] = dict.fromkeys(lanes, 0)
+        self._in_flight = 0
+        self._stats: Dict[str, Dict[str, int]] = {lane: dict.fromkeys(OUTCOMES, 0) for lane in lanes}
+        self._last_prune = clock()
+
+    def admit(self, client: str, category: str) -> Optional[AdmissionTicket]:
+        """申请执行一条命令；被拒绝时抛出 AdmissionRejected，未启用时返回 None"""
+        if not self.enabled:
+            return None
+        lane = self.lane_for(category)
+        policy = self.lanes.get(lane)
+        if policy is None:
+            lane, policy = 'input', self.lanes['input']
+        now = self._clock()
+        with self._lock:
+            if now - self._last_prune > IDLE_CLIENT_SECONDS / 10:
+                self._prune(now)
+            bucket = self._buckets.get((client, lane))
+            if bucket is None:
+                if len(self._buckets) >= MAX_CLIENTS:
+                    self._prune(now)
+                bucket = self._buckets[(client, lane)] = _Bucket(policy.burst, now)
+            else:
+                bucket.tokens = min(policy.burst, bucket.tokens + (now - bucket.updated) * policy.rate)
+                bucket.updated = now
+
+            limit = self.total_in_flight if policy.priority == 0 else self.total_in_flight - self.reserved
+            if bucket.tokens < 1:
+                self._stats[lane]['limited'] += 1
+                retry_after = (1 - bucket.tokens) / policy.rate
+                raise AdmissionRejected({
+                    'success': False,
+                    'status': 'limited',
+                    'message': f'请求过于频繁: {lane} 类命令每个客户端每秒最多 {policy.rate:g} 个',
+                    'lane': lane,
+                    'retry_after': round(retry_after, 3),
+                })
+            if (bucket.in_flight >= policy.client_in_flight or self._lane_in_flight[lane] >= policy.max_in_flight
+                    or self._in_flight >= limit):
+                self._stats[lane]['busy'] += 1
+                raise AdmissionRejected({
+                    'success': False,
+                    'status': 'busy',
+                    'message': f'同时执行的 {lane} 类命令已达上限，请稍后重试',
+                    'lane': lane,
+                    'retry_after': 0.1,
+                })
+
+            bucket.tokens -= 1
+            bucket.in_flight += 1
+            self._lane_in_flight[lane] += 1
+            self._in_flight += 1
+            self._stats[lane]['admitted'] += 1
+        return AdmissionTicket(lane, client, bucket)
+
+    def release(self, ticket: Optional[AdmissionTicket]):
+        if ticket is None:
+            return
+        with self._lock:
+            ticket.bucket.in_flight -= 1
+            self._lane_in_flight[ticket.lane] -= 1
+            self._in_flight -= 1
+
+    def run(self, client: str, category: str, func: Callable[[], Tuple[dict, int]]) -> Tuple[dict, int]:
+        """准入后执行 func，被拒绝时返回 (拒绝结果, 429)"""
+        try:
+            ticket = self.admit(client, category)
+        except AdmissionRejected as e:
+            return e.result, 429
+        try:
+            return func()
+        finally:
+            self.release(ticket)
+
+    def _prune(self, now: float):
+        """清理空闲且已补满的令牌桶（调用方持有锁）"""
+        self._last_prune = now
+        for key, bucket in list(self._buckets.items()):
+            if bucket.in_flight == 0 and now - bucket.updated > IDLE_CLIENT_SECONDS:
+                del self._buckets[key]
+        if len(self._buckets) >= MAX_CLIENTS:
+            # 仍然太多时丢掉最久没有请求的一半
+            idle = sorted((b.updated, key) for key, b in self._buckets.items() if b.in_flight == 0)
+            for _, key in idle[:len(idle) // 2]:
+                del self._buckets[key]
+
+    def in_flight(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._lane_in_flight)
+
+    def counts(self, outcome: str) -> Dict[str, int]:
+        with self._lock:
+            return {lane: stats[outcome] for lane, stats in self._stats.items()}
+
+    def stats(self) -> dict:
+        with self._lock:
+            lanes = {
+                lane: {
+                    **self._stats[lane],
+                    'in_flight': self._lane_in_flight[lane],
+                    'rate': policy.rate,
+                    'burst': policy.burst,
+                    'max_in_flight': policy.max_in_flight,
+                    'client_in_flight': policy.client_in_flight,
+                    'priority': policy.priority,
+                }
+                for lane, policy in self.lanes.items()
+            }
+            return {
+                'enabled': self.enabled,
+                'in_flight': self._in_flight,
+                'total_in_flight': self.total_in_flight,
+                'reserved': self.reserved,
+                'clients': len(self._buckets),
+                'lanes': lanes,
+            }
+
+
+def retry_after_header(seconds: float) -> str:
+    """Retry-After 只能是整数秒"""
+    return str(max(1, math.ceil(seconds)))
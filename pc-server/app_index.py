@@ -0,0 +1,347 @@
+import hashlib
+import json
+import logging
+import os
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from window_index import fuzzy_score
+
+# 各类来源的可启动文件扩展名（非 Windows 上 PATH 中按可执行权限判断）
+SHORTCUT_EXTENSIONS = ('.lnk', '.url', '.appref-ms', '.exe')
+WINDOWS_EXECUTABLE_EXTENSIONS = ('.exe', '.com', '.bat', '.cmd')
+SOURCE_PRIORITY = {'start_menu': 0, 'folder': 1, 'path': 2}
+MAX_SEARCH_RESULTS = 100
+MAX_FOLDER_DEPTH = 4
+MAX_RESOLVE_CACHE = 1024
+
+
+def default_app_dirs(extra: Iterable[str] = ()) -> List[Tuple[str, str, bool]]:
+    """默认扫描目录: (来源, 目录, 是否递归)，包括开始菜单、PATH 和额外配置的目录"""
+    dirs = []
+    for base in (os.environ.get('ProgramData'), os.environ.get('APPDATA')):
+        if base:
+            dirs.append(('start_menu', os.path.join(base, 'Microsoft', 'Windows', 'Start Menu', 'Programs'), True))
+    for folder in extra:
+        if folder:
+            dirs.append(('folder', folder, True))
+    seen = set()
+    for folder in os.environ.get('PATH', '').split(os.pathsep):
+        key = os.path.normcase(os.path.abspath(folder)) if folder else ''
+        if key and key not in seen:
+            seen.add(key)
+            dirs.append(('path', folder, False))
+    return dirs
+
+
+def requires_shell(path: str) -> bool:
+    """快捷方式、文档等不能直接执行的文件需要交给系统外壳打开"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.lnk', '.url', '.appref-ms'):
+        return True
+    return os.name == 'nt' and ext not in ('',) + WINDOWS_EXECUTABLE_EXTENSIONS
+
+
+def shortcut_target(path: str) -> Optional[str]:
+    """从 .lnk 文件的 LinkInfo 中读出目标路径（只支持本地路径），解析失败返回 None"""
+    HAS_TARGET_ID_LIST = 0x01
+    HAS_LINK_INFO = 0x02
+    VOLUME_ID_AND_LOCAL_BASE_PATH = 0x01
+    try:
+        with open(path, 'rb') as f:
+            data = f.read(64 * 1024)
+        header_size, = struct.unpack_from('<I', data, 0)
+        if header_size != 0x4C:
+            return None
+        flags, = struct.unpack_from('<I', data, 20)
+        offset = header_size
+        if flags & HAS_TARGET_ID_LIST:
+            id_list_size, = struct.unpack_from('<H', data, offset)
+            offset += 2 + id_list_size
+        if not flags & HAS_LINK_INFO:
+            return None
+        info = offset
+        _, _, info_flags, _, base_offset, _, suffix_offset = struct.unpack_from('<7I', data, info)
+        if not info_flags & VOLUME_ID_AND_LOCAL_BASE_PATH:
+            return None
+
+        def c_string(start: int) -> str:
+            end = data.index(b'\x00', start)
+            return data[start:end].decode('mbcs' if os.name == 'nt' else 'latin-1')
+
+        target = c_string(info + base_offset) + c_string(info + suffix_offset)
+        return target or None
+    except (OSError, struct.error, ValueError, LookupError):
+        return None
+
+
+def app_id_for(path: str) -> str:
+    """由路径得到稳定的应用 id"""
+    return hashlib.blake2b(os.path.normcase(path).encode('utf-8'), digest_size=6).hexdigest()
+
+
+@dataclass
+class AppEntry:
+    """可启动的应用"""
+    app_id: str
+    name: str
+    path: str
+    source: str
+
+    def __post_init__(self):
+        self.key = self.name.lower()
+        self.chars = frozenset(self.key)
+
+    def to_dict(self) -> dict:
+        return {'id': self.app_id, 'name': self.name, 'path': self.path, 'source': self.source}
+
+
+class AppIndex:
+    """已安装应用索引 - 扫描开始菜单、PATH 和配置目录，结果持久化到磁盘
+
+    每个目录记录 mtime、文件和子目录；刷新时只 stat 目录，mtime 没变的目录直接复用上次的结果，
+    只有变化的目录才重新列出内容。启动时先加载磁盘上的索引，可以立即搜索。
+    """
+
+    def __init__(self, path: Optional[str], dirs: List[Tuple[str, str, bool]],
+                 exists: Callable[[str], bool] = os.path.exists,
+                 refresh_interval: float = 300.0, resolve_ttl: float = 300.0, miss_ttl: float = 5.0):
+        self.path = path
+        self.dirs = dirs
+        self.exists = exists
+        self.refresh_interval = refresh_interval
+        self.resolve_ttl = resolve_ttl
+        # 不存在的结果只缓存很短时间，刚安装的程序不会长时间被当成不存在
+        self.miss_ttl = miss_ttl
+        self._dir_cache: Dict[str, dict] = {}
+        self._entries: List[AppEntry] = []
+        self._by_id: Dict[str, AppEntry] = {}
+        self._by_path: Dict[str, AppEntry] = {}
+        self._resolved: Dict[str, Tuple[bool, float]] = {}
+        self._targets: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {'refreshes': 0, 'dirs_scanned': 0, 'dirs_reused': 0, 'last_refresh_ms': 0.0,
+                       'resolve_hits': 0, 'resolve_probes': 0}
+        self._logger = logging.getLogger('AppIndex')
+
+    # =================== 构建 ===================
+    def start(self):
+        """加载磁盘上的索引（没有时同步扫描一次）并启动后台刷新线程"""
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            if not self.load():
+                self.refresh()
+            self._thread = threading.Thread(target=self._run, name='app-index', daemon=True)
+            self._thread.start()
+
+    def load(self) -> bool:
+        """从磁盘加载索引"""
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            dir_cache = data['dirs']
+        except Exception as e:
+            self._logger.error(f"加载应用索引失败，将重新扫描: {e}")
+            return False
+        self._publish(dir_cache)
+        return True
+
+    def refresh(self) -> int:
+        """增量刷新，返回重新扫描的目录数"""
+        with self._refresh_lock:
+            start = time.perf_counter()
+            old = self._dir_cache
+            new: Dict[str, dict] = {}
+            scanned = reused = 0
+            for source, folder, recursive in self.dirs:
+                pending = [(folder, 0)]
+                while pending:
+                    directory, depth = pending.pop()
+                    if directory in new:
+                        continue
+                    try:
+                        mtime = os.stat(directory).st_mtime
+                    except OSError:
+                        continue
+                    cached = old.get(directory)
+                    if cached is not None and cached['mtime'] == mtime and cached['source'] == source:
+                        reused += 1
+                    else:
+                        cached = self._scan_dir(directory, source, mtime)
+                        scanned += 1
+                    new[directory] = cached
+                    if recursive and depth < MAX_FOLDER_DEPTH:
+                        pending.extend((os.path.join(directory, name), depth + 1) for name in cached['dirs'])
+
+            self._publish(new)
+            if scanned or len(new) != len(old):
+                self._save(new)
+            with self._lock:
+                self._stats['refreshes'] += 1
+                self._stats['dirs_scanned'] += scanned
+                self._stats['dirs_reused'] += reused
+                self._stats['last_refresh_ms'] = round((time.perf_counter() - start) * 1000, 2)
+            return scanned
+
+    @staticmethod
+    def _scan_dir(directory: str, source: str, mtime: float) -> dict:
+        """列出一个目录中的可启动文件和子目录"""
+        files, dirs = [], []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir():
+                            dirs.append(entry.name)
+                            continue
+                        name, ext = os.path.splitext(entry.name)
+                        ext = ext.lower()
+                        if source == 'path':
+                            if os.name == 'nt':
+                                launchable = ext in WINDOWS_EXECUTABLE_EXTENSIONS
+                            else:
+                                launchable = entry.is_file() and os.access(entry.path, os.X_OK)
+                                name = entry.name
+                        else:
+                            launchable = ext in SHORTCUT_EXTENSIONS
+                        if launchable and not name.lower().startswith('uninstall'):
+                            files.append([name, entry.path])
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return {'source': source, 'mtime': mtime, 'files': files, 'dirs': dirs}
+
+    def _publish(self, dir_cache: Dict[str, dict]):
+        entries, by_id, by_path = [], {}, {}
+        path_names = set()
+        for directory in dir_cache.values():
+            for name, path in directory['files']:
+                key = os.path.normcase(path)
+                if key in by_path:
+                    continue
+                if directory['source'] == 'path':
+                    # 与命令行查找规则一致，同名程序只保留 PATH 中靠前的那个
+                    if os.path.normcase(name) in path_names:
+                        continue
+                    path_names.add(os.path.normcase(name))
+                entry = AppEntry(app_id_for(path), name, path, directory['source'])
+                entries.append(entry)
+                by_id[entry.app_id] = entry
+                by_path[key] = entry
+        entries.sort(key=lambda e: (SOURCE_PRIORITY.get(e.source, 9), len(e.name), e.key))
+        with self._lock:
+            self._dir_cache = dir_cache
+            self._entries = entries
+            self._by_id = by_id
+            self._by_path = by_path
+            # 索引变化后缓存的“不存在”可能已经过时
+            self._resolved = {key: cached for key, cached in self._resolved.items() if cached[0]}
+
+    def _save(self, dir_cache: Dict[str, dict]):
+        """原子写入索引文件"""
+        if not self.path:
+            return
+        try:
+            tmp_path = f'{self.path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': 1, 'dirs': dir_cache}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self._logger.error(f"保存应用索引失败: {e}")
+
+    def _run(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                self._logger.error(f"刷新应用索引失败: {e}")
+
+    # =================== 查询 ===================
+    def search(self, query: str, limit: int = 20) -> dict:
+        """按名称模糊搜索，结果按匹配程度、来源优先级和名称长度排序"""
+        self.start()
+        limit = min(max(int(limit), 1), MAX_SEARCH_RESULTS)
+        needle = query.strip().lower()
+        with self._lock:
+            entries = self._entries
+        if not needle:
+            return {'apps': [e.to_dict() for e in entries[:limit]], 'total_count': len(entries)}
+
+        chars = set(needle.replace(' ', ''))
+        matches = []
+        for order, entry in enumerate(entries):
+            # 先用字符集合快速排除，再逐个打分
+            if not chars <= entry.chars:
+                continue
+            score = fuzzy_score(needle, entry.key)
+            if score is not None:
+                matches.append((-score, order, entry))
+        matches.sort(key=lambda match: match[:2])
+        return {
+            'apps': [dict(entry.to_dict(), score=-score) for score, _, entry in matches[:limit]],
+            'total_count': len(matches),
+        }
+
+    def get(self, app_id: str) -> Optional[AppEntry]:
+        self.start()
+        return self._by_id.get(app_id)
+
+    def resolve(self, app_path: str) -> bool:
+        """判断应用是否存在；索引里的路径直接返回，其余探测结果缓存 resolve_ttl 秒（不存在的缓存 miss_ttl 秒）"""
+        key = os.path.normcase(app_path)
+        now = time.monotonic()
+        with self._lock:
+            if key in self._by_path:
+                self._stats['resolve_hits'] += 1
+                return True
+            cached = self._resolved.get(key)
+            if cached is not None and now - cached[1] < (self.resolve_ttl if cached[0] else self.miss_ttl):
+                self._stats['resolve_hits'] += 1
+                return cached[0]
+
+        exists = self.exists(app_path)
+        with self._lock:
+            if len(self._resolved) >= MAX_RESOLVE_CACHE:
+                self._resolved.clear()
+            self._resolved[key] = (exists, now)
+            self._stats['resolve_probes'] += 1
+        return exists
+
+    def executable_for(self, app_path: str) -> str:
+        """启动路径对应的可执行文件；快捷方式解析出的目标会缓存"""
+        if not app_path.lower().endswith('.lnk'):
+            return app_path
+        key = os.path.normcase(app_path)
+        with self._lock:
+            target = self._targets.get(key)
+        if target is None:
+            target = shortcut_target(app_path) or app_path
+            with self._lock:
+                self._targets[key] = target
+        return target
+
+    def invalidate(self, app_path: str):
+        """启动失败时清除缓存的探测结果"""
+        with self._lock:
+            self._resolved.pop(os.path.normcase(app_path), None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['apps'] = len(self._entries)
+            stats['dirs'] = len(self._dir_cache)
+            stats['resolved_cache'] = len(self._resolved)
+        return stats
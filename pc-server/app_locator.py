@@ -0,0 +1,83 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from controller_backends import WindowInfo
+from process_table import ProcessTable
+from window_index import WindowIndex
+
+
+def executable_keys(path: str) -> Tuple[str, str]:
+    """可执行文件的 (完整路径, 文件名) 匹配键，不区分大小写和路径分隔符"""
+    full = path.replace('/', '\\').lower()
+    return full, full.rsplit('\\', 1)[-1]
+
+
+class AppLocator:
+    """可执行文件 -> 进程 -> 窗口映射，用于“已运行则切换”的启动模式
+
+    映射只记录进程身份和窗口归属，只在进程表或窗口索引的 identity_version 变化
+    （进程启动/退出、窗口出现/消失）时重建；内存、标题、位置等变化不会触发重建，
+    查找时再从窗口索引取窗口的当前状态。进程表按 TTL 刷新，刚启动的进程可能要等下一次刷新才能找到。
+    """
+
+    def __init__(self, process_table: ProcessTable, window_index: WindowIndex):
+        self.process_table = process_table
+        self.window_index = window_index
+        self._versions: Optional[Tuple[int, int]] = None
+        self._pids_by_path: Dict[str, List[int]] = {}
+        self._pids_by_name: Dict[str, List[int]] = {}
+        self._hwnds_by_pid: Dict[int, List[int]] = {}
+        self._lock = threading.Lock()
+        self._stats = {'rebuilds': 0, 'lookups': 0, 'found': 0}
+
+    def _ensure_fresh(self):
+        # 先取版本号再取快照：快照比版本号新时下次还会重建一次，不会漏掉变化
+        versions = (self.process_table.identity(), self.window_index.identity())
+        if self._versions == versions:
+            return
+        _, processes = self.process_table.snapshot()
+        _, windows = self.window_index.snapshot()
+        by_path: Dict[str, List[int]] = {}
+        by_name: Dict[str, List[int]] = {}
+        for process in processes:
+            full, name = executable_keys(process.executable or process.name)
+            by_path.setdefault(full, []).append(process.pid)
+            by_name.setdefault(name, []).append(process.pid)
+            alias = process.name.lower()
+            if alias != name:
+                by_name.setdefault(alias, []).append(process.pid)
+        by_pid: Dict[int, List[int]] = {}
+        for window in windows:
+            if window.pid:
+                by_pid.setdefault(window.pid, []).append(window.hwnd)
+        with self._lock:
+            self._pids_by_path, self._pids_by_name, self._hwnds_by_pid = by_path, by_name, by_pid
+            self._versions = versions
+            self._stats['rebuilds'] += 1
+
+    def find_window(self, executable: str) -> Optional[WindowInfo]:
+        """找到运行 executable 的进程的主窗口；完整路径匹配优先，其次按文件名匹配
+
+        只考虑可见且有标题的窗口（最小化的窗口也算可见），提示框、消息窗口等隐藏或无标题的窗口不算；
+        有多个时选最近变化过的那个。没有这样的窗口时返回 None，由调用方启动新实例。
+        """
+        self._ensure_fresh()
+        full, name = executable_keys(executable)
+        with self._lock:
+            self._stats['lookups'] += 1
+            pids = self._pids_by_path.get(full) or self._pids_by_name.get(name, [])
+            hwnds = [hwnd for pid in pids for hwnd in self._hwnds_by_pid.get(pid, ())]
+        candidates = [window for window in map(self.window_index.get, hwnds)
+                      if window is not None and window.is_visible and window.title]
+        if not candidates:
+            return None
+        with self._lock:
+            self._stats['found'] += 1
+        return max(candidates, key=lambda window: self.window_index.revision(window.hwnd))
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['executables'] = len(self._pids_by_path)
+            stats['windowed_processes'] = len(self._hwnds_by_pid)
+        return stats
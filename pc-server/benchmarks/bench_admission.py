@@ -0,0 +1,140 @@
+"""准入控制基准测试
+
+一个客户端（127.0.0.2）用多个线程连发需要按住的组合键（wait=true），
+另一个客户端（127.0.0.1）同时低频发送 media/next（input 通道）和 system/lock（control 通道），
+比较开启和关闭准入控制时正常客户端的延迟、连发客户端收到的 429 以及输入队列深度。
+
+每种配置在单独的子进程中运行（准入控制在导入 server 时配置）。
+
+用法:
+    python benchmarks/bench_admission.py
+    python benchmarks/bench_admission.py --flood-threads 32 --hold-ms 20 --seconds 5
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Tuple
+from urllib.parse import urlencode, urlparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from bench_http import percentile  # noqa: E402
+
+FLOOD_ADDRESS = '127.0.0.2'
+PROBE_ADDRESS = '127.0.0.1'
+
+
+def request(base_url: str, path: str, params: dict, source: str) -> Tuple[int, float]:
+    """从指定的本机地址发送 GET 请求，返回 (状态码, 耗时秒)"""
+    parsed = urlparse(base_url)
+    start = time.perf_counter()
+    try:
+        conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=60, source_address=(source, 0))
+        conn.request('GET', f'{path}?{urlencode(params)}')
+        response = conn.getresponse()
+        response.read()
+        status = response.status
+        conn.close()
+    except OSError:
+        status = 0
+    return status, time.perf_counter() - start
+
+
+def run_scenario(args) -> dict:
+    """在本进程启动服务器并运行一次连发场景"""
+    os.environ.setdefault('REMOTE_PC_BACKEND', 'simulated')
+    os.environ.setdefault('REMOTE_PC_APP_INDEX', '')
+    from bench_http import start_local_server
+    import server
+
+    base_url, _ = start_local_server()
+    stop = threading.Event()
+    flood_codes: Counter = Counter()
+    max_depth = [0]
+
+    def flood():
+        params = {'keys': 'shift', 'hold_ms': args.hold_ms, 'wait': 'true'}
+        while not stop.is_set():
+            status, _ = request(base_url, '/api/hotkey/custom', params, FLOOD_ADDRESS)
+            flood_codes[status] += 1
+            if status == 429:
+                # 行为良好的客户端会按 Retry-After 退避；这里只稍作停顿，模拟不守规矩的连发
+                time.sleep(0.01)
+
+    def watch_queue():
+        while not stop.is_set():
+            max_depth[0] = max(max_depth[0], server.input_dispatcher.stats()['queue_depth'])
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=flood, daemon=True) for _ in range(args.flood_threads)]
+    threads.append(threading.Thread(target=watch_queue, daemon=True))
+    for thread in threads:
+        thread.start()
+    time.sleep(0.5)
+
+    probes: Dict[str, List[float]] = {'media/next (wait)': [], 'system/lock': []}
+    probe_errors: Counter = Counter()
+    deadline = time.monotonic() + args.seconds
+    while time.monotonic() < deadline:
+        for name, path, params in (('media/next (wait)', '/api/media/next', {'wait': 'true'}),
+                                   ('system/lock', '/api/system/lock', {})):
+            status, latency = request(base_url, path, params, PROBE_ADDRESS)
+            if status == 200:
+                probes[name].append(latency)
+            else:
+                probe_errors[f'{name} {status}'] += 1
+        time.sleep(args.probe_interval_ms / 1000)
+
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=60)
+    return {
+        'probes': {name: sorted(values) for name, values in probes.items()},
+        'probe_errors': dict(probe_errors),
+        'flood': {str(code): count for code, count in sorted(flood_codes.items())},
+        'max_queue_depth': max_depth[0],
+        'dropped': server.input_dispatcher.stats()['dropped'],
+    }
+
+
+def report(label: str, result: dict):
+    print(f'准入控制 {label}')
+    for name, values in result['probes'].items():
+        print(f'  {name:<18} n={len(values):<4} p50 {percentile(values, 50) * 1000:8.1f}ms  '
+              f'p99 {percentile(values, 99) * 1000:8.1f}ms  max {(values[-1] if values else 0) * 1000:8.1f}ms')
+    print(f'  正常客户端失败: {result["probe_errors"] or 0}')
+    print(f'  连发客户端状态码: {result["flood"]}')
+    print(f'  输入队列最大深度: {result["max_queue_depth"]}, 过期丢弃: {result["dropped"]}')
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='准入控制基准测试')
+    parser.add_argument('--flood-threads', type=int, default=16)
+    parser.add_argument('--hold-ms', type=float, default=20, help='连发的组合键按住的毫秒数')
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--probe-interval-ms', type=float, default=100)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_scenario(args)))
+        return 0
+
+    print(f'{args.flood_threads} 个线程连发按住 {args.hold_ms:g}ms 的组合键，持续 {args.seconds:g} 秒')
+    for label, value in (('关闭', 'off'), ('开启', 'on')):
+        env = dict(os.environ, REMOTE_PC_ADMISSION=value)
+        output = subprocess.run([sys.executable, __file__, '--child', *sys.argv[1:]], env=env,
+                                capture_output=True, text=True, check=True).stdout
+        report(label, json.loads(output.strip().splitlines()[-1]))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""命令分发与 /api/info 基准测试
+
+用 Flask test_client 在进程内（不经过网络）测量命令路由的分发开销和 /api/info 的响应耗时，
+/api/info 分别测试完整响应和带 If-None-Match 的 304 响应；另外直接调用 execute_command
+（WebSocket / UDP / 批量命令走的路径）测量不含 Flask 的分发耗时。
+
+用法:
+    REMOTE_PC_BACKEND=simulated python benchmarks/bench_dispatch.py
+    REMOTE_PC_BACKEND=simulated python benchmarks/bench_dispatch.py --requests 5000
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+os.environ.setdefault('REMOTE_PC_BACKEND', 'simulated')
+os.environ.setdefault('REMOTE_PC_APP_INDEX', '')
+
+import server  # noqa: E402
+
+# 只测分发，不让请求日志写控制台
+logging.getLogger().setLevel(logging.ERROR)
+
+PATHS = [
+    '/api/window/info',
+    '/api/system/info',
+    '/api/window/minimize?hwnd=abc',
+    '/api/app/launches?limit=5',
+    '/api/volume/bogus',
+]
+
+# execute_command 直接调用的命令（不进入输入队列）
+COMMANDS = [
+    ('window', 'info', {}),
+    ('system', 'info', {}),
+    ('app', 'launches', {'limit': '5'}),
+    ('volume', 'bogus', {}),
+]
+
+
+def timed(client, path: str, requests: int, headers=None) -> float:
+    """平均每个请求的耗时（微秒）"""
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get(path, headers=headers)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='命令分发与 /api/info 基准测试')
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    for category, action, params in COMMANDS:
+        start = time.perf_counter()
+        for _ in range(args.requests * 10):
+            server.execute_command(category, action, params)
+        elapsed = (time.perf_counter() - start) / (args.requests * 10) * 1e6
+        print(f'{"execute_command " + category + "/" + action:<36}{elapsed:>9.2f}µs')
+
+    client = server.app.test_client()
+    for path in PATHS:
+        timed(client, path, 50)
+        print(f'{path:<36}{timed(client, path, args.requests):>9.1f}µs')
+
+    response = client.get('/api/info')
+    etag = response.headers.get('ETag')
+    print(f'{"/api/info":<36}{timed(client, "/api/info", args.requests):>9.1f}µs  ({len(response.data)} 字节)')
+    if etag:
+        print(f'{"/api/info (If-None-Match)":<36}'
+              f'{timed(client, "/api/info", args.requests, {"If-None-Match": etag}):>9.1f}µs  '
+              f'(状态码 {client.get("/api/info", headers={"If-None-Match": etag}).status_code})')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
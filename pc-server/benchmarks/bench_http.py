@@ -0,0 +1,254 @@
+"""HTTP 接口延迟/吞吐基准测试
+
+默认在进程内以模拟后端启动服务器，并发请求每个 /api/* 路由，
+统计每个路由的 p50/p95/p99 延迟和整体每秒请求数，并与 thresholds.json 比较，
+超出阈值时以非零状态退出。
+
+用法:
+    python benchmarks/bench_http.py
+    python benchmarks/bench_http.py --requests 500 --concurrency 16 --json result.json
+    python benchmarks/bench_http.py --url http://192.168.1.10:8090   # 测试已运行的服务器（默认跳过电源类操作）
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+DEFAULT_THRESHOLDS = os.path.join(HERE, 'thresholds.json')
+
+# (方法, 路径, 参数, 期望的状态码, 是否会真实影响电脑)
+ROUTES: List[Tuple[str, str, dict, Tuple[int, ...], bool]] = [
+    ('GET', '/api/info', {}, (200,), False),
+    ('GET', '/api/test', {}, (200,), False),
+    ('GET', '/api/volume/up', {'steps': 2}, (200, 202), False),
+    ('POST', '/api/volume/down', {'steps': 2}, (200, 202), False),
+    ('GET', '/api/volume/mute', {}, (200, 202), False),
+    ('GET', '/api/media/play', {}, (200, 202), False),
+    ('GET', '/api/media/pause', {}, (200, 202), False),
+    ('GET', '/api/media/stop', {}, (200, 202), False),
+    ('GET', '/api/media/next', {}, (200, 202), False),
+    ('GET', '/api/media/previous', {}, (200, 202), False),
+    ('GET', '/api/brightness/up', {}, (200, 202), False),
+    ('GET', '/api/brightness/down', {}, (200, 202), False),
+    ('GET', '/api/hotkey/alt_tab', {}, (200, 202), False),
+    ('GET', '/api/hotkey/ctrl_c', {}, (200, 202), False),
+    ('GET', '/api/hotkey/ctrl_v', {}, (200, 202), False),
+    ('GET', '/api/hotkey/win_d', {}, (200, 202), False),
+    ('POST', '/api/hotkey/custom', {'keys': [17, 16, 27]}, (200, 202), False),
+    ('GET', '/api/volume/up', {'steps': 1, 'wait': 'true'}, (200,), False),
+    ('GET', '/api/window/info', {}, (200, 400), False),
+    ('GET', '/api/window/list', {'q': 'code'}, (200,), False),
+    ('GET', '/api/window/65568/thumbnail', {}, (200,), False),
+    ('GET', '/api/window/minimize', {'hwnd': 1}, (200,), True),
+    ('GET', '/api/window/maximize', {'hwnd': 1}, (200,), True),
+    ('GET', '/api/window/restore', {'hwnd': 1}, (200,), True),
+    ('GET', '/api/window/close', {'hwnd': 1}, (200,), True),
+    ('GET', '/api/app/processes', {}, (200,), False),
+    ('GET', '/api/app/search', {'q': 'note'}, (200,), False),
+    ('POST', '/api/app/launch', {'path': 'notepad.exe'}, (200,), True),
+    ('POST', '/api/app/kill', {'name': 'bench-nonexistent.exe'}, (200, 400), True),
+    ('GET', '/api/system/info', {}, (200,), False),
+    ('GET', '/api/system/metrics', {'from': '-600', 'step': '10'}, (200,), False),
+    ('GET', '/api/system/lock', {}, (200,), True),
+    ('GET', '/api/system/shutdown', {}, (200,), True),
+    ('GET', '/api/system/restart', {}, (200,), True),
+    ('GET', '/api/system/sleep', {}, (200,), True),
+    ('GET', '/api/input/stats', {}, (200,), False),
+    ('POST', '/api/batch', {'commands': [{'category': 'media', 'action': 'next'},
+                                         {'category': 'window', 'action': 'info'}]}, (200,), False),
+]
+
+
+def start_local_server() -> Tuple[str, object]:
+    """以模拟后端在本进程启动服务器，返回 (基础地址, server)"""
+    os.environ.setdefault('REMOTE_PC_BACKEND', 'simulated')
+    # 所有请求来自同一个地址，关闭准入控制以测量处理能力（准入控制见 bench_admission.py）
+    os.environ.setdefault('REMOTE_PC_ADMISSION', 'off')
+    import logging
+    from werkzeug.serving import make_server
+    from server import app
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}', server
+
+
+def send_request(base_url: str, method: str, path: str, params: dict) -> Tuple[int, float]:
+    """发送一个请求，返回 (状态码, 耗时秒)；连接失败时状态码为 0"""
+    parsed = urlparse(base_url)
+    start = time.perf_counter()
+    try:
+        conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=30)
+        if method == 'GET':
+            query = urlencode(params)
+            conn.request('GET', f'{path}?{query}' if query else path)
+        else:
+            conn.request('POST', path, body=json.dumps(params),
+                         headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        response.read()
+        status = response.status
+        conn.close()
+    except OSError:
+        status = 0
+    return status, time.perf_counter() - start
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """最近秩百分位"""
+    if not sorted_values:
+        return 0.0
+    index = max(int(round(pct / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    """汇总延迟统计（毫秒）"""
+    values = sorted(latencies)
+    count = len(values)
+    return {
+        'count': count,
+        'errors': errors,
+        'error_rate': round(errors / count, 4) if count else 0.0,
+        'p50_ms': round(percentile(values, 50) * 1000, 3),
+        'p95_ms': round(percentile(values, 95) * 1000, 3),
+        'p99_ms': round(percentile(values, 99) * 1000, 3),
+        'max_ms': round(values[-1] * 1000, 3) if values else 0.0,
+        'rps': round(count / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+
+def route_key(route) -> str:
+    """路由统计键；wait 模式单独统计"""
+    method, path, params = route[:3]
+    return f'{method} {path}' + (' (wait)' if params.get('wait') else '')
+
+
+def run_benchmark(base_url: str, routes, requests_per_route: int, concurrency: int) -> dict:
+    """并发混合请求所有路由"""
+    tasks = [route for route in routes for _ in range(requests_per_route)]
+    random.Random(42).shuffle(tasks)
+
+    samples: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    lock = threading.Lock()
+
+    def worker(route):
+        method, path, params, expected, _ = route
+        status, latency = send_request(base_url, method, path, params)
+        key = route_key(route)
+        with lock:
+            samples.setdefault(key, []).append(latency)
+            if status not in expected:
+                errors[key] = errors.get(key, 0) + 1
+
+    # 预热
+    for route in routes:
+        send_request(base_url, *route[:3])
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, tasks))
+    elapsed = time.perf_counter() - start
+
+    all_latencies = [latency for values in samples.values() for latency in values]
+    return {
+        'base_url': base_url,
+        'concurrency': concurrency,
+        'requests_per_route': requests_per_route,
+        'elapsed_s': round(elapsed, 3),
+        'overall': summarize(all_latencies, sum(errors.values()), elapsed),
+        'routes': {key: summarize(values, errors.get(key, 0), elapsed) for key, values in sorted(samples.items())},
+    }
+
+
+def check_thresholds(result: dict, thresholds: dict) -> List[str]:
+    """与阈值比较，返回所有退化项"""
+    failures = []
+    default = thresholds.get('default', {})
+
+    def check(name: str, stats: dict, limits: dict):
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+            if metric in limits and stats[metric] > limits[metric]:
+                failures.append(f'{name}: {metric} {stats[metric]} > {limits[metric]}')
+        if 'max_error_rate' in limits and stats['error_rate'] > limits['max_error_rate']:
+            failures.append(f'{name}: error_rate {stats["error_rate"]} > {limits["max_error_rate"]}')
+        if 'min_rps' in limits and stats['rps'] < limits['min_rps']:
+            failures.append(f'{name}: rps {stats["rps"]} < {limits["min_rps"]}')
+
+    check('overall', result['overall'], thresholds.get('overall', {}))
+    route_limits = thresholds.get('routes', {})
+    for key, stats in result['routes'].items():
+        limits = dict(default)
+        limits.update(route_limits.get(key, {}))
+        limits.pop('min_rps', None)  # 单路由吞吐受混合比例影响，只检查整体吞吐
+        check(key, stats, limits)
+    return failures
+
+
+def print_report(result: dict):
+    """打印结果表格"""
+    header = f"{'route':<36}{'count':>7}{'err':>5}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+    print(header)
+    print('-' * len(header))
+    for key, stats in result['routes'].items():
+        print(f"{key:<36}{stats['count']:>7}{stats['errors']:>5}"
+              f"{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}{stats['max_ms']:>9.2f}")
+    overall = result['overall']
+    print('-' * len(header))
+    print(f"overall: {overall['count']} 请求, {overall['errors']} 错误, "
+          f"p50 {overall['p50_ms']:.2f}ms, p95 {overall['p95_ms']:.2f}ms, p99 {overall['p99_ms']:.2f}ms, "
+          f"{overall['rps']:.1f} req/s (并发 {result['concurrency']})")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='RemotePCController HTTP 基准测试')
+    parser.add_argument('--url', help='测试已运行的服务器，例如 http://127.0.0.1:8090；默认在进程内启动模拟后端')
+    parser.add_argument('--requests', type=int, default=100, help='每个路由的请求数')
+    parser.add_argument('--concurrency', type=int, default=8, help='并发数')
+    parser.add_argument('--thresholds', default=DEFAULT_THRESHOLDS, help='阈值文件，传空字符串跳过检查')
+    parser.add_argument('--include-power', action='store_true', help='测试远程服务器时也请求电源/窗口/进程类操作')
+    parser.add_argument('--json', help='把结果写入 JSON 文件')
+    args = parser.parse_args(argv)
+
+    routes = ROUTES
+    if args.url:
+        base_url = args.url.rstrip('/')
+        if not args.include_power:
+            routes = [route for route in ROUTES if not route[4]]
+    else:
+        base_url, _ = start_local_server()
+
+    result = run_benchmark(base_url, routes, args.requests, args.concurrency)
+    print_report(result)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    if args.thresholds:
+        with open(args.thresholds, encoding='utf-8') as f:
+            failures = check_thresholds(result, json.load(f))
+        if failures:
+            print('\n性能退化:')
+            for failure in failures:
+                print(f'  {failure}')
+            return 1
+        print('\n全部指标在阈值之内')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""按住模式基准测试
+
+模拟手机端按住方向键 --hold-seconds 秒，对比两种方式:
+    taps    旧方式，客户端按 --rate 的频率连发 /api/hotkey/custom，每次完整的按下+松开
+    hold    /api/key/down + /api/key/up，自动重复由服务端生成
+
+统计 HTTP 请求数、客户端花在请求上的时间、注入的按下事件数和重复间隔的抖动；
+最后模拟 key/up 丢失，测量租约到期后按键被松开的时间。
+
+用法:
+    python benchmarks/bench_key_hold.py
+    python benchmarks/bench_key_hold.py --hold-seconds 3 --rate 10 --lease-ms 1000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from bench_http import send_request, start_local_server  # noqa: E402
+
+KEY = 'right'
+KEY_CODE = 0x27
+
+
+def keydowns(engine, since: float):
+    """since 之后注入的按下事件时间戳"""
+    with engine._lock:
+        return [at for at, event in engine.events if at >= since and event.key_code == KEY_CODE and not event.key_up]
+
+
+def jitter_ms(stamps) -> str:
+    gaps = [(b - a) * 1000 for a, b in zip(stamps, stamps[1:])]
+    if len(gaps) < 2:
+        return '-'
+    return f'间隔 {statistics.mean(gaps):.1f}ms ± {statistics.pstdev(gaps):.1f}ms'
+
+
+def wait_idle(dispatcher):
+    while dispatcher.stats()['queue_depth']:
+        time.sleep(0.01)
+    time.sleep(0.05)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='按住模式基准测试')
+    parser.add_argument('--hold-seconds', type=float, default=3.0)
+    parser.add_argument('--rate', type=float, default=10.0, help='每秒重复次数')
+    parser.add_argument('--lease-ms', type=float, default=1000.0, help='模拟 key/up 丢失时的租约')
+    args = parser.parse_args()
+
+    base_url, _ = start_local_server()
+    import server
+    engine = server.system_controller.backend.input_engine
+    dispatcher = server.input_dispatcher
+    interval = 1 / args.rate
+
+    print(f'按住 {KEY} {args.hold_seconds:g} 秒，每秒重复 {args.rate:g} 次（模拟后端，回环地址）')
+
+    # 旧方式：客户端定时连发
+    start = time.perf_counter()
+    requests, client_time = 0, 0.0
+    deadline = start + args.hold_seconds
+    next_send = start
+    while next_send < deadline:
+        _, latency = send_request(base_url, 'POST', '/api/hotkey/custom', {'keys': KEY})
+        requests += 1
+        client_time += latency
+        next_send += interval
+        time.sleep(max(next_send - time.perf_counter(), 0))
+    wait_idle(dispatcher)
+    stamps = keydowns(engine, start)
+    print(f'  taps  请求 {requests:3d}  客户端请求耗时 {client_time * 1000:7.1f}ms  按下事件 {len(stamps):3d}  {jitter_ms(stamps)}')
+
+    # 按住模式：两次请求
+    start = time.perf_counter()
+    _, down = send_request(base_url, 'POST', '/api/key/down', {'keys': KEY, 'rate': args.rate, 'delay_ms': 0})
+    time.sleep(max(start + args.hold_seconds - time.perf_counter(), 0))
+    _, up = send_request(base_url, 'POST', '/api/key/up', {'keys': KEY})
+    wait_idle(dispatcher)
+    stamps = keydowns(engine, start)
+    print(f'  hold  请求 {2:3d}  客户端请求耗时 {(down + up) * 1000:7.1f}ms  按下事件 {len(stamps):3d}  {jitter_ms(stamps)}')
+
+    # key/up 丢失：租约到期后自动松开
+    start = time.perf_counter()
+    send_request(base_url, 'POST', '/api/key/down', {'keys': KEY, 'lease_ms': args.lease_ms})
+    released = None
+    while time.perf_counter() - start < args.lease_ms / 1000 + 2:
+        with engine._lock:
+            released = next((at for at, event in engine.events
+                             if at >= start and event.key_code == KEY_CODE and event.key_up), None)
+        if released is not None:
+            break
+        time.sleep(0.005)
+    if released is None:
+        print('  key/up 丢失: 按键没有被自动松开')
+        return 1
+    print(f'  key/up 丢失: 租约 {args.lease_ms:g}ms，{(released - start) * 1000:.1f}ms 后自动松开')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
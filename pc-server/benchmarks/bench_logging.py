@@ -0,0 +1,112 @@
+"""请求日志开销基准测试
+
+对比每个请求在请求线程上花在日志上的时间:
+    print   旧方式，每个请求 5 次同步 print（请求体、收到请求、请求数据、执行、操作结果）
+    async   RequestLog.record，追加到环形缓冲区并放进队列，由后台线程写出
+
+输出目标是一个模拟的慢控制台：每次写入耗时 --console-us 微秒（Windows 控制台一次写入通常在几十到几百微秒）。
+多线程时 print 还要竞争 stdout 的锁。
+
+用法:
+    python benchmarks/bench_logging.py
+    python benchmarks/bench_logging.py --requests 5000 --threads 1 8 --console-us 200
+"""
+import argparse
+import io
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from request_log import RequestLog, configure_logging  # noqa: E402
+
+
+class SlowConsole(io.TextIOBase):
+    """每次写入固定耗时的输出流（模拟 Windows 控制台），写入互斥"""
+
+    def __init__(self, write_us: float):
+        self.write_s = write_us / 1e6
+        self.writes = 0
+        self._lock = threading.Lock()
+
+    def write(self, text: str) -> int:
+        with self._lock:
+            deadline = time.perf_counter() + self.write_s
+            while time.perf_counter() < deadline:
+                pass
+            self.writes += 1
+        return len(text)
+
+
+PARAMS = {'steps': '2', 'wait': 'false'}
+RESULT = {'success': True, 'message': '音量增加 2 步', 'action': 'volume_up', 'command_id': 42}
+
+
+def print_request(console: SlowConsole):
+    """旧的 volume_control 处理流程里的 print"""
+    print(b'', file=console)
+    print('收到音量控制请求: up, 方法: GET', file=console)
+    print(f'请求数据: {PARAMS}', file=console)
+    print('执行音量操作: up', file=console)
+    print(f'操作结果: {RESULT}', file=console)
+
+
+def measure(func: Callable[[], None], requests: int, threads: int) -> dict:
+    """在 threads 个线程上调用 requests 次，返回调用线程上的耗时统计（微秒）"""
+    def run(count: int) -> List[float]:
+        samples = []
+        for _ in range(count):
+            start = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - start) * 1e6)
+        return samples
+
+    per_thread = requests // threads
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        samples = [s for chunk in pool.map(run, [per_thread] * threads) for s in chunk]
+    elapsed = time.perf_counter() - start
+    samples.sort()
+    return {
+        'mean_us': round(statistics.fmean(samples), 1),
+        'p50_us': round(samples[len(samples) // 2], 1),
+        'p99_us': round(samples[min(int(len(samples) * 0.99), len(samples) - 1)], 1),
+        'rps': round(len(samples) / elapsed),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='请求日志开销基准测试')
+    parser.add_argument('--requests', type=int, default=4000)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--console-us', type=float, default=100.0, help='模拟控制台每次写入的耗时（微秒）')
+    args = parser.parse_args()
+
+    print(f'模拟控制台每次写入 {args.console_us}µs，{args.requests} 个请求')
+    print(f'{"方式":<8}{"线程":>6}{"平均 µs":>10}{"p50 µs":>10}{"p99 µs":>10}{"req/s":>10}')
+    for threads in args.threads:
+        console = SlowConsole(args.console_us)
+        stats = measure(lambda: print_request(console), args.requests, threads)
+        print(f'{"print":<8}{threads:>6}{stats["mean_us"]:>10}{stats["p50_us"]:>10}{stats["p99_us"]:>10}{stats["rps"]:>10}')
+
+        console = SlowConsole(args.console_us)
+        listener = configure_logging('INFO', stream=console, queue_size=args.requests + 1)
+        request_log = RequestLog(500)
+        stats = measure(lambda: request_log.record('GET', '/api/volume/<action>', 'up', PARAMS, 202, 0.4, '127.0.0.1'),
+                        args.requests, threads)
+        listener.stop()
+        print(f'{"async":<8}{threads:>6}{stats["mean_us"]:>10}{stats["p50_us"]:>10}{stats["p99_us"]:>10}{stats["rps"]:>10}'
+              f'   后台写出 {console.writes} 行')
+    logging.getLogger().handlers.clear()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
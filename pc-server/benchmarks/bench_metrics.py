@@ -0,0 +1,70 @@
+"""请求指标开销基准测试
+
+测量 RequestMetrics 在请求线程上的记录开销（每个请求一次 observe_request，每个输入命令一次 observe_command），
+以及序列数较多时抓取 /api/metrics 的耗时。
+
+用法:
+    python benchmarks/bench_metrics.py
+    python benchmarks/bench_metrics.py --requests 200000 --routes 40 --threads 1 8
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from request_metrics import RequestMetrics  # noqa: E402
+
+
+def record(metrics: RequestMetrics, count: int, routes: int, seed: int):
+    """记录 count 个请求"""
+    rng = random.Random(seed)
+    keys = [(f'/api/route{i % routes}/<action>', f'action{i}') for i in range(routes * 4)]
+    samples = [(rng.choice(keys), rng.choice((200, 200, 200, 202, 400)), rng.random() * 0.01) for _ in range(1000)]
+    for i in range(count):
+        (route, action), status, seconds = samples[i % 1000]
+        metrics.request_started()
+        metrics.observe_request('GET', route, action, status,
+                                {'parse': seconds / 10, 'handler': seconds, 'serialize': seconds / 20, 'total': seconds})
+        metrics.request_finished()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='请求指标开销基准测试')
+    parser.add_argument('--requests', type=int, default=100000)
+    parser.add_argument('--routes', type=int, default=30, help='不同路由数（每个路由 4 个动作）')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8])
+    args = parser.parse_args()
+
+    for threads in args.threads:
+        metrics = RequestMetrics()
+        per_thread = args.requests // threads
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            start = time.perf_counter()
+            list(pool.map(lambda seed: record(metrics, per_thread, args.routes, seed), range(threads)))
+            elapsed = time.perf_counter() - start
+        # 有 GIL 时各线程的记录是串行的，用总耗时除以总次数得到每次记录的开销
+        total = per_thread * threads
+        print(f'{threads} 线程: 每个请求记录 {elapsed / total * 1e6:.2f}µs，合计 {total / elapsed:,.0f} 次/秒')
+
+    start = time.perf_counter()
+    for i in range(args.requests // 10):
+        metrics.observe_command(f'command{i % 20}', 0.0001, 0.002, 'success')
+    print(f'输入命令记录 {(time.perf_counter() - start) / (args.requests // 10) * 1e6:.2f}µs/次')
+
+    for name, scrape in (('prometheus', metrics.prometheus), ('json', metrics.snapshot)):
+        start = time.perf_counter()
+        for _ in range(20):
+            output = scrape()
+        size = len(output) if isinstance(output, str) else len(output['routes'])
+        print(f'抓取 {name}: {(time.perf_counter() - start) / 20 * 1000:.2f}ms'
+              + (f'，{size / 1024:.0f}KB' if isinstance(output, str) else ''))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""屏幕推流基准测试
+
+用合成画面（1920x1080，移动方块 + 每秒变化的时钟）测试脏区域编码，
+输出每种编码的最高帧率、平均每帧字节数和关键帧（整屏）字节数；
+--http 时在进程内启动模拟后端服务器，通过 /api/screen/stream 按目标帧率拉流。
+
+用法:
+    python benchmarks/bench_screen.py
+    python benchmarks/bench_screen.py --frames 300 --max-width 1920 --max-height 1080 --codec zlib
+    python benchmarks/bench_screen.py --http --fps 30
+"""
+import argparse
+import http.client
+import os
+import sys
+import time
+from typing import Optional
+from urllib.parse import urlencode, urlparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from screen_capture import SyntheticFrameSource  # noqa: E402
+from screen_stream import FRAME_HEADER, REGION_HEADER, ScreenStreamer, available_codecs  # noqa: E402
+
+
+def bench_encoder(codec: str, args) -> dict:
+    """不限速连续编码，测量编码管线本身的吞吐"""
+    streamer = ScreenStreamer(lambda: SyntheticFrameSource(1920, 1080, fps=args.fps), max_streams=1)
+    session = streamer.open(args.fps, args.max_width, args.max_height, codec, args.quality, args.tile)
+    start = time.perf_counter()
+    for _ in session.frames(args.frames, throttle=False):
+        pass
+    elapsed = time.perf_counter() - start
+    stats = streamer.stats()
+    stats['fps'] = round(stats['frames'] / elapsed, 1)
+    stats['size'] = f'{session.width}x{session.height}'
+    return stats
+
+
+def read_exact(response, size: int) -> Optional[bytes]:
+    data = response.read(size)
+    return data if len(data) == size else None
+
+
+def bench_http(codec: str, args) -> dict:
+    """经 HTTP 拉流，统计实际到达的帧率和字节数"""
+    from bench_http import start_local_server
+    base_url, _ = start_local_server()
+    parsed = urlparse(base_url)
+    params = {'fps': args.fps, 'max_width': args.max_width, 'max_height': args.max_height,
+              'codec': codec, 'quality': args.quality, 'tile': args.tile, 'frames': args.frames}
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=30)
+    conn.request('GET', f'/api/screen/stream?{urlencode(params)}')
+    response = conn.getresponse()
+    if response.status != 200:
+        raise RuntimeError(f'拉流失败: {response.status} {response.read()[:200]!r}')
+
+    frames, total_bytes, regions = 0, 0, 0
+    start = time.perf_counter()
+    while True:
+        header = read_exact(response, FRAME_HEADER.size)
+        if header is None:
+            break
+        *_, count = FRAME_HEADER.unpack(header)
+        size = FRAME_HEADER.size
+        for _ in range(count):
+            x, y, w, h, length = REGION_HEADER.unpack(read_exact(response, REGION_HEADER.size))
+            read_exact(response, length)
+            size += REGION_HEADER.size + length
+        frames += 1
+        regions += count
+        total_bytes += size
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return {
+        'frames': frames,
+        'fps': round(frames / elapsed, 1) if elapsed else 0.0,
+        'avg_bytes_per_frame': round(total_bytes / frames) if frames else 0,
+        'regions': regions,
+        'size': response.getheader('X-Frame-Size'),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='屏幕推流基准测试')
+    parser.add_argument('--frames', type=int, default=120)
+    parser.add_argument('--fps', type=int, default=30, help='合成画面帧率 / --http 时的目标帧率')
+    parser.add_argument('--max-width', type=int, default=1280)
+    parser.add_argument('--max-height', type=int, default=720)
+    parser.add_argument('--quality', type=int, default=70)
+    parser.add_argument('--tile', type=int, default=64)
+    parser.add_argument('--codec', choices=['zlib', 'jpeg', 'webp'], help='默认测试所有可用编码')
+    parser.add_argument('--http', action='store_true', help='经 /api/screen/stream 拉流')
+    args = parser.parse_args()
+
+    codecs = [args.codec] if args.codec else available_codecs()
+    print(f'合成画面 1920x1080 -> 上限 {args.max_width}x{args.max_height}，{args.frames} 帧，tile {args.tile}')
+    for codec in codecs:
+        if args.http:
+            stats = bench_http(codec, args)
+            print(f"{codec:<5} HTTP  {stats['size']:>10}  {stats['fps']:7.1f} fps  "
+                  f"平均 {stats['avg_bytes_per_frame']:>8} B/帧  区域 {stats['regions']}")
+        else:
+            stats = bench_encoder(codec, args)
+            print(f"{codec:<5} {stats['size']:>10}  {stats['fps']:7.1f} fps  "
+                  f"平均 {stats['avg_bytes_per_frame']:>8} B/帧  关键帧 {stats['keyframe_bytes']:>9} B  "
+                  f"截屏 {stats['avg_capture_ms']:.2f}ms  编码 {stats['avg_encode_ms']:.2f}ms  "
+                  f"区域 {stats['regions']}  跳过 {stats['skipped']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
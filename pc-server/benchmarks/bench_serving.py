@@ -0,0 +1,167 @@
+"""服务模式对比负载测试
+
+以模拟后端把 server.py 作为子进程分别按几种模式启动，用相同的只读请求压测并对比吞吐和延迟:
+    dev       Flask 开发服务器（--debug，自动重载 + 调试器，旧的默认方式）
+    werkzeug  多线程 werkzeug，关闭重载和调试器（每个响应后关闭连接）
+    waitress  waitress 线程池（需要 pip install waitress）
+
+每种模式分别测试持久连接（keep-alive）和每个请求新建连接两种客户端。
+
+用法:
+    python benchmarks/bench_serving.py
+    python benchmarks/bench_serving.py --duration 10 --clients 16 --modes werkzeug waitress
+"""
+import argparse
+import http.client
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SERVER = os.path.join(os.path.dirname(HERE), 'server.py')
+
+MODES = {
+    'dev': ['--debug'],
+    'werkzeug': ['--server', 'werkzeug'],
+    'waitress': ['--server', 'waitress'],
+}
+PATHS = ['/api/test', '/api/info', '/api/input/stats', '/api/system/metrics?from=-60',
+         '/api/window/list?q=code', '/api/app/processes?limit=20']
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode: str, port: int, threads: int) -> subprocess.Popen:
+    env = dict(os.environ, REMOTE_PC_BACKEND='simulated', REMOTE_PC_APP_INDEX='', REMOTE_PC_WS_PORT=str(free_port()))
+    command = [sys.executable, SERVER, '--host', '127.0.0.1', '--port', str(port), '--threads', str(threads),
+               *MODES[mode]]
+    kwargs = {'start_new_session': True} if os.name != 'nt' else \
+        {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **kwargs)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/api/test')
+            if conn.getresponse().status == 200:
+                conn.close()
+                return process
+        except OSError:
+            time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f'{mode} 模式启动超时')
+
+
+def stop_server(process: subprocess.Popen):
+    """结束服务器及其子进程（调试模式的重载器会再启动一个进程）"""
+    if os.name == 'nt':
+        subprocess.run(['taskkill', '/F', '/T', '/PID', str(process.pid)], capture_output=True)
+    else:
+        os.killpg(process.pid, signal.SIGTERM)
+    process.wait(timeout=10)
+
+
+def load(port: int, clients: int, duration: float, keep_alive: bool) -> dict:
+    """clients 个线程在 duration 秒内循环请求"""
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client(seed: int):
+        rng = random.Random(seed)
+        conn: Optional[http.client.HTTPConnection] = None
+        local: List[float] = []
+        failed = 0
+        while time.perf_counter() < stop_at:
+            if conn is None:
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            start = time.perf_counter()
+            try:
+                conn.request('GET', rng.choice(PATHS))
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    failed += 1
+                local.append(time.perf_counter() - start)
+                if not keep_alive or response.will_close:
+                    conn.close()
+                    conn = None
+            except OSError:
+                failed += 1
+                conn.close()
+                conn = None
+        if conn is not None:
+            conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    count = len(latencies)
+    return {
+        'requests': count,
+        'errors': errors[0],
+        'rps': round(count / elapsed, 1),
+        'p50_ms': round(latencies[count // 2] * 1000, 2) if count else 0.0,
+        'p95_ms': round(latencies[min(int(count * 0.95), count - 1)] * 1000, 2) if count else 0.0,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='服务模式对比负载测试')
+    parser.add_argument('--duration', type=float, default=5.0, help='每项测试的秒数')
+    parser.add_argument('--clients', type=int, default=8, help='并发客户端数')
+    parser.add_argument('--threads', type=int, default=8, help='服务器工作线程数（waitress）')
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+    args = parser.parse_args()
+
+    results: Dict[str, Dict[str, dict]] = {}
+    for mode in args.modes:
+        port = free_port()
+        try:
+            process = start_server(mode, port, args.threads)
+        except RuntimeError as e:
+            print(f'{mode:<9} 跳过: {e}')
+            continue
+        try:
+            results[mode] = {
+                'keep-alive': load(port, args.clients, args.duration, keep_alive=True),
+                'new-conn': load(port, args.clients, args.duration, keep_alive=False),
+            }
+        finally:
+            stop_server(process)
+
+    print(f'\n{args.clients} 个并发客户端，每项 {args.duration}s')
+    print(f'{"模式":<10}{"连接":<12}{"req/s":>9}{"p50 ms":>9}{"p95 ms":>9}{"错误":>6}')
+    for mode, by_client in results.items():
+        for kind, stats in by_client.items():
+            print(f'{mode:<10}{kind:<12}{stats["rps"]:>9}{stats["p50_ms"]:>9}{stats["p95_ms"]:>9}{stats["errors"]:>6}')
+    if 'dev' in results:
+        baseline = results['dev']['new-conn']['rps']
+        for mode, by_client in results.items():
+            if mode != 'dev' and baseline:
+                best = max(stats['rps'] for stats in by_client.values())
+                print(f'{mode} 最高吞吐是 dev 模式的 {best / baseline:.1f} 倍')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""UDP 与 HTTP 命令路径的延迟对比
+
+在进程内以模拟后端启动 HTTP 服务器和 UDP 监听器，分别发送同一条媒体命令，
+比较往返延迟（UDP 使用 ACK 标志测量往返）。
+
+用法:
+    python benchmarks/bench_udp.py [--requests 500]
+"""
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from bench_http import percentile, send_request, start_local_server  # noqa: E402
+
+
+def report(name: str, latencies, lost: int = 0):
+    values = sorted(latencies)
+    print(f"{name:<22} p50 {percentile(values, 50) * 1000:8.3f}ms  "
+          f"p95 {percentile(values, 95) * 1000:8.3f}ms  "
+          f"p99 {percentile(values, 99) * 1000:8.3f}ms  丢失 {lost}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='UDP/HTTP 延迟对比')
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    base_url, _ = start_local_server()
+    from server import execute_command
+    from udp_channel import UdpCommandListener
+    from udp_client import UdpCommandClient
+
+    key = b'bench-key'
+    listener = UdpCommandListener(execute_command, key, host='127.0.0.1', port=0)
+    listener.start()
+    client = UdpCommandClient('127.0.0.1', listener.port, key)
+
+    http_latencies = []
+    for _ in range(args.requests):
+        _, latency = send_request(base_url, 'GET', '/api/media/next', {})
+        http_latencies.append(latency)
+
+    udp_latencies, lost = [], 0
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        if client.send('media', 'next', ack=True) is None:
+            lost += 1
+            continue
+        udp_latencies.append(time.perf_counter() - start)
+
+    fire_start = time.perf_counter()
+    for _ in range(args.requests):
+        client.send('media', 'next')
+    fire_elapsed = time.perf_counter() - fire_start
+
+    print(f'{args.requests} 次 /api/media/next（模拟后端，回环地址）')
+    report('HTTP', http_latencies)
+    report('UDP (ack)', udp_latencies, lost)
+    print(f"{'UDP (即发即弃)':<22} 平均发送耗时 {fire_elapsed / args.requests * 1000:8.3f}ms")
+    print(f'监听器统计: {listener.stats()}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
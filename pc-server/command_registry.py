@@ -0,0 +1,287 @@
+import hashlib
+import json
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from input_engine import parse_key_combo
+
+TRUE_VALUES = ('true', '1', 'yes')
+PARAM_TYPES = ('int', 'float', 'bool', 'str', 'list', 'keys', 'any')
+
+# 执行方式: direct 在请求线程中直接调用, input 交给输入派发线程, steps 交给步进合并器
+MODES = ('direct', 'input', 'steps')
+
+
+def parse_list(value) -> list:
+    """解析列表参数，支持数组、JSON 数组字符串和逗号分隔的字符串"""
+    if value is None or value == '':
+        return []
+    if isinstance(value, str):
+        value = value.strip()
+        if value.startswith('['):
+            value = json.loads(value)
+        else:
+            return [item.strip() for item in value.split(',') if item.strip()]
+    if isinstance(value, (int, float)):
+        return [value]
+    if not isinstance(value, list):
+        raise ValueError('列表参数格式错误')
+    return value
+
+
+def parse_keys(keys):
+    """解析按键列表，支持 JSON 字符串和 'ctrl+c' 形式的按键名；格式错误返回 None"""
+    if isinstance(keys, str):
+        try:
+            keys = json.loads(keys)
+        except ValueError:
+            try:
+                keys = parse_key_combo(keys)
+            except ValueError:
+                return None
+    return keys if isinstance(keys, list) else None
+
+
+@dataclass(frozen=True)
+class Param:
+    """命令参数声明；缺省或空字符串时取 default"""
+    name: str
+    type: str = 'str'
+    default: Any = None
+    required: bool = False
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    choices: Optional[Tuple[str, ...]] = None
+    description: str = ''
+
+    def parse(self, data: dict):
+        """从请求数据中取值并转换类型，格式错误时抛出 ValueError"""
+        value = data.get(self.name)
+        if value is None or value == '':
+            if self.required:
+                raise ValueError(f'缺少参数: {self.name}')
+            return self.default
+        if self.type == 'bool':
+            return value if isinstance(value, bool) else str(value).lower() in TRUE_VALUES
+        if self.type in ('int', 'float'):
+            try:
+                value = int(value) if self.type == 'int' else float(value)
+            except (ValueError, TypeError):
+                raise ValueError(f'{self.name} 必须是{"整数" if self.type == "int" else "数字"}')
+            if self.minimum is not None and value < self.minimum:
+                raise ValueError(f'{self.name} 不能小于 {self.minimum}')
+            if self.maximum is not None and value > self.maximum:
+                raise ValueError(f'{self.name} 不能大于 {self.maximum}')
+            return value
+        if self.type == 'list':
+            try:
+                return parse_list(value)
+            except (ValueError, TypeError):
+                raise ValueError(f'{self.name} 必须是数组、JSON 数组或逗号分隔的字符串')
+        if self.type == 'keys':
+            keys = parse_keys(value)
+            if keys is None:
+                raise ValueError(f'{self.name} 必须是数组、JSON 数组或 ctrl+c 形式的组合键')
+            return keys
+        if self.type == 'str':
+            value = str(value)
+            if self.choices and value not in self.choices:
+                raise ValueError(f'{self.name} 必须是 {" / ".join(self.choices)} 之一')
+        return value
+
+    def describe(self) -> dict:
+        info = {'type': self.type}
+        if self.required:
+            info['required'] = True
+        elif self.default is not None:
+            info['default'] = self.default
+        if self.minimum is not None:
+            info['minimum'] = self.minimum
+        if self.maximum is not None:
+            info['maximum'] = self.maximum
+        if self.choices:
+            info['choices'] = list(self.choices)
+        if self.description:
+            info['description'] = self.description
+        return info
+
+
+@dataclass(frozen=True)
+class Command:
+    """一条命令：类别、操作、参数声明和执行函数
+
+    func 接收解析后的参数字典；direct / input 模式返回结果字典，steps 模式返回带符号的步数。
+    check 做跨参数的校验，返回错误信息或 None。
+    """
+    category: str
+    action: str
+    func: Callable[[dict], Any]
+    mode: str = 'direct'
+    params: Tuple[Param, ...] = ()
+    description: str = ''
+    methods: Tuple[str, ...] = ('GET', 'POST')
+    route: Optional[str] = None
+    check: Optional[Callable[[dict], Optional[str]]] = None
+    example: Optional[dict] = None
+
+    @property
+    def name(self) -> str:
+        return f'{self.category}_{self.action}'
+
+    @property
+    def path(self) -> str:
+        return self.route or f'/api/{self.category}/{self.action}'
+
+    def parse(self, data: dict) -> dict:
+        """按参数声明解析请求数据，未声明的参数原样保留（例如 wait）"""
+        params = dict(data)
+        for param in self.params:
+            params[param.name] = param.parse(data)
+        if self.check is not None:
+            error = self.check(params)
+            if error:
+                raise ValueError(error)
+        return params
+
+
+@dataclass
+class _Category:
+    description: str = ''
+    # 准入控制的通道
+    lane: str = 'input'
+    commands: Dict[str, Command] = field(default_factory=dict)
+    # 不属于命令的相关端点: (路径, 说明, 参数说明)
+    endpoints: List[Tuple[str, str, Optional[dict]]] = field(default_factory=list)
+
+
+class CommandRegistry:
+    """命令注册表 - 启动时注册一次，REST 分发、命令通道、批量、宏校验和 /api/info 都从这里生成
+
+    runners 按执行方式把 (命令, 参数) 转成 (结果, HTTP 状态码)，由服务器提供。
+    """
+
+    def __init__(self, runners: Dict[str, Callable[[Command, dict], Tuple[dict, int]]]):
+        self.runners = runners
+        self._categories: Dict[str, _Category] = {}
+        self._commands: Dict[Tuple[str, str], Command] = {}
+        self._lock = threading.Lock()
+        self._version = 0
+        self._document: Optional[Tuple[int, bytes, str]] = None
+
+    # =================== 注册 ===================
+    def category(self, name: str, description: str, lane: str = 'input'):
+        """声明类别说明和准入控制通道"""
+        with self._lock:
+            entry = self._categories.setdefault(name, _Category())
+            entry.description = description
+            entry.lane = lane
+            self._version += 1
+
+    def add(self, category: str, action: str, func: Callable[[dict], Any], **options) -> Command:
+        """注册命令，options 为 Command 的其余字段"""
+        command = Command(category, action, func, **options)
+        if command.mode not in self.runners:
+            raise ValueError(f'未知的执行方式: {command.mode}')
+        for param in command.params:
+            if param.type not in PARAM_TYPES:
+                raise ValueError(f'未知的参数类型: {param.type}')
+        with self._lock:
+            if (category, action) in self._commands:
+                raise ValueError(f'命令已存在: {category}/{action}')
+            self._commands[(category, action)] = command
+            self._categories.setdefault(category, _Category()).commands[action] = command
+            self._version += 1
+        return command
+
+    def add_endpoint(self, category: str, path: str, description: str, parameters: Optional[dict] = None):
+        """登记不经过命令分发的端点（流、缩略图、统计等），只用于 /api/info"""
+        with self._lock:
+            self._categories.setdefault(category, _Category()).endpoints.append((path, description, parameters))
+            self._version += 1
+
+    # =================== 查询与执行 ===================
+    def get(self, category: str, action: str) -> Optional[Command]:
+        return self._commands.get((category, action))
+
+    def lane(self, category: str) -> str:
+        entry = self._categories.get(category)
+        return entry.lane if entry else 'input'
+
+    def has_category(self, category: str) -> bool:
+        entry = self._categories.get(category)
+        return entry is not None and bool(entry.commands)
+
+    def actions(self, category: str) -> List[str]:
+        entry = self._categories.get(category)
+        return list(entry.commands) if entry else []
+
+    def commands(self) -> List[Command]:
+        return list(self._commands.values())
+
+    def validate(self, category: str, action: str) -> bool:
+        return (category, action) in self._commands
+
+    def execute(self, category: str, action: str, data: dict) -> Tuple[dict, int]:
+        """解析参数并执行命令，返回 (结果, HTTP 状态码)"""
+        command = self._commands.get((category, action))
+        if command is None:
+            result = {'success': False, 'message': f'不支持的操作: {category}/{action}'}
+            if self.has_category(category):
+                result['available_actions'] = self.actions(category)
+            return result, 400
+        return self.run(command, data)
+
+    def run(self, command: Command, data: dict) -> Tuple[dict, int]:
+        try:
+            params = command.parse(data)
+        except ValueError as e:
+            result = {'success': False, 'message': str(e)}
+            if command.example is not None:
+                result['example'] = command.example
+            return result, 400
+        return self.runners[command.mode](command, params)
+
+    # =================== API 文档 ===================
+    def describe(self) -> Dict[str, dict]:
+        """按类别生成端点和参数说明"""
+        categories = {}
+        for name, entry in self._categories.items():
+            info: dict = {
+                'endpoints': [c.path for c in entry.commands.values()] + [path for path, _, _ in entry.endpoints],
+                'description': entry.description,
+            }
+            if entry.commands:
+                info['lane'] = entry.lane
+            commands = {}
+            for action, command in entry.commands.items():
+                spec: dict = {'path': command.path, 'methods': list(command.methods)}
+                if command.description:
+                    spec['description'] = command.description
+                if command.mode != 'direct':
+                    spec['queued'] = True
+                if command.params:
+                    spec['parameters'] = {param.name: param.describe() for param in command.params}
+                if command.example is not None:
+                    spec['example'] = command.example
+                commands[action] = spec
+            if commands:
+                info['commands'] = commands
+            endpoints = {path: {'description': description, **({'parameters': parameters} if parameters else {})}
+                         for path, description, parameters in entry.endpoints}
+            if endpoints:
+                info['other_endpoints'] = endpoints
+            categories[name] = info
+        return categories
+
+    def document(self, build: Callable[[Dict[str, dict]], dict]) -> Tuple[bytes, str]:
+        """预先序列化的 API 文档和 ETag；注册表变化后才重新生成"""
+        cached = self._document
+        if cached is not None and cached[0] == self._version:
+            return cached[1], cached[2]
+        with self._lock:
+            version = self._version
+        body = json.dumps(build(self.describe()), ensure_ascii=False, sort_keys=True).encode('utf-8')
+        etag = hashlib.sha1(body).hexdigest()
+        self._document = (version, body, etag)
+        return body, etag
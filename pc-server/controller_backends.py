@@ -0,0 +1,748 @@
+import ctypes
+from ctypes import wintypes
+import itertools
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import zlib
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union
+
+from input_engine import InputEngine, RecordingInputEngine, SendInputEngine
+from screen_capture import BYTES_PER_PIXEL, FrameSource, GdiFrameSource, SyntheticFrameSource, gdi_capture_window
+
+
+@dataclass
+class ProcessInfo:
+    """进程信息"""
+    pid: int
+    name: str
+    executable: str
+    memory_usage: int
+    # 启动时间（unix 秒），与 pid 一起唯一确定一个进程；拿不到时为 0
+    create_time: float = 0.0
+
+
+@dataclass
+class WindowInfo:
+    """窗口信息"""
+    hwnd: int
+    title: str
+    class_name: str
+    rect: Tuple[int, int, int, int]
+    is_visible: bool
+    pid: int = 0
+
+
+# 窗口事件回调: (事件, hwnd)，事件为 created / destroyed / changed
+WindowEventCallback = Callable[[str, int], None]
+
+# spawn 返回的进程句柄，都有 pid 和 poll()
+ChildProcess = Union[subprocess.Popen, 'SimulatedChild']
+
+
+class ControllerBackend:
+    """控制器后端接口 - 封装所有与操作系统直接打交道的调用"""
+    name = 'base'
+
+    def create_input_engine(self) -> InputEngine:
+        raise NotImplementedError
+
+    def create_frame_source(self) -> FrameSource:
+        """创建截屏来源，每个推流会话一个"""
+        raise NotImplementedError
+
+    # 窗口
+    def get_foreground_window(self) -> int:
+        raise NotImplementedError
+
+    def get_window_info(self, hwnd: int) -> Optional[WindowInfo]:
+        raise NotImplementedError
+
+    def show_window(self, hwnd: int, state: int) -> None:
+        raise NotImplementedError
+
+    def focus_window(self, hwnd: int) -> None:
+        """把窗口切到前台，最小化的窗口先恢复"""
+        raise NotImplementedError
+
+    def close_window(self, hwnd: int) -> None:
+        raise NotImplementedError
+
+    def enumerate_windows(self) -> List[WindowInfo]:
+        """枚举所有顶层窗口"""
+        raise NotImplementedError
+
+    def watch_windows(self, callback: WindowEventCallback) -> bool:
+        """订阅顶层窗口的创建/销毁/变化事件；不支持时返回 False"""
+        return False
+
+    def capture_window(self, hwnd: int, width: int, height: int) -> Optional[bytearray]:
+        """把窗口内容缩放到 width x height 返回 BGRX 像素；无法截取（如已最小化）时返回 None"""
+        raise NotImplementedError
+
+    # 进程
+    def app_exists(self, app_path: str) -> bool:
+        raise NotImplementedError
+
+    def spawn(self, argv: List[str], working_dir: Optional[str]) -> ChildProcess:
+        """直接执行 argv[0]（不经过 shell），返回可以 poll() 的进程句柄"""
+        raise NotImplementedError
+
+    def shell_open(self, path: str, args: str, working_dir: Optional[str]) -> None:
+        """交给系统外壳打开快捷方式等不能直接执行的文件，拿不到 pid"""
+        raise NotImplementedError
+
+    def close_process_windows(self, pid: int, hwnds: Optional[List[int]] = None) -> int:
+        """向进程的所有可见顶层窗口投递 WM_CLOSE（不等待），返回窗口数
+
+        hwnds 为调用方已知的候选窗口（例如来自窗口索引），传入时不再枚举，只核对窗口仍属于该进程。
+        """
+        raise NotImplementedError
+
+    def terminate_process(self, pid: int) -> None:
+        """强制结束进程；进程不存在时抛出 ProcessLookupError，没有权限时抛出 PermissionError"""
+        raise NotImplementedError
+
+    def process_info(self, pid: int) -> Optional[ProcessInfo]:
+        """实时查询单个进程（不经过进程表快照）；进程不存在时返回 None，没有权限时名称等字段可能为空"""
+        raise NotImplementedError
+
+    def wait_process(self, pid: int, timeout: float) -> bool:
+        """等待进程退出，返回是否已退出（不存在也算已退出）"""
+        raise NotImplementedError
+
+    def list_processes(self) -> List[ProcessInfo]:
+        raise NotImplementedError
+
+    # 系统
+    def lock_workstation(self) -> None:
+        raise NotImplementedError
+
+    def power(self, action: str, force: bool = False) -> None:
+        """电源操作: shutdown / restart / sleep"""
+        raise NotImplementedError
+
+    def platform_info(self) -> dict:
+        """不会变化的系统信息"""
+        return {
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'architecture': platform.architecture(),
+        }
+
+    def sample_metrics(self, metrics: Set[str]) -> dict:
+        """采集一次系统指标，metrics 为 cpu / per_cpu / memory / disk / network 的子集"""
+        raise NotImplementedError
+
+
+class Win32Backend(ControllerBackend):
+    """真实的 Win32 后端"""
+    name = 'win32'
+
+    def __init__(self):
+        self.user32 = ctypes.windll.user32
+        self.kernel32 = ctypes.windll.kernel32
+        self.shell32 = ctypes.windll.shell32
+        self.psapi = ctypes.windll.psapi
+        # 进程句柄在 64 位下不能按 int 截断，单独加载并声明签名
+        self._kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        self._kernel32.OpenProcess.restype = wintypes.HANDLE
+        self._kernel32.OpenProcess.argtypes = [wintypes.DWORD, wintypes.BOOL, wintypes.DWORD]
+        self._kernel32.TerminateProcess.argtypes = [wintypes.HANDLE, wintypes.UINT]
+        self._kernel32.WaitForSingleObject.argtypes = [wintypes.HANDLE, wintypes.DWORD]
+        self._kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+        self._kernel32.QueryFullProcessImageNameW.argtypes = [wintypes.HANDLE, wintypes.DWORD, wintypes.LPWSTR,
+                                                              ctypes.POINTER(wintypes.DWORD)]
+        self._kernel32.GetProcessTimes.argtypes = [wintypes.HANDLE] + [ctypes.POINTER(wintypes.FILETIME)] * 4
+
+    def create_input_engine(self) -> InputEngine:
+        return SendInputEngine()
+
+    def create_frame_source(self) -> FrameSource:
+        return GdiFrameSource()
+
+    def get_foreground_window(self) -> int:
+        return self.user32.GetForegroundWindow() or 0
+
+    def get_window_info(self, hwnd: int) -> Optional[WindowInfo]:
+        if not self.user32.IsWindow(hwnd):
+            return None
+
+        # 获取窗口标题
+        title_length = self.user32.GetWindowTextLengthW(hwnd)
+        title_buffer = ctypes.create_unicode_buffer(title_length + 1)
+        self.user32.GetWindowTextW(hwnd, title_buffer, title_length + 1)
+
+        # 获取窗口类名
+        class_buffer = ctypes.create_unicode_buffer(256)
+        self.user32.GetClassNameW(hwnd, class_buffer, 256)
+
+        # 获取窗口位置和大小
+        rect = wintypes.RECT()
+        self.user32.GetWindowRect(hwnd, ctypes.byref(rect))
+
+        # 获取所属进程
+        pid = wintypes.DWORD()
+        self.user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+
+        return WindowInfo(
+            hwnd=hwnd,
+            title=title_buffer.value,
+            class_name=class_buffer.value,
+            rect=(rect.left, rect.top, rect.right, rect.bottom),
+            is_visible=bool(self.user32.IsWindowVisible(hwnd)),
+            pid=pid.value
+        )
+
+    def show_window(self, hwnd: int, state: int) -> None:
+        self.user32.ShowWindow(hwnd, state)
+
+    def focus_window(self, hwnd: int) -> None:
+        SW_RESTORE = 9
+        if self.user32.IsIconic(hwnd):
+            self.user32.ShowWindow(hwnd, SW_RESTORE)
+        # 前台锁定时 SetForegroundWindow 只会让任务栏闪烁。把本线程的输入状态临时挂到当前前台窗口的线程上，
+        # 系统会把这次调用当作前台线程发起的；不注入按键，不会和派发线程的按键（例如正在按住的键）交错
+        current = self.kernel32.GetCurrentThreadId()
+        foreground = self.user32.GetForegroundWindow()
+        target = self.user32.GetWindowThreadProcessId(foreground, None) if foreground else 0
+        attached = bool(target and target != current and self.user32.AttachThreadInput(current, target, True))
+        try:
+            self.user32.BringWindowToTop(hwnd)
+            self.user32.SetForegroundWindow(hwnd)
+        finally:
+            if attached:
+                self.user32.AttachThreadInput(current, target, False)
+
+    def close_window(self, hwnd: int) -> None:
+        WM_CLOSE = 0x0010
+        self.user32.SendMessageW(hwnd, WM_CLOSE, 0, 0)
+
+    def enumerate_windows(self) -> List[WindowInfo]:
+        hwnds = []
+        enum_proc = ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)
+
+        def collect(hwnd, _):
+            hwnds.append(hwnd)
+            return True
+
+        self.user32.EnumWindows(enum_proc(collect), 0)
+        windows = (self.get_window_info(hwnd) for hwnd in hwnds)
+        return [window for window in windows if window is not None]
+
+    def capture_window(self, hwnd: int, width: int, height: int) -> Optional[bytearray]:
+        return gdi_capture_window(hwnd, width, height)
+
+    def watch_windows(self, callback: WindowEventCallback) -> bool:
+        """用 SetWinEventHook 订阅事件；钩子需要消息循环，放在单独的线程里"""
+        EVENT_OBJECT_CREATE = 0x8000
+        EVENT_OBJECT_DESTROY = 0x8001
+        EVENT_OBJECT_SHOW = 0x8002
+        EVENT_OBJECT_HIDE = 0x8003
+        EVENT_OBJECT_LOCATIONCHANGE = 0x800B
+        EVENT_OBJECT_NAMECHANGE = 0x800C
+        OBJID_WINDOW = 0
+        GA_ROOT = 2
+        kinds = {
+            EVENT_OBJECT_CREATE: 'created',
+            EVENT_OBJECT_DESTROY: 'destroyed',
+            EVENT_OBJECT_SHOW: 'changed',
+            EVENT_OBJECT_HIDE: 'changed',
+            EVENT_OBJECT_LOCATIONCHANGE: 'changed',
+            EVENT_OBJECT_NAMECHANGE: 'changed',
+        }
+        win_event_proc = ctypes.WINFUNCTYPE(None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+                                            wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+
+        def handle(hook, event, hwnd, id_object, id_child, thread_id, event_time):
+            kind = kinds.get(event)
+            if kind is None or not hwnd or id_object != OBJID_WINDOW or id_child != 0:
+                return
+            # 只关心顶层窗口；已销毁的窗口无法再查询，直接交给索引判断
+            if kind != 'destroyed' and self.user32.GetAncestor(hwnd, GA_ROOT) != hwnd:
+                return
+            try:
+                callback(kind, hwnd)
+            except Exception:
+                pass
+
+        # 回调对象必须一直被引用，否则会被回收
+        self._win_event_proc = win_event_proc(handle)
+        ready = threading.Event()
+        hooked = []
+
+        def run():
+            hook = self.user32.SetWinEventHook(EVENT_OBJECT_CREATE, EVENT_OBJECT_NAMECHANGE, 0,
+                                               self._win_event_proc, 0, 0, 0)  # WINEVENT_OUTOFCONTEXT
+            hooked.append(bool(hook))
+            ready.set()
+            if not hook:
+                return
+            msg = wintypes.MSG()
+            while self.user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+                self.user32.TranslateMessage(ctypes.byref(msg))
+                self.user32.DispatchMessageW(ctypes.byref(msg))
+
+        threading.Thread(target=run, name='win-event-hook', daemon=True).start()
+        ready.wait(5)
+        return bool(hooked and hooked[0])
+
+    def app_exists(self, app_path: str) -> bool:
+        # 先判断是否是绝对路径
+        if os.path.isabs(app_path):
+            return os.path.exists(app_path)
+        # 否则尝试在 PATH 里查找
+        return shutil.which(app_path) is not None
+
+    def spawn(self, argv: List[str], working_dir: Optional[str]) -> ChildProcess:
+        return subprocess.Popen(argv, cwd=working_dir, stdin=subprocess.DEVNULL)
+
+    def shell_open(self, path: str, args: str, working_dir: Optional[str]) -> None:
+        os.startfile(path, arguments=args, cwd=working_dir)
+
+    def _open_process(self, pid: int, access: int):
+        ERROR_ACCESS_DENIED = 5
+        ERROR_INVALID_PARAMETER = 87
+        handle = self._kernel32.OpenProcess(access, False, pid)
+        if handle:
+            return handle
+        error = ctypes.get_last_error()
+        if error == ERROR_INVALID_PARAMETER:
+            raise ProcessLookupError(f'进程不存在: {pid}')
+        if error == ERROR_ACCESS_DENIED:
+            raise PermissionError(f'没有权限操作进程: {pid}')
+        raise ctypes.WinError(error)
+
+    def close_process_windows(self, pid: int, hwnds: Optional[List[int]] = None) -> int:
+        WM_CLOSE = 0x0010
+        if hwnds is None:
+            hwnds = [window.hwnd for window in self.enumerate_windows() if window.is_visible]
+        owner = wintypes.DWORD()
+        closed = 0
+        for hwnd in hwnds:
+            # 候选窗口可能已经关闭、句柄被复用，投递前核对所属进程
+            if not self.user32.IsWindowVisible(hwnd):
+                continue
+            self.user32.GetWindowThreadProcessId(hwnd, ctypes.byref(owner))
+            if owner.value == pid:
+                # PostMessage 不会被无响应的窗口卡住
+                self.user32.PostMessageW(hwnd, WM_CLOSE, 0, 0)
+                closed += 1
+        return closed
+
+    def terminate_process(self, pid: int) -> None:
+        PROCESS_TERMINATE = 0x0001
+        handle = self._open_process(pid, PROCESS_TERMINATE)
+        try:
+            if not self._kernel32.TerminateProcess(handle, 1):
+                raise ctypes.WinError(ctypes.get_last_error())
+        finally:
+            self._kernel32.CloseHandle(handle)
+
+    def process_info(self, pid: int) -> Optional[ProcessInfo]:
+        try:
+            import psutil
+        except ImportError:
+            return self._query_process(pid)
+        # 与 list_processes 使用同一来源，启动时间才能直接比较
+        try:
+            info = psutil.Process(pid).as_dict(['name', 'exe', 'memory_info', 'create_time'], ad_value=None)
+        except psutil.NoSuchProcess:
+            return None
+        memory = info.get('memory_info')
+        return ProcessInfo(pid, info.get('name') or '', info.get('exe') or '', memory.rss if memory else 0,
+                           info.get('create_time') or 0.0)
+
+    def _query_process(self, pid: int) -> Optional[ProcessInfo]:
+        """未安装 psutil 时用 QueryFullProcessImageName 和 GetProcessTimes 查询"""
+        PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+        # FILETIME 从 1601-01-01 开始，单位 100ns
+        EPOCH_OFFSET = 116444736000000000
+        try:
+            handle = self._open_process(pid, PROCESS_QUERY_LIMITED_INFORMATION)
+        except ProcessLookupError:
+            return None
+        except PermissionError:
+            return ProcessInfo(pid, '', '', 0)
+        try:
+            size = wintypes.DWORD(1024)
+            buffer = ctypes.create_unicode_buffer(size.value)
+            executable = ''
+            if self._kernel32.QueryFullProcessImageNameW(handle, 0, buffer, ctypes.byref(size)):
+                executable = buffer.value
+            times = [wintypes.FILETIME() for _ in range(4)]
+            create_time = 0.0
+            if self._kernel32.GetProcessTimes(handle, *(ctypes.byref(t) for t in times)):
+                ticks = (times[0].dwHighDateTime << 32) | times[0].dwLowDateTime
+                create_time = (ticks - EPOCH_OFFSET) / 1e7
+            return ProcessInfo(pid, os.path.basename(executable), executable, 0, create_time)
+        finally:
+            self._kernel32.CloseHandle(handle)
+
+    def wait_process(self, pid: int, timeout: float) -> bool:
+        SYNCHRONIZE = 0x00100000
+        WAIT_OBJECT_0 = 0
+        try:
+            handle = self._open_process(pid, SYNCHRONIZE)
+        except ProcessLookupError:
+            return True
+        try:
+            return self._kernel32.WaitForSingleObject(handle, int(timeout * 1000)) == WAIT_OBJECT_0
+        finally:
+            self._kernel32.CloseHandle(handle)
+
+    def list_processes(self) -> List[ProcessInfo]:
+        try:
+            import psutil
+        except ImportError:
+            return self._tasklist_processes()
+
+        processes = []
+        for process in psutil.process_iter(['pid', 'name', 'exe', 'memory_info', 'create_time'], ad_value=None):
+            info = process.info
+            memory = info.get('memory_info')
+            processes.append(ProcessInfo(
+                pid=info['pid'],
+                name=info.get('name') or '',
+                executable=info.get('exe') or '',
+                memory_usage=memory.rss if memory else 0,
+                create_time=info.get('create_time') or 0.0
+            ))
+        return processes
+
+    def _tasklist_processes(self) -> List[ProcessInfo]:
+        """未安装 psutil 时回退到 tasklist"""
+        result = subprocess.run(['tasklist', '/fo', 'csv'],
+                                capture_output=True, text=True, encoding='gbk')
+        if result.returncode != 0:
+            raise RuntimeError('tasklist 执行失败')
+
+        processes = []
+        for line in result.stdout.strip().split('\n')[1:]:  # 跳过标题行
+            parts = line.split('","')
+            if len(parts) >= 5:
+                name = parts[0].strip('"')
+                pid = parts[1].strip('"')
+                memory = parts[4].strip('"').replace(',', '').replace(' K', '')
+                try:
+                    processes.append(ProcessInfo(
+                        pid=int(pid),
+                        name=name,
+                        executable='',
+                        memory_usage=int(memory) * 1024 if memory.isdigit() else 0
+                    ))
+                except ValueError:
+                    continue
+        return processes
+
+    def lock_workstation(self) -> None:
+        self.user32.LockWorkStation()
+
+    def power(self, action: str, force: bool = False) -> None:
+        if action == 'sleep':
+            subprocess.run(['rundll32.exe', 'powrprof.dll,SetSuspendState', '0,1,0'], check=True)
+            return
+
+        flags = ['/s' if action == 'shutdown' else '/r', '/t', '0']
+        if force:
+            flags.append('/f')
+        subprocess.run(['shutdown', *flags], check=True)
+
+    def sample_metrics(self, metrics: Set[str]) -> dict:
+        import psutil
+
+        sample = {}
+        if 'cpu' in metrics:
+            # interval=None 不阻塞，返回距上次调用以来的占用率
+            sample['cpu_percent'] = psutil.cpu_percent(interval=None)
+        if 'per_cpu' in metrics:
+            sample['cpu_per_core'] = psutil.cpu_percent(interval=None, percpu=True)
+        if 'memory' in metrics:
+            memory = psutil.virtual_memory()
+            sample['memory'] = {
+                'total': memory.total,
+                'available': memory.available,
+                'percent': memory.percent
+            }
+        if 'disk' in metrics:
+            disk = psutil.disk_usage('C:')
+            sample['disk'] = {
+                'total': disk.total,
+                'free': disk.free,
+                'percent': disk.percent
+            }
+        if 'network' in metrics:
+            network = psutil.net_io_counters()
+            sample['network'] = {
+                'bytes_sent': network.bytes_sent,
+                'bytes_recv': network.bytes_recv
+            }
+        return sample
+
+
+class SimulatedChild:
+    """模拟后端启动的进程句柄，接口与 subprocess.Popen 的 pid / poll() 一致"""
+
+    def __init__(self, backend: 'SimulatedBackend', pid: int):
+        self.backend = backend
+        self.pid = pid
+
+    def poll(self) -> Optional[int]:
+        with self.backend._lock:
+            if self.pid in self.backend.processes:
+                return None
+            return self.backend.exit_codes.get(self.pid, 0)
+
+
+class SimulatedBackend(ControllerBackend):
+    """内存模拟后端 - 记录所有操作并伪造窗口、进程和系统指标，用于非 Windows 环境和基准测试"""
+    name = 'simulated'
+
+    def __init__(self):
+        self.input_engine = RecordingInputEngine()
+        self.actions: List[Tuple[float, str, dict]] = []
+        self._lock = threading.RLock()
+        self._hwnds = itertools.count(0x10010, 0x10)
+        self._pids = itertools.count(4000, 4)
+        self.windows: Dict[int, WindowInfo] = {}
+        self.window_states: Dict[int, int] = {}
+        self.processes: Dict[int, ProcessInfo] = {}
+        self.exit_codes: Dict[int, int] = {}
+        # 不响应 WM_CLOSE 的进程 / 没有权限结束的进程
+        self.hung_pids: Set[int] = set()
+        self.protected_pids: Set[int] = set()
+        self._window_watchers: List[WindowEventCallback] = []
+        self.foreground = 0
+        self.locked = False
+
+        for name, memory in [('System', 8), ('explorer.exe', 120), ('chrome.exe', 480),
+                             ('Code.exe', 350), ('Spotify.exe', 210), ('svchost.exe', 24)]:
+            self.add_process(name, memory * 1024 * 1024)
+        pids = {p.name: p.pid for p in self.processes.values()}
+        self.protected_pids.add(pids['System'])
+        self.add_window('Program Manager', 'Progman', pid=pids['explorer.exe'])
+        self.foreground = self.add_window('Visual Studio Code', 'Chrome_WidgetWin_1', pid=pids['Code.exe'])
+        self.add_window('Spotify Premium', 'Chrome_WidgetWin_0', pid=pids['Spotify.exe'])
+        self.add_window('', 'tooltips_class32', pid=pids['explorer.exe'], visible=False)
+
+    def _record(self, name: str, **details):
+        with self._lock:
+            self.actions.append((time.perf_counter(), name, details))
+
+    def add_process(self, name: str, memory_usage: int = 0, executable: str = '') -> int:
+        """添加模拟进程"""
+        with self._lock:
+            pid = next(self._pids)
+            self.processes[pid] = ProcessInfo(pid, name, executable or f'C:\\Program Files\\{name}', memory_usage,
+                                              time.time())
+            return pid
+
+    def add_window(self, title: str, class_name: str = 'SimWindow',
+                   rect: Tuple[int, int, int, int] = (0, 0, 1280, 720),
+                   pid: int = 0, visible: bool = True) -> int:
+        """添加模拟窗口"""
+        with self._lock:
+            hwnd = next(self._hwnds)
+            self.windows[hwnd] = WindowInfo(hwnd, title, class_name, rect, visible, pid)
+            self.window_states[hwnd] = 1 if visible else 0
+        self._emit_window('created', hwnd)
+        return hwnd
+
+    def remove_window(self, hwnd: int) -> None:
+        """移除模拟窗口"""
+        with self._lock:
+            if self.windows.pop(hwnd, None) is None:
+                return
+            self.window_states.pop(hwnd, None)
+            if self.foreground == hwnd:
+                self.foreground = next(iter(self.windows), 0)
+        self._emit_window('destroyed', hwnd)
+
+    def set_window_title(self, hwnd: int, title: str) -> None:
+        """修改模拟窗口标题"""
+        with self._lock:
+            if hwnd not in self.windows:
+                return
+            self.windows[hwnd] = replace(self.windows[hwnd], title=title)
+        self._emit_window('changed', hwnd)
+
+    def _emit_window(self, event: str, hwnd: int):
+        for callback in list(self._window_watchers):
+            callback(event, hwnd)
+
+    def create_input_engine(self) -> InputEngine:
+        return self.input_engine
+
+    def create_frame_source(self) -> FrameSource:
+        return SyntheticFrameSource()
+
+    def get_foreground_window(self) -> int:
+        return self.foreground
+
+    def get_window_info(self, hwnd: int) -> Optional[WindowInfo]:
+        with self._lock:
+            return self.windows.get(hwnd)
+
+    def show_window(self, hwnd: int, state: int) -> None:
+        with self._lock:
+            known = hwnd in self.windows
+            if known:
+                self.window_states[hwnd] = state
+                self.windows[hwnd] = replace(self.windows[hwnd], is_visible=state != 0)
+        if known:
+            self._emit_window('changed', hwnd)
+        self._record('show_window', hwnd=hwnd, state=state)
+
+    def focus_window(self, hwnd: int) -> None:
+        with self._lock:
+            known = hwnd in self.windows
+            if known:
+                self.window_states[hwnd] = 1
+                self.windows[hwnd] = replace(self.windows[hwnd], is_visible=True)
+                self.foreground = hwnd
+        if known:
+            self._emit_window('changed', hwnd)
+        self._record('focus_window', hwnd=hwnd)
+
+    def close_window(self, hwnd: int) -> None:
+        self.remove_window(hwnd)
+        self._record('close_window', hwnd=hwnd)
+
+    def enumerate_windows(self) -> List[WindowInfo]:
+        with self._lock:
+            return list(self.windows.values())
+
+    def watch_windows(self, callback: WindowEventCallback) -> bool:
+        self._window_watchers.append(callback)
+        return True
+
+    def capture_window(self, hwnd: int, width: int, height: int) -> Optional[bytearray]:
+        # 用标题决定的底色加上一条按标题长度变化的横条伪造窗口内容，标题变化时内容随之变化
+        with self._lock:
+            window = self.windows.get(hwnd)
+            if window is None or self.window_states.get(hwnd) in (0, 2):
+                return None
+            title = window.title
+        seed = zlib.crc32(title.encode('utf-8'))
+        background = bytes((seed & 0xFF, seed >> 8 & 0xFF, seed >> 16 & 0xFF, 0))
+        pixels = bytearray(background * (width * height))
+        bar = min(len(title) * width // 40 + 1, width)
+        row = b'\xff\xff\xff\x00' * bar
+        stride = width * BYTES_PER_PIXEL
+        for y in range(height // 10, min(height // 10 + max(height // 12, 1), height)):
+            pixels[y * stride:y * stride + len(row)] = row
+        return pixels
+
+    def app_exists(self, app_path: str) -> bool:
+        return bool(app_path)
+
+    def spawn(self, argv: List[str], working_dir: Optional[str]) -> ChildProcess:
+        name = argv[0].replace('/', '\\').rsplit('\\', 1)[-1]
+        pid = self.add_process(name, 50 * 1024 * 1024, argv[0])
+        self._record('spawn', argv=argv, working_dir=working_dir, pid=pid)
+        return SimulatedChild(self, pid)
+
+    def shell_open(self, path: str, args: str, working_dir: Optional[str]) -> None:
+        self._record('shell_open', path=path, args=args, working_dir=working_dir)
+
+    def exit_process(self, pid: int, exit_code: int = 0) -> None:
+        """模拟进程退出"""
+        with self._lock:
+            if self.processes.pop(pid, None) is not None:
+                self.exit_codes[pid] = exit_code
+
+    def close_process_windows(self, pid: int, hwnds: Optional[List[int]] = None) -> int:
+        with self._lock:
+            candidates = self.windows if hwnds is None else hwnds
+            hwnds = [hwnd for hwnd in candidates
+                     if hwnd in self.windows and self.windows[hwnd].pid == pid and self.windows[hwnd].is_visible]
+        for hwnd in hwnds:
+            self.remove_window(hwnd)
+        # 模拟程序在最后一个窗口关闭后正常退出；挂起的进程不响应
+        with self._lock:
+            if hwnds and pid not in self.hung_pids:
+                self.exit_process(pid, 0)
+        self._record('close_process_windows', pid=pid, hwnds=hwnds)
+        return len(hwnds)
+
+    def terminate_process(self, pid: int) -> None:
+        with self._lock:
+            if pid not in self.processes:
+                raise ProcessLookupError(f'进程不存在: {pid}')
+            if pid in self.protected_pids:
+                raise PermissionError(f'没有权限操作进程: {pid}')
+            self.exit_process(pid, 1)
+            self.hung_pids.discard(pid)
+        self._record('terminate', pid=pid)
+
+    def process_info(self, pid: int) -> Optional[ProcessInfo]:
+        with self._lock:
+            process = self.processes.get(pid)
+            return replace(process) if process else None
+
+    def wait_process(self, pid: int, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                if pid not in self.processes:
+                    return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(min(0.01, timeout))
+
+    def list_processes(self) -> List[ProcessInfo]:
+        with self._lock:
+            return [replace(p) for p in self.processes.values()]
+
+    def lock_workstation(self) -> None:
+        self.locked = True
+        self._record('lock')
+
+    def power(self, action: str, force: bool = False) -> None:
+        self._record('power', action=action, force=force)
+
+    def platform_info(self) -> dict:
+        info = super().platform_info()
+        info['platform'] = f'Simulated-{info["platform"]}'
+        return info
+
+    def sample_metrics(self, metrics: Set[str]) -> dict:
+        # 用平滑的波形伪造指标，方便观察曲线
+        t = time.time()
+        sample = {}
+        if 'cpu' in metrics:
+            sample['cpu_percent'] = round(30 + 20 * math.sin(t / 15), 1)
+        if 'per_cpu' in metrics:
+            sample['cpu_per_core'] = [round(30 + 20 * math.sin(t / 15 + core), 1) for core in range(8)]
+        if 'memory' in metrics:
+            total = 16 * 1024 ** 3
+            percent = round(45 + 5 * math.sin(t / 60), 2)
+            sample['memory'] = {'total': total, 'available': int(total * (100 - percent) / 100), 'percent': percent}
+        if 'disk' in metrics:
+            sample['disk'] = {'total': 512 * 1024 ** 3, 'free': 200 * 1024 ** 3, 'percent': 60.9}
+        if 'network' in metrics:
+            sample['network'] = {'bytes_sent': int(t * 20000) % 2 ** 40, 'bytes_recv': int(t * 150000) % 2 ** 40}
+        return sample
+
+
+BACKENDS = {
+    Win32Backend.name: Win32Backend,
+    SimulatedBackend.name: SimulatedBackend,
+}
+
+
+def create_backend(name: Optional[str] = None) -> ControllerBackend:
+    """创建控制器后端
+
+    未指定时读取环境变量 REMOTE_PC_BACKEND，默认在 Windows 上使用 win32，其他平台使用 simulated。
+    """
+    name = name or os.environ.get('REMOTE_PC_BACKEND') or ('win32' if sys.platform == 'win32' else 'simulated')
+    if name not in BACKENDS:
+        raise ValueError(f'未知的控制器后端: {name}，可选: {list(BACKENDS)}')
+    return BACKENDS[name]()
@@ -0,0 +1,183 @@
+import itertools
+import math
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from input_dispatcher import InputDispatcher
+
+# 单次请求和单个批次注入的最大步数；音量和亮度 50 步已经从 0 调到 100，再多也只是多余的按键
+MAX_STEPS = 50
+
+
+class _StepBatch:
+    """一次合并批次"""
+
+    def __init__(self, batch_id: int, name: str):
+        self.batch_id = batch_id
+        self.name = name
+        self.delta = 0
+        self.requests = 0
+        self.steps_requested = 0
+        self.state = 'collecting'  # collecting / queued / running / done
+        self.command_id: Optional[int] = None
+        self.result: Optional[dict] = None
+        self.done = threading.Event()
+
+    def to_dict(self) -> dict:
+        info = {
+            'batch_id': self.batch_id,
+            'name': self.name,
+            'state': self.state,
+            'delta': self.delta,
+            'requests': self.requests,
+            'command_id': self.command_id,
+        }
+        if self.result is not None:
+            info['result'] = self.result
+        return info
+
+
+class StepCoalescer:
+    """步进合并器 - 把短时间窗口内的 up/down 请求合并成一次净步数再注入
+
+    第一个请求开启一个窗口，窗口内的后续请求只累加增量；窗口结束后批次交给输入派发线程，
+    在真正执行之前仍可继续合并。相反方向的增量会相互抵消，净步数超过 max_steps 时截断。
+
+    批次在窗口结束后才交给派发线程，提交时还没有派发器的 command_id；
+    响应里的 batch_id 可以用 get_batch（/api/command/batch/<batch_id>）查询，排队后其中带有 command_id。
+    """
+
+    def __init__(self, dispatcher: InputDispatcher, window: float = 0.03, max_steps: int = MAX_STEPS,
+                 history_size: int = 256):
+        self.dispatcher = dispatcher
+        self.window = window
+        self.max_steps = max_steps
+        self._targets: Dict[str, Tuple[Callable[[int], dict], Callable[[int], dict]]] = {}
+        self._pending: Dict[str, _StepBatch] = {}
+        self._batches: 'OrderedDict[int, _StepBatch]' = OrderedDict()
+        self._history_size = history_size
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._stats = {
+            'requests': 0,
+            'folded': 0,
+            'batches': 0,
+            'noop_batches': 0,
+            'steps_requested': 0,
+            'steps_injected': 0,
+            'steps_cancelled': 0,
+            'steps_clamped': 0,
+        }
+
+    def register(self, name: str, up: Callable[[int], dict], down: Callable[[int], dict]):
+        """注册一个可合并的步进控制（例如 volume / brightness）"""
+        self._targets[name] = (up, down)
+
+    def submit(self, name: str, delta: int, wait: bool = False, timeout: float = 5.0) -> dict:
+        """提交一次增量，正数为 up，负数为 down"""
+        if name not in self._targets:
+            return {'success': False, 'status': 'rejected', 'message': f'不支持合并的控制: {name}'}
+        if abs(delta) > self.max_steps:
+            return {'success': False, 'status': 'rejected', 'message': f'步数不能超过 {self.max_steps}'}
+
+        start_timer = False
+        with self._lock:
+            batch = self._pending.get(name)
+            if batch is None:
+                batch = _StepBatch(next(self._ids), name)
+                self._pending[name] = batch
+                self._batches[batch.batch_id] = batch
+                while len(self._batches) > self._history_size:
+                    self._batches.popitem(last=False)
+                start_timer = True
+            else:
+                self._stats['folded'] += 1
+            batch.delta += delta
+            batch.requests += 1
+            batch.steps_requested += abs(delta)
+            self._stats['requests'] += 1
+            self._stats['steps_requested'] += abs(delta)
+
+        if start_timer:
+            timer = threading.Timer(self.window, self._flush, args=(batch,))
+            timer.daemon = True
+            timer.start()
+
+        if wait and batch.done.wait(timeout):
+            return dict(batch.result or {})
+
+        return {
+            'success': True,
+            'status': 'queued',
+            'queued': True,
+            'coalesced': not start_timer,
+            'batch_id': batch.batch_id,
+            'command_id': batch.command_id,
+            'message': f'{name} 步进已加入合并队列'
+        }
+
+    def get_batch(self, batch_id: int) -> Optional[dict]:
+        """查询批次状态"""
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            return batch.to_dict() if batch else None
+
+    def stats(self) -> dict:
+        """合并统计信息"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = {name: batch.delta for name, batch in self._pending.items()}
+        stats['window_ms'] = round(self.window * 1000, 2)
+        stats['fold_ratio'] = round(stats['folded'] / stats['requests'], 4) if stats['requests'] else 0.0
+        return stats
+
+    def _flush(self, batch: _StepBatch):
+        """窗口结束：把批次交给派发线程"""
+        with self._lock:
+            batch.state = 'queued'
+        # 批次在执行前一直合并新的增量，代表的是最新的意图，不按排队时间丢弃
+        result = self.dispatcher.submit(f'{batch.name}_coalesced', lambda: self._apply(batch), max_age=math.inf)
+        if result.get('status') == 'rejected':
+            with self._lock:
+                if self._pending.get(batch.name) is batch:
+                    del self._pending[batch.name]
+            self._finish(batch, result)
+        else:
+            with self._lock:
+                batch.command_id = result.get('command_id')
+
+    def _apply(self, batch: _StepBatch) -> dict:
+        """在派发线程中执行：取出净增量并注入"""
+        with self._lock:
+            if self._pending.get(batch.name) is batch:
+                del self._pending[batch.name]
+            batch.state = 'running'
+            net = max(-self.max_steps, min(batch.delta, self.max_steps))
+            self._stats['batches'] += 1
+            self._stats['steps_injected'] += abs(net)
+            self._stats['steps_cancelled'] += batch.steps_requested - abs(batch.delta)
+            self._stats['steps_clamped'] += abs(batch.delta) - abs(net)
+            if net == 0:
+                self._stats['noop_batches'] += 1
+
+        if net == 0:
+            result = {'success': True, 'message': f'{batch.name} 增减相互抵消，未发送按键', 'steps': 0}
+        else:
+            up, down = self._targets[batch.name]
+            result = up(net) if net > 0 else down(-net)
+
+        result = dict(result)
+        result.update({
+            'batch_id': batch.batch_id,
+            'net_steps': net,
+            'requests_merged': batch.requests,
+        })
+        self._finish(batch, result)
+        return result
+
+    def _finish(self, batch: _StepBatch, result: dict):
+        with self._lock:
+            batch.result = result
+            batch.state = 'done'
+        batch.done.set()
@@ -0,0 +1,175 @@
+import itertools
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+
+@dataclass
+class InputCommand:
+    """输入命令"""
+    command_id: int
+    name: str
+    func: Callable[[], dict]
+    created_at: float
+    status: str = 'queued'  # queued / running / done / failed / dropped
+    # 超过这个时间（perf_counter）还没轮到执行就丢弃，None 表示不过期
+    deadline: Optional[float] = None
+    result: Optional[dict] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    done: threading.Event = field(default_factory=threading.Event)
+
+    def to_dict(self) -> dict:
+        """转换为可序列化的状态信息"""
+        info = {
+            'command_id': self.command_id,
+            'name': self.name,
+            'status': self.status,
+        }
+        if self.started_at is not None:
+            info['queue_ms'] = round((self.started_at - self.created_at) * 1000, 2)
+        if self.finished_at is not None and self.started_at is not None:
+            info['exec_ms'] = round((self.finished_at - self.started_at) * 1000, 2)
+        if self.result is not None:
+            info['result'] = self.result
+        return info
+
+
+class InputDispatcher:
+    """输入派发器 - 由单一工作线程独占全部键盘注入
+
+    HTTP 处理线程只负责把命令放入有界队列并立即返回，
+    工作线程按顺序逐条执行，保证组合键的按下/释放不会互相穿插。
+    """
+
+    def __init__(self, max_queue: int = 64, history_size: int = 256, max_age: Optional[float] = 2.0):
+        self._queue: 'queue.Queue[InputCommand]' = queue.Queue(maxsize=max_queue)
+        self._history: 'OrderedDict[int, InputCommand]' = OrderedDict()
+        self._history_size = history_size
+        # 排队超过 max_age 秒的命令在出队时丢弃（例如按钮连发积压的音量键），None 表示不丢弃
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {'submitted': 0, 'rejected': 0, 'dropped': 0, 'completed': 0, 'failed': 0}
+        self._listeners: List[Callable[[InputCommand], None]] = []
+        self._logger = logging.getLogger('InputDispatcher')
+
+    def start(self):
+        """启动派发线程"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='input-dispatcher', daemon=True)
+            self._thread.start()
+
+    def submit(self, name: str, func: Callable[[], dict], wait: bool = False,
+               timeout: float = 5.0, max_age: Optional[float] = None, history: bool = True) -> dict:
+        """提交输入命令
+
+        wait 为 False 时立即返回排队信息；为 True 时等待执行完成（最多 timeout 秒）。
+        max_age 覆盖默认的最长排队时间，传 math.inf 表示不过期。
+        history 为 False 时不记录到命令历史（不能用 command_id 查询），用于大量的内部命令。
+        """
+        self.start()
+        now = time.perf_counter()
+        if max_age is None:
+            max_age = self.max_age
+        command = InputCommand(next(self._ids), name, func, now, deadline=None if max_age is None else now + max_age)
+
+        try:
+            self._queue.put_nowait(command)
+        except queue.Full:
+            with self._lock:
+                self._stats['rejected'] += 1
+            return {
+                'success': False,
+                'status': 'rejected',
+                'message': f'输入队列已满，命令被拒绝: {name}',
+                'queue_depth': self._queue.qsize()
+            }
+
+        with self._lock:
+            self._stats['submitted'] += 1
+            if history:
+                self._history[command.command_id] = command
+                while len(self._history) > self._history_size:
+                    self._history.popitem(last=False)
+
+        if wait and command.done.wait(timeout):
+            response = dict(command.result or {})
+            response.update(command.to_dict())
+            response.pop('result', None)
+            return response
+
+        return {
+            'success': True,
+            'status': command.status,
+            'queued': True,
+            'command_id': command.command_id,
+            'message': f'命令已加入队列: {name}',
+            'queue_depth': self._queue.qsize()
+        }
+
+    def add_listener(self, listener: Callable[[InputCommand], None]):
+        """注册命令执行完成的回调，在派发线程中调用"""
+        self._listeners.append(listener)
+
+    def get_command(self, command_id: int) -> Optional[dict]:
+        """查询命令状态"""
+        with self._lock:
+            command = self._history.get(command_id)
+        return command.to_dict() if command else None
+
+    def stats(self) -> dict:
+        """派发器统计信息"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['queue_depth'] = self._queue.qsize()
+        stats['queue_capacity'] = self._queue.maxsize
+        return stats
+
+    def _run(self):
+        """派发线程主循环"""
+        while True:
+            command = self._queue.get()
+            command.started_at = time.perf_counter()
+            if command.deadline is not None and command.started_at > command.deadline:
+                # 积压太久的命令已经没有意义（按钮早已松开），直接丢弃
+                command.status = 'dropped'
+                command.result = {
+                    'success': False,
+                    'status': 'dropped',
+                    'message': f'命令排队 {(command.started_at - command.created_at) * 1000:.0f}ms 已过期，被丢弃: {command.name}'
+                }
+                command.finished_at = command.started_at
+                with self._lock:
+                    self._stats['dropped'] += 1
+            else:
+                command.status = 'running'
+                try:
+                    command.result = command.func()
+                except Exception as e:
+                    self._logger.error(f"执行输入命令失败 {command.name}: {e}")
+                    command.result = {'success': False, 'message': f'执行命令失败: {str(e)}'}
+                command.finished_at = time.perf_counter()
+
+                success = bool(command.result.get('success', False))
+                command.status = 'done' if success else 'failed'
+                with self._lock:
+                    self._stats['completed' if success else 'failed'] += 1
+            command.done.set()
+            for listener in self._listeners:
+                try:
+                    listener(command)
+                except Exception as e:
+                    self._logger.error(f"命令完成回调失败 {command.name}: {e}")
+            self._queue.task_done()
+
+
+# 创建全局实例
+input_dispatcher = InputDispatcher()
@@ -0,0 +1,265 @@
+import ctypes
+from ctypes import wintypes
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+# SendInput 常量
+INPUT_KEYBOARD = 1
+KEYEVENTF_KEYUP = 0x0002
+KEYEVENTF_UNICODE = 0x0004
+
+# 可读按键名 -> 虚拟键码
+KEY_NAMES = {
+    'ctrl': 0x11, 'control': 0x11, 'shift': 0x10, 'alt': 0x12,
+    'win': 0x5B, 'lwin': 0x5B, 'rwin': 0x5C, 'menu': 0x5D, 'apps': 0x5D,
+    'enter': 0x0D, 'return': 0x0D, 'esc': 0x1B, 'escape': 0x1B, 'tab': 0x09,
+    'space': 0x20, 'backspace': 0x08, 'delete': 0x2E, 'del': 0x2E, 'insert': 0x2D,
+    'home': 0x24, 'end': 0x23, 'pageup': 0x21, 'pgup': 0x21, 'pagedown': 0x22, 'pgdn': 0x22,
+    'left': 0x25, 'up': 0x26, 'right': 0x27, 'down': 0x28,
+    'capslock': 0x14, 'printscreen': 0x2C, 'prtsc': 0x2C,
+    'minus': 0xBD, 'plus': 0xBB, 'equals': 0xBB, 'comma': 0xBC, 'period': 0xBE,
+    'slash': 0xBF, 'semicolon': 0xBA, 'quote': 0xDE, 'backquote': 0xC0,
+    'lbracket': 0xDB, 'rbracket': 0xDD, 'backslash': 0xDC,
+    'volume_up': 0xAF, 'volume_down': 0xAE, 'volume_mute': 0xAD,
+    'play_pause': 0xB3, 'media_stop': 0xB2, 'media_next': 0xB0, 'media_prev': 0xB1,
+}
+KEY_NAMES.update({chr(c): c for c in range(ord('A'), ord('Z') + 1)})
+KEY_NAMES.update({chr(c).lower(): c for c in range(ord('A'), ord('Z') + 1)})
+KEY_NAMES.update({str(d): 0x30 + d for d in range(10)})
+KEY_NAMES.update({f'f{n}': 0x6F + n for n in range(1, 25)})
+
+
+def parse_key_name(name: str) -> int:
+    """解析单个按键名，支持按键名、十进制和 0x 开头的十六进制键码"""
+    token = name.strip()
+    key = KEY_NAMES.get(token) or KEY_NAMES.get(token.lower())
+    if key is not None:
+        return key
+    try:
+        key = int(token, 16) if token.lower().startswith('0x') else int(token)
+    except ValueError:
+        raise ValueError(f'未知的按键: {name}')
+    if not 0 < key < 0xFF:
+        raise ValueError(f'键码超出范围: {name}')
+    return key
+
+
+def parse_key_combo(combo: str) -> List[int]:
+    """解析 'ctrl+shift+esc' 形式的组合键"""
+    keys = [parse_key_name(part) for part in combo.split('+') if part.strip()]
+    if not keys:
+        raise ValueError(f'组合键为空: {combo!r}')
+    return keys
+
+
+# =================== Win32 INPUT 结构 ===================
+class _KEYBDINPUT(ctypes.Structure):
+    _fields_ = [
+        ('wVk', wintypes.WORD),
+        ('wScan', wintypes.WORD),
+        ('dwFlags', wintypes.DWORD),
+        ('time', wintypes.DWORD),
+        ('dwExtraInfo', ctypes.c_size_t),
+    ]
+
+
+class _MOUSEINPUT(ctypes.Structure):
+    _fields_ = [
+        ('dx', wintypes.LONG),
+        ('dy', wintypes.LONG),
+        ('mouseData', wintypes.DWORD),
+        ('dwFlags', wintypes.DWORD),
+        ('time', wintypes.DWORD),
+        ('dwExtraInfo', ctypes.c_size_t),
+    ]
+
+
+class _HARDWAREINPUT(ctypes.Structure):
+    _fields_ = [
+        ('uMsg', wintypes.DWORD),
+        ('wParamL', wintypes.WORD),
+        ('wParamH', wintypes.WORD),
+    ]
+
+
+class _INPUTUNION(ctypes.Union):
+    _fields_ = [('ki', _KEYBDINPUT), ('mi', _MOUSEINPUT), ('hi', _HARDWAREINPUT)]
+
+
+class _INPUT(ctypes.Structure):
+    _anonymous_ = ('u',)
+    _fields_ = [('type', wintypes.DWORD), ('u', _INPUTUNION)]
+
+
+@dataclass(frozen=True)
+class KeyEvent:
+    """单个按键事件"""
+    key_code: int
+    key_up: bool = False
+    unicode: bool = False  # 为 True 时 key_code 是 UTF-16 码元而不是虚拟键码
+
+
+class InputSequence:
+    """输入序列 - 若干批按键事件，批与批之间可以插入停顿
+
+    同一批内的事件由引擎一次性提交，只有目标程序确实需要时才插入停顿。
+    """
+
+    def __init__(self):
+        self.segments: List[Tuple[List[KeyEvent], float]] = [([], 0.0)]
+
+    @property
+    def _events(self) -> List[KeyEvent]:
+        return self.segments[-1][0]
+
+    def press(self, key_code: int) -> 'InputSequence':
+        """按下按键"""
+        self._events.append(KeyEvent(key_code))
+        return self
+
+    def release(self, key_code: int) -> 'InputSequence':
+        """释放按键"""
+        self._events.append(KeyEvent(key_code, key_up=True))
+        return self
+
+    def tap(self, key_code: int, times: int = 1) -> 'InputSequence':
+        """按下并释放按键，重复 times 次"""
+        for _ in range(max(times, 0)):
+            self.press(key_code).release(key_code)
+        return self
+
+    def combo(self, keys: Iterable[int], hold: float = 0.0) -> 'InputSequence':
+        """组合键：依次按下，逆序释放；hold > 0 时按住一段时间再释放"""
+        keys = list(keys)
+        for key in keys:
+            self.press(key)
+        if hold > 0:
+            self.pause(hold)
+        for key in reversed(keys):
+            self.release(key)
+        return self
+
+    def text(self, value: str) -> 'InputSequence':
+        """以 Unicode 方式输入文本"""
+        data = value.encode('utf-16-le')
+        for i in range(0, len(data), 2):
+            unit = int.from_bytes(data[i:i + 2], 'little')
+            self._events.append(KeyEvent(unit, unicode=True))
+            self._events.append(KeyEvent(unit, key_up=True, unicode=True))
+        return self
+
+    def pause(self, seconds: float) -> 'InputSequence':
+        """在当前批之后停顿，后续事件进入新的一批"""
+        if seconds <= 0:
+            return self
+        events, pause = self.segments[-1]
+        self.segments[-1] = (events, pause + seconds)
+        self.segments.append(([], 0.0))
+        return self
+
+    def extend(self, other: 'InputSequence') -> 'InputSequence':
+        """追加另一个序列"""
+        for events, pause in other.segments:
+            self._events.extend(events)
+            self.pause(pause)
+        return self
+
+    @property
+    def event_count(self) -> int:
+        """事件总数"""
+        return sum(len(events) for events, _ in self.segments)
+
+    @property
+    def events(self) -> List[KeyEvent]:
+        """按顺序展开的全部事件"""
+        return [event for events, _ in self.segments for event in events]
+
+
+class InputEngine:
+    """输入引擎接口
+
+    子类只需实现 _submit，把一批事件原子地注入系统。
+    """
+
+    def send(self, sequence: InputSequence) -> int:
+        """发送整个序列，返回注入的事件数"""
+        injected = 0
+        for events, pause in sequence.segments:
+            if events:
+                injected += self._submit(events)
+            if pause > 0:
+                time.sleep(pause)
+        return injected
+
+    def _submit(self, events: List[KeyEvent]) -> int:
+        raise NotImplementedError
+
+
+class SendInputEngine(InputEngine):
+    """Win32 SendInput 引擎 - 每批事件只调用一次 SendInput"""
+
+    def __init__(self):
+        super().__init__()
+        self._user32 = ctypes.WinDLL('user32', use_last_error=True)
+        self._user32.SendInput.argtypes = (wintypes.UINT, ctypes.POINTER(_INPUT), ctypes.c_int)
+        self._user32.SendInput.restype = wintypes.UINT
+
+    def _submit(self, events: List[KeyEvent]) -> int:
+        inputs = (_INPUT * len(events))()
+        for i, event in enumerate(events):
+            flags = KEYEVENTF_KEYUP if event.key_up else 0
+            item = inputs[i]
+            item.type = INPUT_KEYBOARD
+            if event.unicode:
+                item.ki.wScan = event.key_code
+                item.ki.dwFlags = flags | KEYEVENTF_UNICODE
+            else:
+                item.ki.wVk = event.key_code
+                item.ki.dwFlags = flags
+
+        sent = self._user32.SendInput(len(events), inputs, ctypes.sizeof(_INPUT))
+        if sent != len(events):
+            raise ctypes.WinError(ctypes.get_last_error())
+        return sent
+
+
+class RecordingInputEngine(InputEngine):
+    """记录型引擎 - 不注入任何事件，只记录事件序列和耗时，用于非 Windows 环境"""
+
+    def __init__(self, honor_pauses: bool = True):
+        super().__init__()
+        self.honor_pauses = honor_pauses
+        self.events: List[Tuple[float, KeyEvent]] = []
+        self.batches = 0
+        self.last_duration: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def send(self, sequence: InputSequence) -> int:
+        start = time.perf_counter()
+        if self.honor_pauses:
+            injected = super().send(sequence)
+        else:
+            injected = sum(self._submit(events) for events, _ in sequence.segments if events)
+        self.last_duration = time.perf_counter() - start
+        return injected
+
+    def _submit(self, events: List[KeyEvent]) -> int:
+        now = time.perf_counter()
+        with self._lock:
+            self.events.extend((now, event) for event in events)
+            self.batches += 1
+        return len(events)
+
+    def recorded(self) -> List[KeyEvent]:
+        """已记录的事件（不含时间戳）"""
+        with self._lock:
+            return [event for _, event in self.events]
+
+    def clear(self):
+        """清空记录"""
+        with self._lock:
+            self.events.clear()
+            self.batches = 0
+            self.last_duration = None
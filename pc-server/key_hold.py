@@ -0,0 +1,320 @@
+import itertools
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from input_dispatcher import InputDispatcher
+from input_engine import InputSequence
+
+# 释放失败（例如输入队列已满）后重试的间隔
+RELEASE_RETRY_SECONDS = 0.05
+
+
+@dataclass
+class HoldSession:
+    """一次按住：按下后在租约内按固定速率重复最后一个键的按下事件，释放或租约到期时抬起全部按键"""
+    hold_id: int
+    keys: List[int]
+    rate: float
+    delay: float
+    lease: float
+    pressed_at: float
+    expires_at: float
+    next_repeat: Optional[float]
+    state: str = 'held'  # held / releasing / released
+    reason: str = ''  # released / expired / replaced / shutdown
+    repeats: int = 0
+    repeats_skipped: int = 0
+    renewals: int = 0
+    released_at: Optional[float] = None
+    # 上一次重复还在派发队列里没有执行；过期被丢弃时不会回调，所以只在 repeat_deadline 之前有效
+    repeat_pending: bool = False
+    repeat_deadline: float = 0.0
+    release_retry_at: float = 0.0
+
+    def to_dict(self, now: float) -> dict:
+        end = self.released_at if self.released_at is not None else now
+        info = {
+            'hold_id': self.hold_id,
+            'keys': self.keys,
+            'state': self.state,
+            'held_ms': round((end - self.pressed_at) * 1000, 1),
+            'repeats': self.repeats,
+            'repeats_skipped': self.repeats_skipped,
+            'rate': self.rate,
+        }
+        if self.state == 'held':
+            info['lease_remaining_ms'] = round(max(self.expires_at - now, 0) * 1000, 1)
+        if self.reason:
+            info['reason'] = self.reason
+        return info
+
+
+class KeyHoldManager:
+    """按住模式 - 客户端只发送按下和松开两次请求，按键的自动重复由服务端生成
+
+    按下、重复和释放都交给输入派发线程，与其他键盘命令按顺序执行，不会相互穿插。
+    每次按住都有租约，客户端松开的请求丢失或断线时，租约到期后自动释放，不会留下卡住的按键。
+    重复事件只在上一次执行后才会再提交，派发线程忙时跳过，不会在积压后连发。
+    """
+
+    def __init__(self, controller, dispatcher: InputDispatcher, rate: float = 10.0, delay: float = 0.3,
+                 lease: float = 5.0, max_lease: float = 30.0, max_rate: float = 50.0, max_holds: int = 16):
+        self.controller = controller
+        self.dispatcher = dispatcher
+        self.rate = rate
+        self.delay = delay
+        self.lease = lease
+        self.max_lease = max_lease
+        self.max_rate = max_rate
+        self.max_holds = max_holds
+        self._holds: Dict[int, HoldSession] = {}
+        self._ids = itertools.count(1)
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {
+            'presses': 0,
+            'repeats': 0,
+            'repeats_skipped': 0,
+            'released': 0,
+            'expired': 0,
+            'replaced': 0,
+            'renewals': 0,
+            'rejected': 0,
+        }
+        self._logger = logging.getLogger('KeyHoldManager')
+
+    def start(self):
+        """启动重复/租约线程"""
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='key-hold', daemon=True)
+            self._thread.start()
+
+    # =================== 按下 / 续租 / 松开 ===================
+    def press(self, keys: List[int], rate: Optional[float] = None, delay: Optional[float] = None,
+              lease: Optional[float] = None, repeat: bool = True) -> dict:
+        """按下按键并开始按住；rate 为每秒重复次数，repeat 为 False 时只按住不重复"""
+        if not keys:
+            return {'success': False, 'message': '请提供要按住的按键'}
+        rate = self.rate if rate is None else rate
+        delay = self.delay if delay is None else delay
+        lease = min(self.lease if lease is None else lease, self.max_lease)
+        if not 0 < rate <= self.max_rate:
+            return {'success': False, 'message': f'rate 必须在 0 到 {self.max_rate:g} 之间'}
+        if lease <= 0:
+            return {'success': False, 'message': 'lease_ms 必须大于 0'}
+
+        self.start()
+        now = time.monotonic()
+        replaced = []
+        with self._cond:
+            # 同一个键同时只能被一次按住占用，新的按住替换旧的
+            for session in list(self._holds.values()):
+                if session.state == 'held' and set(session.keys) & set(keys):
+                    self._release(session, 'replaced', now)
+                    replaced.append(session.hold_id)
+            active = sum(1 for session in self._holds.values() if session.state == 'held')
+            if active >= self.max_holds:
+                self._stats['rejected'] += 1
+                return {'success': False, 'status': 'rejected',
+                        'message': f'同时按住的按键已达上限 ({self.max_holds})'}
+
+            session = HoldSession(
+                hold_id=next(self._ids),
+                keys=list(keys),
+                rate=rate,
+                delay=max(delay, 0.0),
+                lease=lease,
+                pressed_at=now,
+                expires_at=now + lease,
+                next_repeat=now + max(delay, 1 / rate) if repeat else None,
+            )
+            sequence = InputSequence()
+            for key in keys:
+                sequence.press(key)
+            # 按下与释放一样永不过期：按下被丢弃而会话仍记为按住，会重复一个没有按下的键
+            result = self._submit('key_hold_press', sequence, max_age=math.inf)
+            if result.get('status') == 'rejected':
+                self._stats['rejected'] += 1
+                return result
+            self._holds[session.hold_id] = session
+            self._stats['presses'] += 1
+            self._cond.notify()
+
+        response = {
+            'success': True,
+            'message': f'按键已按下: {[hex(k) for k in keys]}',
+            'hold_id': session.hold_id,
+            'keys': session.keys,
+            'repeat': repeat,
+            'rate': rate,
+            'delay_ms': round(session.delay * 1000, 1),
+            'lease_ms': round(lease * 1000, 1),
+        }
+        if replaced:
+            response['replaced'] = replaced
+        return response
+
+    def renew(self, hold_id: int, lease: Optional[float] = None) -> dict:
+        """续租，长时间按住时客户端定期调用"""
+        now = time.monotonic()
+        with self._cond:
+            session = self._holds.get(hold_id)
+            if session is None or session.state != 'held':
+                return {'success': False, 'status': 'released', 'message': f'按住已结束: {hold_id}',
+                        **({'hold': session.to_dict(now)} if session else {})}
+            if lease is not None:
+                session.lease = min(lease, self.max_lease)
+            session.expires_at = now + session.lease
+            session.renewals += 1
+            self._stats['renewals'] += 1
+            self._cond.notify()
+            return {'success': True, 'message': '租约已续期', 'hold': session.to_dict(now)}
+
+    def release(self, hold_id: Optional[int] = None, keys: Optional[List[int]] = None) -> dict:
+        """松开按键：按 hold_id，或松开包含这些键的按住；都不传时松开全部"""
+        now = time.monotonic()
+        with self._cond:
+            if hold_id is not None:
+                session = self._holds.get(hold_id)
+                if session is None:
+                    return {'success': False, 'message': f'按住不存在: {hold_id}'}
+                sessions = [session]
+            elif keys:
+                sessions = [s for s in self._holds.values() if s.state == 'held' and set(s.keys) & set(keys)]
+            else:
+                sessions = [s for s in self._holds.values() if s.state == 'held']
+
+            released = []
+            for session in sessions:
+                if session.state == 'held':
+                    self._release(session, 'released', now)
+                released.append(session.to_dict(now))
+            self._cond.notify()
+        return {
+            'success': True,
+            'message': f'已松开 {len(released)} 个按住' if released else '没有需要松开的按键',
+            'released': released,
+        }
+
+    def shutdown(self):
+        """服务器退出时松开全部按键；派发线程可能已经停止，直接注入"""
+        now = time.monotonic()
+        with self._cond:
+            sessions = [s for s in self._holds.values() if s.state != 'released']
+            for session in sessions:
+                if session.state == 'held':
+                    self._stats['released'] += 1
+                session.state = 'released'
+                session.reason = session.reason or 'shutdown'
+                session.released_at = session.released_at or now
+        sequence = InputSequence()
+        for session in sessions:
+            for key in reversed(session.keys):
+                sequence.release(key)
+        if sequence.event_count:
+            self.controller.send_input_sequence(sequence, 'key_hold_shutdown')
+
+    def holds(self) -> List[dict]:
+        """当前按住的按键"""
+        now = time.monotonic()
+        with self._cond:
+            return [s.to_dict(now) for s in self._holds.values() if s.state != 'released']
+
+    def stats(self) -> dict:
+        with self._cond:
+            stats = dict(self._stats)
+            stats['active'] = sum(1 for s in self._holds.values() if s.state == 'held')
+            stats['releasing'] = sum(1 for s in self._holds.values() if s.state == 'releasing')
+        stats['default_rate'] = self.rate
+        stats['default_delay_ms'] = round(self.delay * 1000, 1)
+        stats['default_lease_ms'] = round(self.lease * 1000, 1)
+        return stats
+
+    # =================== 内部 ===================
+    def _submit(self, name: str, sequence: InputSequence, max_age: Optional[float], on_done=None) -> dict:
+        def run():
+            try:
+                return self.controller.send_input_sequence(sequence, name)
+            finally:
+                if on_done is not None:
+                    on_done()
+        # 按住产生的命令很多，不放进命令历史，避免挤掉其他命令的状态
+        return self.dispatcher.submit(name, run, max_age=max_age, history=False)
+
+    def _release(self, session: HoldSession, reason: str, now: float):
+        """抬起按键（调用方持有锁）；释放命令永不过期，入队失败时由后台线程重试"""
+        if session.state == 'held':
+            session.state = 'releasing'
+            session.reason = reason
+            session.released_at = now
+            self._stats['expired' if reason == 'expired' else 'replaced' if reason == 'replaced' else 'released'] += 1
+        sequence = InputSequence()
+        for key in reversed(session.keys):
+            sequence.release(key)
+        result = self._submit('key_hold_release', sequence, max_age=math.inf)
+        if result.get('status') == 'rejected':
+            session.release_retry_at = now + RELEASE_RETRY_SECONDS
+            self._logger.warning(f"松开按键入队失败，稍后重试: {session.keys}")
+            return
+        session.state = 'released'
+
+    def _repeat(self, session: HoldSession, now: float):
+        """提交一次重复（调用方持有锁）"""
+        interval = 1 / session.rate
+        session.next_repeat = now + interval
+        if session.repeat_pending and now < session.repeat_deadline:
+            # 派发线程还没执行上一次重复，跳过这一次
+            session.repeats_skipped += 1
+            self._stats['repeats_skipped'] += 1
+            return
+
+        def done():
+            with self._cond:
+                session.repeat_pending = False
+
+        session.repeat_pending = True
+        session.repeat_deadline = now + interval
+        # 按住时系统的自动重复只重复最后一个键的按下事件
+        result = self._submit('key_hold_repeat', InputSequence().press(session.keys[-1]),
+                              max_age=interval, on_done=done)
+        if result.get('status') == 'rejected':
+            session.repeat_pending = False
+            session.repeats_skipped += 1
+            self._stats['repeats_skipped'] += 1
+            return
+        session.repeats += 1
+        self._stats['repeats'] += 1
+
+    def _run(self):
+        """后台线程：按时提交重复、租约到期时自动释放、重试失败的释放"""
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                wake = now + 60
+                for session in list(self._holds.values()):
+                    if session.state == 'released':
+                        if now - session.released_at > self.max_lease:
+                            del self._holds[session.hold_id]
+                        continue
+                    if session.state == 'releasing':
+                        if now >= session.release_retry_at:
+                            self._release(session, session.reason, now)
+                        if session.state == 'releasing':
+                            wake = min(wake, session.release_retry_at)
+                        continue
+                    if now >= session.expires_at:
+                        self._logger.warning(f"按住租约到期，自动松开: {session.keys}")
+                        self._release(session, 'expired', now)
+                        continue
+                    if session.next_repeat is not None and now >= session.next_repeat:
+                        self._repeat(session, now)
+                    wake = min(wake, session.expires_at)
+                    if session.next_repeat is not None:
+                        wake = min(wake, session.next_repeat)
+                self._cond.wait(max(wake - time.monotonic(), 0))
@@ -0,0 +1,217 @@
+import itertools
+import logging
+import shlex
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Union
+
+from controller_backends import ChildProcess, WindowInfo
+from window_index import WindowIndex
+
+MAX_LAUNCH_RESULTS = 200
+# 超过这个时间还没出现窗口的启动不再等待（后台程序、控制台程序等）
+WINDOW_WAIT_TIMEOUT = 60.0
+
+
+def split_args(args: Union[str, List[str], None]) -> List[str]:
+    """把参数解析成列表；字符串按双引号分词并保留反斜杠和单引号（Windows 路径，例如 O'Brien）"""
+    if not args:
+        return []
+    if isinstance(args, (list, tuple)):
+        return [str(arg) for arg in args]
+    lexer = shlex.shlex(args, posix=True)
+    lexer.whitespace_split = True
+    lexer.escape = ''
+    lexer.quotes = '"'
+    try:
+        return list(lexer)
+    except ValueError as e:
+        raise ValueError(f'参数格式错误: {e}')
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(int(len(ordered) * fraction), len(ordered) - 1)], 2)
+
+
+@dataclass
+class LaunchRecord:
+    """一次启动的记录"""
+    launch_id: int
+    path: str
+    argv: List[str]
+    pid: Optional[int]
+    started_at: float
+    spawn_ms: float
+    first_window_ms: Optional[float] = None
+    hwnd: Optional[int] = None
+    exit_code: Optional[int] = None
+    ended_at: Optional[float] = None
+    started_monotonic: float = field(default=0.0, repr=False)
+
+    @property
+    def running(self) -> bool:
+        return self.pid is not None and self.ended_at is None
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self.launch_id,
+            'path': self.path,
+            'argv': self.argv,
+            'pid': self.pid,
+            'running': self.running,
+            'started_at': self.started_at,
+            'spawn_ms': self.spawn_ms,
+            'first_window_ms': self.first_window_ms,
+            'hwnd': self.hwnd,
+            'exit_code': self.exit_code,
+            'ended_at': self.ended_at,
+        }
+
+
+class LaunchRegistry:
+    """启动记录 - 保存最近 history_size 次启动，后台线程回收已退出的子进程并记录退出码
+
+    通过窗口索引的监听器，把启动后该 pid 第一个可见窗口出现的时间记为 first_window_ms。
+    先启动一个引导进程再拉起真正进程的程序（例如部分浏览器）拿不到这个时间。
+    """
+
+    def __init__(self, window_index: WindowIndex, history_size: int = 200, reap_interval: float = 0.5):
+        self.window_index = window_index
+        self.reap_interval = reap_interval
+        self._records: Deque[LaunchRecord] = deque(maxlen=history_size)
+        self._by_id: Dict[int, LaunchRecord] = {}
+        self._children: Dict[int, ChildProcess] = {}
+        self._awaiting_window: Dict[int, LaunchRecord] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {'launches': 0, 'exited': 0, 'windows_seen': 0, 'window_timeouts': 0}
+        self._logger = logging.getLogger('LaunchRegistry')
+        window_index.add_listener(self._on_window)
+
+    def add(self, path: str, argv: List[str], child: Optional[ChildProcess],
+            started: float, spawn_s: float) -> LaunchRecord:
+        """登记一次启动；child 为 None 表示经系统外壳打开，没有 pid 可跟踪"""
+        record = LaunchRecord(
+            launch_id=next(self._ids),
+            path=path,
+            argv=argv,
+            pid=child.pid if child is not None else None,
+            started_at=time.time() - spawn_s,
+            spawn_ms=round(spawn_s * 1000, 2),
+            started_monotonic=started,
+        )
+        with self._lock:
+            if len(self._records) == self._records.maxlen:
+                evicted = self._records[0]
+                self._by_id.pop(evicted.launch_id, None)
+            self._records.append(record)
+            self._by_id[record.launch_id] = record
+            self._stats['launches'] += 1
+            if child is not None:
+                self._children[record.launch_id] = child
+                self._awaiting_window[child.pid] = record
+        if child is not None:
+            self._ensure_reaper()
+            self._wake.set()
+        return record
+
+    def _on_window(self, event: str, hwnd: int, window: Optional[WindowInfo]):
+        if window is None or not window.is_visible or not window.pid:
+            return
+        with self._lock:
+            record = self._awaiting_window.pop(window.pid, None)
+            if record is None:
+                return
+            record.first_window_ms = round((time.perf_counter() - record.started_monotonic) * 1000, 2)
+            record.hwnd = hwnd
+            self._stats['windows_seen'] += 1
+
+    # =================== 回收 ===================
+    def _ensure_reaper(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='launch-reaper', daemon=True)
+            self._thread.start()
+
+    def reap(self) -> int:
+        """检查一遍子进程，返回新退出的数量"""
+        with self._lock:
+            children = list(self._children.items())
+        exited = 0
+        for launch_id, child in children:
+            try:
+                exit_code = child.poll()
+            except OSError as e:
+                self._logger.error(f"检查子进程 {child.pid} 失败: {e}")
+                continue
+            if exit_code is None:
+                continue
+            with self._lock:
+                self._children.pop(launch_id, None)
+                record = self._by_id.get(launch_id)
+                if record is not None:
+                    record.exit_code = exit_code
+                    record.ended_at = time.time()
+                    self._awaiting_window.pop(child.pid, None)
+                self._stats['exited'] += 1
+            exited += 1
+
+        now = time.perf_counter()
+        with self._lock:
+            for pid, record in list(self._awaiting_window.items()):
+                if now - record.started_monotonic > WINDOW_WAIT_TIMEOUT:
+                    del self._awaiting_window[pid]
+                    self._stats['window_timeouts'] += 1
+            awaiting = bool(self._awaiting_window)
+        if awaiting and not self.window_index.live:
+            # 没有窗口事件时由回收线程按索引的 TTL 触发重新枚举
+            self.window_index.snapshot()
+        return exited
+
+    def _run(self):
+        while True:
+            with self._lock:
+                idle = not self._children and not self._awaiting_window
+            if idle:
+                self._wake.wait()
+            else:
+                self._wake.wait(self.reap_interval)
+            self._wake.clear()
+            try:
+                self.reap()
+            except Exception as e:
+                self._logger.error(f"回收子进程失败: {e}")
+
+    # =================== 查询 ===================
+    def query(self, launch_id: Optional[int] = None, running: bool = False, limit: int = 50) -> dict:
+        """最近的启动记录（新的在前）；launch_id 不存在时抛出 KeyError"""
+        limit = min(max(int(limit), 1), MAX_LAUNCH_RESULTS)
+        with self._lock:
+            if launch_id is not None:
+                record = self._by_id.get(launch_id)
+                if record is None:
+                    raise KeyError(launch_id)
+                return {'launches': [record.to_dict()], 'total_count': 1}
+            records = [r for r in reversed(self._records) if r.running or not running]
+            return {'launches': [r.to_dict() for r in records[:limit]], 'total_count': len(records)}
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['running'] = len(self._children)
+            stats['awaiting_window'] = len(self._awaiting_window)
+            spawn = [r.spawn_ms for r in self._records]
+            window = [r.first_window_ms for r in self._records if r.first_window_ms is not None]
+        stats['spawn_ms'] = {'p50': percentile(spawn, 0.5), 'p95': percentile(spawn, 0.95)}
+        stats['first_window_ms'] = {'p50': percentile(window, 0.5), 'p95': percentile(window, 0.95)}
+        return stats
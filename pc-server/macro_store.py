@@ -0,0 +1,321 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from input_dispatcher import InputDispatcher
+from input_engine import InputSequence, parse_key_combo, parse_key_name
+
+MACRO_ID_PATTERN = re.compile(r'^[A-Za-z0-9_\-]{1,64}$')
+MAX_STEPS = 100
+MAX_TEXT_LENGTH = 1000
+MAX_DELAY_MS = 10000
+
+
+@dataclass
+class Macro:
+    """已编译的宏"""
+    macro_id: str
+    name: str
+    definition: dict
+    # ('input', InputSequence) 或 ('command', category, action, params)
+    ops: List[tuple]
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self.macro_id,
+            'name': self.name,
+            'steps': len(self.definition.get('steps', [])),
+            'input_events': sum(op[1].event_count for op in self.ops if op[0] == 'input'),
+            'commands': sum(1 for op in self.ops if op[0] == 'command'),
+        }
+
+
+def macro_references(macro: Macro) -> List[str]:
+    """宏的 command 步骤中调用的其他宏"""
+    return [op[2] for op in macro.ops if op[0] == 'command' and op[1] == 'macro']
+
+
+def find_invalid_references(macros: Dict[str, Macro]) -> Dict[str, str]:
+    """检查宏之间的调用，返回 {宏 id: 原因}：引用了不存在的宏、处于循环引用中，或引用了这样的宏
+
+    只有引用的宏全部有效时宏才有效，从不引用其他宏的宏开始逐轮确认，剩下的都无效。
+    """
+    references = {macro_id: set(macro_references(macro)) for macro_id, macro in macros.items()}
+    valid = set()
+    changed = True
+    while changed:
+        changed = False
+        for macro_id, refs in references.items():
+            if macro_id not in valid and refs <= valid:
+                valid.add(macro_id)
+                changed = True
+
+    invalid = {}
+    for macro_id, refs in references.items():
+        if macro_id in valid:
+            continue
+        unknown = refs - macros.keys()
+        if unknown:
+            invalid[macro_id] = f'引用了不存在的宏: {", ".join(sorted(unknown))}'
+        else:
+            invalid[macro_id] = f'引用的宏无效或存在循环引用: {", ".join(sorted(refs - valid))}'
+    return invalid
+
+
+class MacroStore:
+    """服务端宏存储 - 注册时校验并编译成可直接注入的输入序列，调用时不再解析
+
+    宏定义示例:
+        {"name": "任务管理器", "steps": [{"keys": "ctrl+shift+esc"}]}
+        {"steps": [{"keys": "win+r"}, {"delay_ms": 300}, {"text": "notepad"}, {"keys": "enter"}]}
+        {"steps": [{"command": {"category": "window", "action": "maximize"}}]}
+    相邻的 keys / text / delay_ms 步骤会编译进同一个输入序列，由派发线程一次执行。
+    command 步骤可以调用其他宏，被调用的宏必须已经存在，并且不能形成循环调用。
+    """
+
+    def __init__(self, path: str, controller, dispatcher: InputDispatcher,
+                 executor: Callable[[str, str, dict], Tuple[dict, int]],
+                 command_validator: Optional[Callable[[str, str], bool]] = None,
+                 poll_interval: float = 1.0, step_timeout: float = 5.0):
+        self.path = path
+        self.controller = controller
+        self.dispatcher = dispatcher
+        self.executor = executor
+        self.command_validator = command_validator
+        self.poll_interval = poll_interval
+        # 含命令的宏每个输入步骤最多等待的秒数
+        self.step_timeout = step_timeout
+        self._macros: Dict[str, Macro] = {}
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._logger = logging.getLogger('MacroStore')
+
+    # =================== 编译 ===================
+    def compile(self, macro_id: str, definition: dict) -> Macro:
+        """校验并编译宏定义，格式错误时抛出 ValueError"""
+        if not MACRO_ID_PATTERN.match(str(macro_id)):
+            raise ValueError('宏 id 只能包含字母、数字、下划线和短横线，长度 1-64')
+        if not isinstance(definition, dict):
+            raise ValueError('宏定义必须是对象')
+        steps = definition.get('steps')
+        if not isinstance(steps, list) or not steps:
+            raise ValueError('steps 必须是非空数组')
+        if len(steps) > MAX_STEPS:
+            raise ValueError(f'steps 不能超过 {MAX_STEPS} 步')
+
+        ops: List[tuple] = []
+        sequence: Optional[InputSequence] = None
+
+        for index, step in enumerate(steps):
+            if not isinstance(step, dict):
+                raise ValueError(f'第 {index + 1} 步必须是对象')
+            kinds = [kind for kind in ('keys', 'text', 'delay_ms', 'command') if kind in step]
+            if len(kinds) != 1:
+                raise ValueError(f'第 {index + 1} 步必须且只能包含 keys / text / delay_ms / command 之一')
+            kind = kinds[0]
+
+            if kind == 'command':
+                command = step['command']
+                if not isinstance(command, dict) or not command.get('category') or not command.get('action'):
+                    raise ValueError(f'第 {index + 1} 步 command 需要 category 和 action')
+                params = command.get('params') or {}
+                if not isinstance(params, dict):
+                    raise ValueError(f'第 {index + 1} 步 command.params 必须是对象')
+                if self.command_validator and not self.command_validator(command['category'], command['action']):
+                    raise ValueError(f'第 {index + 1} 步命令不存在: {command["category"]}/{command["action"]}')
+                if sequence is not None:
+                    ops.append(('input', sequence))
+                    sequence = None
+                ops.append(('command', command['category'], command['action'], dict(params)))
+                continue
+
+            if sequence is None:
+                sequence = InputSequence()
+            try:
+                if kind == 'keys':
+                    keys = step['keys']
+                    keys = parse_key_combo(keys) if isinstance(keys, str) else [parse_key_name(str(k)) for k in keys]
+                    sequence.combo(keys, max(float(step.get('hold_ms', 0)), 0.0) / 1000)
+                elif kind == 'text':
+                    text = str(step['text'])
+                    if len(text) > MAX_TEXT_LENGTH:
+                        raise ValueError(f'text 不能超过 {MAX_TEXT_LENGTH} 个字符')
+                    sequence.text(text)
+                else:
+                    delay_ms = float(step['delay_ms'])
+                    if not 0 <= delay_ms <= MAX_DELAY_MS:
+                        raise ValueError(f'delay_ms 必须在 0-{MAX_DELAY_MS} 之间')
+                    sequence.pause(delay_ms / 1000)
+            except (TypeError, ValueError) as e:
+                raise ValueError(f'第 {index + 1} 步无效: {e}')
+
+        if sequence is not None and sequence.event_count:
+            ops.append(('input', sequence))
+
+        return Macro(str(macro_id), str(definition.get('name') or macro_id), definition, ops)
+
+    # =================== 存储 ===================
+    def load(self) -> int:
+        """从文件加载并编译全部宏，返回加载数量；文件中的无效宏会被跳过"""
+        if not os.path.exists(self.path):
+            self._mtime = None
+            self._macros = {}
+            return 0
+
+        mtime = os.path.getmtime(self.path)
+        with open(self.path, encoding='utf-8') as f:
+            data = json.load(f)
+
+        macros = {}
+        for macro_id, definition in (data.get('macros') or {}).items():
+            try:
+                macros[macro_id] = self.compile(macro_id, definition)
+            except ValueError as e:
+                self._logger.error(f"宏 {macro_id} 无效，已跳过: {e}")
+        for macro_id, reason in find_invalid_references(macros).items():
+            self._logger.error(f"宏 {macro_id} 无效，已跳过: {reason}")
+            del macros[macro_id]
+
+        with self._lock:
+            self._macros = macros
+            self._mtime = mtime
+        return len(macros)
+
+    def register(self, macro_id: str, definition: dict) -> Macro:
+        """注册（或覆盖）一个宏并持久化"""
+        macro = self.compile(macro_id, definition)
+        with self._lock:
+            macros = dict(self._macros)
+            macros[macro.macro_id] = macro
+            invalid = find_invalid_references(macros)
+            if invalid:
+                raise ValueError(invalid.get(macro.macro_id) or next(iter(invalid.values())))
+            self._save(macros)
+            self._macros = macros
+        return macro
+
+    def remove(self, macro_id: str) -> bool:
+        """删除宏；被其他宏调用的宏不能删除，抛出 ValueError"""
+        with self._lock:
+            if macro_id not in self._macros:
+                return False
+            callers = sorted(other for other, macro in self._macros.items()
+                             if other != macro_id and macro_id in macro_references(macro))
+            if callers:
+                raise ValueError(f'宏 {macro_id} 被其他宏调用: {", ".join(callers)}')
+            macros = dict(self._macros)
+            del macros[macro_id]
+            self._save(macros)
+            self._macros = macros
+        return True
+
+    def get(self, macro_id: str) -> Optional[Macro]:
+        return self._macros.get(macro_id)
+
+    def list(self) -> List[dict]:
+        return [macro.to_dict() for macro in self._macros.values()]
+
+    def _save(self, macros: Dict[str, Macro]):
+        """原子写入宏文件"""
+        data = {'macros': {macro_id: macro.definition for macro_id, macro in macros.items()}}
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+        self._mtime = os.path.getmtime(self.path)
+
+    # =================== 热重载 ===================
+    def start_watching(self):
+        """启动文件监视线程，文件变化时自动重新加载"""
+        if self._watcher is not None:
+            return
+        self._watcher = threading.Thread(target=self._watch, name='macro-watcher', daemon=True)
+        self._watcher.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_interval)
+            mtime = None
+            try:
+                mtime = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+                if mtime != self._mtime:
+                    count = self.load()
+                    self._logger.info(f"宏文件已变化，重新加载 {count} 个宏")
+            except Exception as e:
+                self._logger.error(f"重新加载宏文件失败: {e}")
+                self._mtime = mtime
+
+    # =================== 执行 ===================
+    def run(self, macro_id: str, wait: bool = False) -> dict:
+        """执行宏；纯输入宏直接交给派发线程，含命令的宏按顺序同步执行
+
+        含命令的宏每一步都等待执行完成；等待超时、步骤仍在排队时停止后续步骤，该步骤标记为 pending。
+        """
+        macro = self._macros.get(macro_id)
+        if macro is None:
+            return {'success': False, 'message': f'宏不存在: {macro_id}'}
+
+        if len(macro.ops) == 1 and macro.ops[0][0] == 'input':
+            sequence = macro.ops[0][1]
+            result = self.dispatcher.submit(
+                f'macro_{macro_id}',
+                lambda: self.controller.send_input_sequence(sequence, macro_id),
+                wait=wait
+            )
+            result['macro'] = macro_id
+            return result
+
+        start = time.perf_counter()
+        steps = []
+        for op in macro.ops:
+            if op[0] == 'input':
+                # 绑定当前的序列：等待超时后命令仍在队列里，执行时不能取到后面步骤的序列
+                result = self.dispatcher.submit(
+                    f'macro_{macro_id}',
+                    lambda sequence=op[1]: self.controller.send_input_sequence(sequence, macro_id),
+                    wait=True,
+                    timeout=self.step_timeout
+                )
+                step = {'type': 'input', 'success': bool(result.get('success')), 'message': result.get('message', '')}
+            else:
+                _, category, action, params = op
+                params = dict(params)
+                params.setdefault('wait', True)
+                result, status = self.executor(category, action, params)
+                step = {
+                    'type': 'command',
+                    'category': category,
+                    'action': action,
+                    'success': bool(result.get('success')) and status < 400,
+                    'message': result.get('message', '')
+                }
+            if result.get('queued'):
+                # 等待超时，步骤还没有执行；后续步骤依赖它的结果，不能继续
+                step['success'] = False
+                step['pending'] = True
+                step['command_id'] = result.get('command_id')
+            steps.append(step)
+            if not step['success']:
+                break
+
+        success = all(step['success'] for step in steps) and len(steps) == len(macro.ops)
+        pending = bool(steps) and steps[-1].get('pending', False)
+        if success:
+            message = f'宏 {macro.name} 已执行'
+        elif pending:
+            message = f'宏 {macro.name} 第 {len(steps)} 步等待超时仍在排队，已停止后续步骤'
+        else:
+            message = f'宏 {macro.name} 执行失败'
+        return {
+            'success': success,
+            'message': message,
+            'macro': macro_id,
+            'steps': steps,
+            'total_ms': round((time.perf_counter() - start) * 1000, 2)
+        }
@@ -0,0 +1,197 @@
+import math
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# 历史中保存的标量序列: 名称 -> 从采样快照中取值的路径
+HISTORY_SERIES: Dict[str, Tuple[str, ...]] = {
+    'cpu_percent': ('cpu_percent',),
+    'memory_percent': ('memory', 'percent'),
+    'disk_percent': ('disk', 'percent'),
+    'send_rate': ('network', 'send_rate'),
+    'recv_rate': ('network', 'recv_rate'),
+}
+# (分辨率秒, 保留秒): 1 秒保留 10 分钟，10 秒保留 6 小时，1 分钟保留 3 天
+DEFAULT_TIERS = ((1, 600), (10, 6 * 3600), (60, 3 * 86400))
+MAX_POINTS = 2000
+DEFAULT_POINTS = 300
+
+NAN = float('nan')
+
+
+def parse_tiers(spec: str) -> List[Tuple[int, int]]:
+    """解析分级配置，格式 "1:600,10:21600,60:259200"（分辨率秒:保留秒）"""
+    tiers = []
+    for part in spec.split(','):
+        resolution, retention = (int(value) for value in part.split(':'))
+        if resolution <= 0 or retention < resolution:
+            raise ValueError(f'无效的历史分级: {part}')
+        tiers.append((resolution, retention))
+    return sorted(tiers)
+
+
+class _Tier:
+    """单个分辨率的环形缓冲区，每个序列一个定长 float 数组，槽位按时间桶号取模"""
+
+    def __init__(self, resolution: int, retention: int, series: Sequence[str]):
+        self.resolution = resolution
+        self.capacity = retention // resolution
+        # 槽位当前保存的桶号，桶号不匹配的槽位视为空
+        self.buckets = array('q', [-1]) * self.capacity
+        self.values = {name: array('f', [NAN]) * self.capacity for name in series}
+        self._bucket = -1
+        self._sums = dict.fromkeys(series, 0.0)
+        self._counts = dict.fromkeys(series, 0)
+
+    def add(self, timestamp: float, values: Dict[str, float]):
+        """累加一个采样点，当前桶的均值直接写入槽位，查询时无需等待桶结束"""
+        bucket = int(timestamp // self.resolution)
+        if bucket < self._bucket:
+            return
+        if bucket != self._bucket:
+            self._bucket = bucket
+            for name in self._sums:
+                self._sums[name] = 0.0
+                self._counts[name] = 0
+            slot = bucket % self.capacity
+            self.buckets[slot] = bucket
+            for column in self.values.values():
+                column[slot] = NAN
+
+        slot = bucket % self.capacity
+        for name, value in values.items():
+            self._sums[name] += value
+            self._counts[name] += 1
+            self.values[name][slot] = self._sums[name] / self._counts[name]
+
+    @property
+    def retention(self) -> int:
+        return self.capacity * self.resolution
+
+    def oldest_bucket(self) -> int:
+        return self._bucket - self.capacity + 1
+
+    def filled(self) -> int:
+        oldest = self.oldest_bucket()
+        return sum(1 for bucket in self.buckets if bucket >= oldest)
+
+    def nbytes(self) -> int:
+        arrays = [self.buckets, *self.values.values()]
+        return sum(a.buffer_info()[1] * a.itemsize for a in arrays)
+
+
+class MetricsHistory:
+    """系统指标历史 - 定长数组环形缓冲区，多级分辨率汇总
+
+    每个采样同时写入所有分级；查询时选择能覆盖起点且不比 step 更细的最粗分级，
+    只遍历请求范围内的槽位，再按 step 合并，不复制整个缓冲区。内存占用在创建时即固定。
+    """
+
+    def __init__(self, tiers: Iterable[Tuple[int, int]] = DEFAULT_TIERS,
+                 series: Iterable[str] = HISTORY_SERIES):
+        self.series = [name for name in series if name in HISTORY_SERIES]
+        self._tiers = [_Tier(resolution, retention, self.series) for resolution, retention in sorted(tiers)]
+        self.memory_bytes = sum(tier.nbytes() for tier in self._tiers)
+        self._lock = threading.Lock()
+        self._recorded = 0
+
+    def record(self, sample: dict):
+        """写入一个采样快照（可直接作为 MetricsSampler 的监听器）"""
+        values = {}
+        for name in self.series:
+            value = sample
+            for key in HISTORY_SERIES[name]:
+                value = value.get(key) if isinstance(value, dict) else None
+            if isinstance(value, (int, float)):
+                values[name] = float(value)
+        timestamp = sample.get('sampled_at') or time.time()
+
+        with self._lock:
+            for tier in self._tiers:
+                tier.add(timestamp, values)
+            self._recorded += 1
+
+    def query(self, start: Optional[float] = None, end: Optional[float] = None,
+              step: Optional[float] = None, names: Optional[Iterable[str]] = None) -> dict:
+        """按时间范围查询降采样序列；start / end 为负数时表示相对当前时间的秒数，参数错误时抛出 ValueError"""
+        now = time.time()
+        end = now if end is None else (now + end if end <= 0 else end)
+        start = end - 600 if start is None else (now + start if start < 0 else start)
+        if start >= end:
+            raise ValueError('from 必须早于 to')
+
+        names = list(names) if names else self.series
+        unknown = [name for name in names if name not in self.series]
+        if unknown:
+            raise ValueError(f'不支持的指标: {unknown}，可选: {self.series}')
+
+        if step is None:
+            step = (end - start) / DEFAULT_POINTS
+        if step <= 0:
+            raise ValueError('step 必须大于 0')
+        tier = self._select_tier(start, now, step)
+        # step 向上取整到分级分辨率的整数倍
+        group = max(1, math.ceil(step / tier.resolution))
+        step = group * tier.resolution
+        first = int(start // step) * group
+        last = int(end // tier.resolution)
+        if (last - first) // group + 1 > MAX_POINTS:
+            raise ValueError(f'数据点过多，请增大 step（最多 {MAX_POINTS} 个点）')
+
+        timestamps: List[int] = []
+        series: Dict[str, List[Optional[float]]] = {name: [] for name in names}
+        with self._lock:
+            first = max(first, tier.oldest_bucket() // group * group)
+            for group_start in range(first, last + 1, group):
+                sums = dict.fromkeys(names, 0.0)
+                counts = dict.fromkeys(names, 0)
+                for bucket in range(group_start, min(group_start + group, last + 1)):
+                    slot = bucket % tier.capacity
+                    if tier.buckets[slot] != bucket:
+                        continue
+                    for name in names:
+                        value = tier.values[name][slot]
+                        if value == value:  # 跳过 NaN
+                            sums[name] += value
+                            counts[name] += 1
+                if not any(counts.values()):
+                    continue
+                timestamps.append(group_start * tier.resolution)
+                for name in names:
+                    series[name].append(round(sums[name] / counts[name], 2) if counts[name] else None)
+
+        return {
+            'from': round(start, 3),
+            'to': round(end, 3),
+            'step': step,
+            'resolution': tier.resolution,
+            'timestamps': timestamps,
+            'series': series,
+        }
+
+    def _select_tier(self, start: float, now: float, step: float) -> _Tier:
+        """选择覆盖起点且分辨率不超过 step 的最粗分级；都不满足时退而求其次"""
+        covering = [tier for tier in self._tiers if now - tier.retention <= start]
+        if not covering:
+            return self._tiers[-1]
+        fitting = [tier for tier in covering if tier.resolution <= step]
+        return fitting[-1] if fitting else covering[0]
+
+    def stats(self) -> dict:
+        """各分级容量、已填充槽位和内存占用"""
+        with self._lock:
+            tiers = [{
+                'resolution': tier.resolution,
+                'retention': tier.retention,
+                'capacity': tier.capacity,
+                'filled': tier.filled(),
+                'bytes': tier.nbytes(),
+            } for tier in self._tiers]
+            recorded = self._recorded
+        return {
+            'series': self.series,
+            'recorded': recorded,
+            'tiers': tiers,
+            'memory_bytes': self.memory_bytes,
+        }
@@ -0,0 +1,93 @@
+import logging
+import threading
+import time
+from typing import Callable, Iterable, List, Optional
+
+from controller_backends import ControllerBackend
+
+ALL_METRICS = ('cpu', 'per_cpu', 'memory', 'disk', 'network')
+
+
+class MetricsSampler:
+    """系统指标采样器 - 后台线程按固定间隔采集，请求只读取最新快照"""
+
+    def __init__(self, backend: ControllerBackend, interval: float = 1.0,
+                 metrics: Iterable[str] = ALL_METRICS):
+        self.backend = backend
+        self.interval = interval
+        self.metrics = {m for m in metrics if m in ALL_METRICS}
+        self.error: Optional[str] = None
+        self._snapshot: Optional[dict] = None
+        self._last_network = None
+        self._listeners: List[Callable[[dict], None]] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._logger = logging.getLogger('MetricsSampler')
+
+    def start(self):
+        """立即采样一次并启动后台线程"""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.sample()
+            self._thread = threading.Thread(target=self._run, name='metrics-sampler', daemon=True)
+            self._thread.start()
+
+    def add_listener(self, listener: Callable[[dict], None]):
+        """注册监听器，每次采样成功后在采样线程中以快照为参数调用"""
+        self._listeners.append(listener)
+
+    def latest(self) -> Optional[dict]:
+        """最新的指标快照（只读）"""
+        self.start()
+        return self._snapshot
+
+    def sample(self) -> Optional[dict]:
+        """采集一次指标并替换快照"""
+        start = time.perf_counter()
+        try:
+            sample = self.backend.sample_metrics(self.metrics)
+        except ImportError:
+            self.error = '需要安装 psutil: pip install psutil'
+            return None
+        except Exception as e:
+            self.error = f'采集系统指标失败: {str(e)}'
+            self._logger.error(self.error)
+            return None
+
+        now = time.time()
+        network = sample.get('network')
+        if network is not None:
+            # 根据两次计数换算速率
+            last = self._last_network
+            if last is not None and now > last[0]:
+                elapsed = now - last[0]
+                network['send_rate'] = round(max(network['bytes_sent'] - last[1]['bytes_sent'], 0) / elapsed, 1)
+                network['recv_rate'] = round(max(network['bytes_recv'] - last[1]['bytes_recv'], 0) / elapsed, 1)
+            else:
+                network['send_rate'] = network['recv_rate'] = 0.0
+            self._last_network = (now, dict(network))
+
+        sample['sampled_at'] = now
+        sample['sample_cost_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        self._snapshot = sample
+        self.error = None
+        for listener in self._listeners:
+            try:
+                listener(sample)
+            except Exception as e:
+                self._logger.error(f"指标监听器出错: {e}")
+        return sample
+
+    def _run(self):
+        next_at = time.monotonic()
+        while True:
+            next_at += self.interval
+            delay = next_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_at = time.monotonic()
+            self.sample()
@@ -0,0 +1,169 @@
+import fnmatch
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from controller_backends import ControllerBackend, ProcessInfo
+from process_table import ProcessTable
+from window_index import WindowIndex
+
+MAX_KILL_TARGETS = 256
+MAX_GRACE_PERIOD = 30.0
+# 强制结束后等待进程真正退出的时间
+FORCE_WAIT = 2.0
+# 不允许结束的进程: Idle / System 和服务器自己
+RESERVED_PIDS = frozenset({0, 4})
+
+# 每个进程的结果: closed 响应 WM_CLOSE 正常退出, killed 被强制结束, gone 开始处理前已经退出,
+# denied 没有权限, failed 其他错误或强制结束后仍未退出, skipped 受保护的进程
+OUTCOMES = ('closed', 'killed', 'gone', 'denied', 'failed', 'skipped')
+TERMINATED = ('closed', 'killed', 'gone')
+
+
+def is_pattern(name: str) -> bool:
+    return any(c in name for c in '*?[')
+
+
+def same_process(expected: ProcessInfo, live: ProcessInfo) -> bool:
+    """pid 是否仍然属于解析时的那个进程：名称和启动时间都要一致，任一方缺少的信息不比较"""
+    if expected.name and live.name and expected.name.lower() != live.name.lower():
+        return False
+    if expected.create_time and live.create_time and abs(expected.create_time - live.create_time) > 0.01:
+        return False
+    return True
+
+
+class ProcessKiller:
+    """批量结束进程 - 按名称或通配符在进程表快照中解析目标（pid 实时查询），在线程池中并行结束
+
+    grace 大于 0 时先向进程的窗口投递 WM_CLOSE，等待 grace 秒仍未退出再强制结束；
+    有窗口索引时每次调用只从索引生成一份 pid → 窗口的映射，不再为每个进程各枚举一遍窗口。
+    快照可能已经过时，每次操作进程之前都会实时核对名称和启动时间，pid 被其他进程复用时不会误杀。
+    """
+
+    def __init__(self, backend: ControllerBackend, process_table: ProcessTable,
+                 window_index: Optional[WindowIndex] = None, max_workers: int = 16):
+        self.backend = backend
+        self.process_table = process_table
+        self.window_index = window_index
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='process-killer')
+        self._lock = threading.Lock()
+        self._stats: Dict[str, int] = {'requests': 0, **{outcome: 0 for outcome in OUTCOMES}}
+
+    def resolve(self, names: Iterable[str] = (), pids: Iterable[int] = (),
+                patterns: Iterable[str] = ()) -> dict:
+        """解析目标，返回 {'processes': 去重后的进程列表, 'unmatched': 没有匹配到任何进程的条件,
+        'missing': 不存在的 pid}"""
+        _, snapshot = self.process_table.snapshot()
+        matched: Dict[int, ProcessInfo] = {}
+        unmatched: List[str] = []
+        missing: List[int] = []
+
+        for pid in pids:
+            if pid in RESERVED_PIDS or pid == os.getpid():
+                matched[pid] = ProcessInfo(pid, '', '', 0)
+                continue
+            # 按 pid 结束时以当前实际的进程为准，快照可能已经过时或还没有这个进程
+            process = self.backend.process_info(pid)
+            if process is None:
+                missing.append(pid)
+            else:
+                matched[pid] = process
+
+        names = [name for name in names if name]
+        patterns = [pattern for pattern in patterns if pattern]
+        for name in names:
+            if is_pattern(name):
+                patterns.append(name)
+                continue
+            needle = name.lower()
+            hits = [p for p in snapshot if p.name.lower() == needle]
+            if not hits:
+                unmatched.append(name)
+            matched.update((p.pid, p) for p in hits)
+        for pattern in patterns:
+            regex = re.compile(fnmatch.translate(pattern.lower()))
+            hits = [p for p in snapshot if regex.match(p.name.lower())]
+            if not hits:
+                unmatched.append(pattern)
+            matched.update((p.pid, p) for p in hits)
+
+        if len(matched) > MAX_KILL_TARGETS:
+            raise ValueError(f'一次最多结束 {MAX_KILL_TARGETS} 个进程，当前匹配到 {len(matched)} 个')
+        return {
+            'processes': sorted(matched.values(), key=lambda p: p.pid),
+            'unmatched': unmatched,
+            'missing': [pid for pid in missing if pid not in matched],
+        }
+
+    def kill(self, names: Iterable[str] = (), pids: Iterable[int] = (), patterns: Iterable[str] = (),
+             grace: float = 0.0) -> dict:
+        """结束匹配的进程，返回每个进程的结果；参数错误时抛出 ValueError"""
+        if not 0 <= grace <= MAX_GRACE_PERIOD:
+            raise ValueError(f'grace 必须在 0-{MAX_GRACE_PERIOD} 秒之间')
+        start = time.perf_counter()
+        resolved = self.resolve(names, pids, patterns)
+        windows = self._windows_by_pid() if grace > 0 else None
+        results = list(self._executor.map(lambda p: self._kill_one(p, grace, windows), resolved['processes']))
+        results.extend({'pid': pid, 'name': '', 'outcome': 'gone', 'message': f'进程不存在: {pid}'}
+                       for pid in resolved['missing'])
+
+        with self._lock:
+            self._stats['requests'] += 1
+            for result in results:
+                self._stats[result['outcome']] += 1
+        return {
+            'results': results,
+            'unmatched': resolved['unmatched'],
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 2),
+        }
+
+    def _windows_by_pid(self) -> Optional[Dict[int, List[int]]]:
+        """从窗口索引生成 pid → 可见窗口的映射；没有窗口索引时返回 None，由后端自己枚举"""
+        if self.window_index is None:
+            return None
+        _, snapshot = self.window_index.snapshot()
+        windows: Dict[int, List[int]] = {}
+        for window in snapshot:
+            if window.is_visible and window.pid:
+                windows.setdefault(window.pid, []).append(window.hwnd)
+        return windows
+
+    def _kill_one(self, process: ProcessInfo, grace: float,
+                  windows: Optional[Dict[int, List[int]]] = None) -> dict:
+        result = {'pid': process.pid, 'name': process.name}
+        if process.pid in RESERVED_PIDS or process.pid == os.getpid():
+            return dict(result, outcome='skipped', message='受保护的进程')
+        try:
+            self._verify(process)
+            hwnds = None if windows is None else windows.get(process.pid, [])
+            if grace > 0 and self.backend.close_process_windows(process.pid, hwnds):
+                if self.backend.wait_process(process.pid, grace):
+                    return dict(result, outcome='closed')
+                # 等待期间进程可能已经退出、pid 被复用
+                self._verify(process)
+            self.backend.terminate_process(process.pid)
+            if not self.backend.wait_process(process.pid, FORCE_WAIT):
+                return dict(result, outcome='failed', message='强制结束后进程仍未退出')
+            return dict(result, outcome='killed')
+        except ProcessLookupError as e:
+            return dict(result, outcome='gone', message=str(e))
+        except PermissionError as e:
+            return dict(result, outcome='denied', message=str(e))
+        except Exception as e:
+            return dict(result, outcome='failed', message=str(e))
+
+    def _verify(self, process: ProcessInfo):
+        """实时核对 pid 仍然是解析时的进程，已退出或被复用时抛出 ProcessLookupError"""
+        live = self.backend.process_info(process.pid)
+        if live is None:
+            raise ProcessLookupError(f'进程不存在: {process.pid}')
+        if not same_process(process, live):
+            raise ProcessLookupError(f'进程已退出，pid {process.pid} 已被 {live.name or "其他进程"} 复用')
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
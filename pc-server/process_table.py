@@ -0,0 +1,260 @@
+import base64
+import bisect
+import json
+import logging
+import itertools
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional, Tuple
+
+from controller_backends import ControllerBackend, ProcessInfo
+
+SORT_KEYS = {
+    'memory': lambda p: (-p.memory_usage, p.pid),
+    'pid': lambda p: (p.pid,),
+    'name': lambda p: (p.name.lower(), p.pid),
+}
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(sort: str, key: tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps([sort, *key]).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(sort: str, cursor: str) -> tuple:
+    """解析分页游标，格式错误或与排序方式不匹配时抛出 ValueError"""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        data = None
+    if not isinstance(data, list) or not data or data[0] != sort:
+        raise ValueError(f'无效的分页游标: {cursor}')
+    return tuple(data[1:])
+
+
+@dataclass
+class ProcessDelta:
+    """两个版本之间的进程变化"""
+    version: int
+    added: List[ProcessInfo]
+    removed: List[int]
+    changed: List[ProcessInfo]
+
+
+class ProcessTable:
+    """进程表 - 后台线程按 TTL 定期刷新快照，查询只读内存
+
+    分页使用键集游标（上一页最后一项的排序键），刷新之间进程增减也不会导致重复或跳过。
+    每次快照有变化时版本号加一并记录增量，客户端可以只拉取某个版本之后的变化；
+    内存变化小于 memory_threshold 的进程不算变化，空闲时版本号保持不变。
+    """
+
+    def __init__(self, backend: ControllerBackend, ttl: float = 2.0,
+                 memory_threshold: int = 1024 * 1024, history_size: int = 256):
+        self.backend = backend
+        self.ttl = ttl
+        self.memory_threshold = memory_threshold
+        self.version = 0
+        # 只在进程启动、退出或名称/路径变化时递增，内存变化不影响；用于只依赖进程身份的缓存
+        self.identity_version = 0
+        self._deltas: Deque[ProcessDelta] = deque(maxlen=history_size)
+        self._entries: Dict[int, ProcessInfo] = {}
+        self._sorted: Dict[str, Tuple[List[tuple], List[ProcessInfo]]] = {}
+        self._taken_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {'refreshes': 0, 'refresh_errors': 0, 'last_refresh_ms': 0.0}
+        self._logger = logging.getLogger('ProcessTable')
+
+    def start(self):
+        """立即生成第一份快照并启动后台刷新线程"""
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self.refresh()
+            self._thread = threading.Thread(target=self._run, name='process-table', daemon=True)
+            self._thread.start()
+
+    def refresh(self) -> bool:
+        """刷新快照"""
+        with self._refresh_lock:
+            start = time.perf_counter()
+            try:
+                processes = self.backend.list_processes()
+            except Exception as e:
+                self._logger.error(f"刷新进程表失败: {e}")
+                with self._lock:
+                    self._stats['refresh_errors'] += 1
+                return False
+
+            entries = {p.pid: p for p in processes}
+            with self._lock:
+                self._publish(entries)
+                self._taken_at = time.time()
+                self._stats['refreshes'] += 1
+                self._stats['last_refresh_ms'] = round((time.perf_counter() - start) * 1000, 2)
+            return True
+
+    def _publish(self, entries: Dict[int, ProcessInfo]):
+        """与当前快照比较，有变化时生成新版本（持有锁）"""
+        old = self._entries
+        added, changed = [], []
+        renamed = False
+        for pid, process in entries.items():
+            previous = old.get(pid)
+            if previous is None:
+                added.append(process)
+            elif (previous.name != process.name or previous.executable != process.executable
+                  or previous.create_time != process.create_time):
+                changed.append(process)
+                renamed = True
+            elif abs(previous.memory_usage - process.memory_usage) >= self.memory_threshold:
+                changed.append(process)
+            else:
+                # 变化不明显的进程保留上次发布的值，保证增量与全量一致
+                entries[pid] = previous
+        removed = [pid for pid in old if pid not in entries]
+
+        if not (added or removed or changed):
+            return
+        self._entries = entries
+        self._sorted = {}
+        self.version += 1
+        if added or removed or renamed:
+            self.identity_version += 1
+        if self.version > 1:
+            self._deltas.append(ProcessDelta(self.version, added, removed, changed))
+
+    def identity(self) -> int:
+        """当前的 identity_version（进程集合的版本号）"""
+        self.start()
+        return self.identity_version
+
+    def get(self, pid: int) -> Optional[ProcessInfo]:
+        """按 pid 查找当前快照中的进程"""
+        self.start()
+        return self._entries.get(pid)
+
+    def snapshot(self) -> Tuple[int, List[ProcessInfo]]:
+        """当前快照的 (版本号, 进程列表)"""
+        self.start()
+        with self._lock:
+            return self.version, list(self._entries.values())
+
+    def delta(self, since: int) -> dict:
+        """返回 since 版本之后的增量；since 太旧或无效时返回全量"""
+        self.start()
+        with self._lock:
+            version = self.version
+            oldest_base = self._deltas[0].version - 1 if self._deltas else version
+            if since == version:
+                return {'version': version, 'full': False, 'added': [], 'removed': [], 'changed': []}
+            if since < oldest_base or since > version:
+                return {
+                    'version': version,
+                    'full': True,
+                    'processes': [self._to_dict(p) for p in self._entries.values()]
+                }
+            deltas = [d for d in self._deltas if d.version > since]
+
+        # 合并多个版本：先增后删的进程直接忽略，先删后增（pid 复用）视为变化
+        state: Dict[int, Tuple[str, Optional[ProcessInfo]]] = {}
+        for d in deltas:
+            for process in d.added:
+                previous = state.get(process.pid)
+                state[process.pid] = ('changed' if previous and previous[0] == 'removed' else 'added', process)
+            for process in d.changed:
+                previous = state.get(process.pid)
+                state[process.pid] = ('added' if previous and previous[0] == 'added' else 'changed', process)
+            for pid in d.removed:
+                previous = state.get(pid)
+                if previous and previous[0] == 'added':
+                    del state[pid]
+                else:
+                    state[pid] = ('removed', None)
+
+        return {
+            'version': version,
+            'full': False,
+            'added': [self._to_dict(p) for kind, p in state.values() if kind == 'added'],
+            'removed': [pid for pid, (kind, _) in state.items() if kind == 'removed'],
+            'changed': [self._to_dict(p) for kind, p in state.values() if kind == 'changed'],
+        }
+
+    def query(self, name: Optional[str] = None, sort: str = 'memory', limit: int = 50,
+              cursor: Optional[str] = None) -> dict:
+        """按名称子串过滤、排序并分页；参数错误时抛出 ValueError"""
+        if sort not in SORT_KEYS:
+            raise ValueError(f'不支持的排序方式: {sort}，可选: {list(SORT_KEYS)}')
+        limit = min(max(int(limit), 1), MAX_PAGE_SIZE)
+        after = decode_cursor(sort, cursor) if cursor else None
+        self.start()
+
+        with self._lock:
+            keys, ordered = self._sorted_view(sort)
+            taken_at = self._taken_at
+            version = self.version
+
+        try:
+            start = bisect.bisect_right(keys, after) if after is not None else 0
+        except TypeError:
+            raise ValueError(f'无效的分页游标: {cursor}')
+        needle = name.lower() if name else None
+        # total_count 是符合过滤条件的进程数，与窗口、应用搜索一致
+        total = sum(1 for p in ordered if needle in p.name.lower()) if needle else len(ordered)
+        page: List[ProcessInfo] = []
+        has_more = False
+        for process in itertools.islice(ordered, start, None):
+            if needle and needle not in process.name.lower():
+                continue
+            if len(page) == limit:
+                has_more = True
+                break
+            page.append(process)
+
+        return {
+            'processes': [self._to_dict(p) for p in page],
+            'next_cursor': encode_cursor(sort, SORT_KEYS[sort](page[-1])) if has_more else None,
+            'total_count': total,
+            'version': version,
+            'snapshot_age_ms': round((time.time() - taken_at) * 1000, 1) if taken_at else None,
+        }
+
+    def _sorted_view(self, sort: str) -> Tuple[List[tuple], List[ProcessInfo]]:
+        """当前快照按指定方式排序的视图，每个快照每种排序只计算一次（持有锁）"""
+        view = self._sorted.get(sort)
+        if view is None:
+            key = SORT_KEYS[sort]
+            ordered = sorted(self._entries.values(), key=key)
+            view = ([key(p) for p in ordered], ordered)
+            self._sorted[sort] = view
+        return view
+
+    @staticmethod
+    def _to_dict(process: ProcessInfo) -> dict:
+        return {
+            'name': process.name,
+            'pid': process.pid,
+            'memory_kb': process.memory_usage // 1024,
+            'executable': process.executable,
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['processes'] = len(self._entries)
+            stats['version'] = self.version
+            stats['deltas'] = len(self._deltas)
+        stats['ttl'] = self.ttl
+        return stats
+
+    def _run(self):
+        while True:
+            time.sleep(self.ttl)
+            self.refresh()
@@ -0,0 +1,145 @@
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+from collections import deque
+from typing import Deque, List, Optional
+
+CONSOLE_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+MAX_RECENT_RESULTS = 1000
+# 记录请求参数时字符串的最大长度
+MAX_PARAM_LENGTH = 200
+
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """只把日志记录放进队列，格式化和写出都在后台线程中进行；队列满时丢弃并计数"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 默认实现会在调用线程里格式化消息（为了能跨进程传递），同进程的队列不需要
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """每条日志一行 JSON，请求日志带上结构化字段"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        request = getattr(record, 'request', None)
+        if request is not None:
+            entry['request'] = request
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(level: str = 'INFO', log_file: Optional[str] = None, max_bytes: int = 10 * 1024 * 1024,
+                      backup_count: int = 5, queue_size: int = 10000,
+                      stream=None) -> logging.handlers.QueueListener:
+    """把根日志器换成异步队列：控制台输出可读文本，log_file 按大小轮转并写 JSON 行；返回已启动的监听器"""
+    handlers: List[logging.Handler] = []
+    console = logging.StreamHandler(stream)
+    console.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+    handlers.append(console)
+    if log_file:
+        rotating = logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count,
+                                                        encoding='utf-8', delay=True)
+        rotating.setFormatter(JsonLinesFormatter())
+        handlers.append(rotating)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, AsyncQueueHandler):
+            root.removeHandler(handler)
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    root.addHandler(AsyncQueueHandler(log_queue))
+    root.setLevel(level.upper())
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def queue_stats() -> dict:
+    """异步日志队列的积压和丢弃数"""
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, AsyncQueueHandler):
+            return {'queued': handler.queue.qsize(), 'dropped': handler.dropped}
+    return {'queued': 0, 'dropped': 0}
+
+
+def compact_params(data: dict) -> dict:
+    """请求参数的浅拷贝，过长的字符串截断"""
+    params = {}
+    for key, value in data.items():
+        if isinstance(value, str) and len(value) > MAX_PARAM_LENGTH:
+            value = value[:MAX_PARAM_LENGTH] + '…'
+        params[key] = value
+    return params
+
+
+class RequestLog:
+    """请求日志 - 最近 size 个请求保存在环形缓冲区中，同时以结构化记录交给异步日志
+
+    record 只做一次 deque 追加和一次入队，不在请求线程里做任何 I/O。
+    """
+
+    def __init__(self, size: int = 500, logger_name: str = 'requests'):
+        self._records: Deque[dict] = deque(maxlen=size)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger(logger_name)
+        self.size = size
+
+    def record(self, method: str, route: str, action: Optional[str], params: Optional[dict],
+               status: int, duration_ms: float, client: Optional[str] = None) -> dict:
+        entry = {
+            'id': next(self._ids),
+            'time': round(time.time(), 3),
+            'method': method,
+            'route': route,
+            'action': action,
+            'params': compact_params(params) if params else {},
+            'status': status,
+            'duration_ms': duration_ms,
+            'client': client,
+        }
+        with self._lock:
+            self._records.append(entry)
+        level = logging.ERROR if status >= 500 else logging.WARNING if status >= 400 else logging.INFO
+        if self._logger.isEnabledFor(level):
+            self._logger.log(level, '%s %s %s %.1fms', method, route, status, duration_ms,
+                             extra={'request': entry})
+        return entry
+
+    def recent(self, limit: int = 50, errors_only: bool = False, route: Optional[str] = None) -> dict:
+        """最近的请求（新的在前）；route 为路由前缀"""
+        limit = min(max(int(limit), 1), MAX_RECENT_RESULTS)
+        with self._lock:
+            records = list(self._records)
+        matches = []
+        for entry in reversed(records):
+            if errors_only and entry['status'] < 400:
+                continue
+            if route and not entry['route'].startswith(route):
+                continue
+            matches.append(entry)
+            if len(matches) == limit:
+                break
+        return {'requests': matches, 'buffered': len(records), 'capacity': self.size, 'log_queue': queue_stats()}
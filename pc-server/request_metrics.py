@@ -0,0 +1,258 @@
+import bisect
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# 直方图桶上限（秒），最后隐含一个 +Inf 桶
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# 标签组合数上限，超出后 action 归入 other，防止任意 URL 撑大内存
+MAX_SERIES = 2000
+OVERFLOW_ACTION = 'other'
+
+# 请求阶段: parse 解析请求参数, handler 处理函数本身（主要是控制器调用）,
+# serialize 序列化响应, total 从进入 Flask 到生成响应
+REQUEST_PHASES = ('parse', 'handler', 'serialize', 'total')
+# 输入命令阶段: queue 在派发队列中等待, execute 在派发线程中执行（含按键间的 sleep）
+COMMAND_PHASES = ('queue', 'execute')
+
+
+class Histogram:
+    """固定桶直方图，observe 只做一次二分查找和两次加法"""
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[int]:
+        total, result = 0, []
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+    def quantile(self, q: float) -> Optional[float]:
+        """按桶内线性插值估算分位数（秒）；落在 +Inf 桶时返回最大的有限上限"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if i == len(self.bounds):
+                    return self.bounds[-1]
+                lower = self.bounds[i - 1] if i else 0.0
+                return lower + (self.bounds[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.bounds[-1]
+
+
+def escape_label(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in labels) + '}'
+
+
+class RequestMetrics:
+    """请求指标 - 按路由/动作/阶段的延迟直方图、请求与错误计数、进行中的请求数
+
+    记录路径上只更新内存中的计数，格式化（Prometheus 文本或 JSON）全部在抓取时进行，
+    没有人抓取时除了计数没有额外开销。
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, max_series: int = MAX_SERIES):
+        self.buckets = tuple(sorted(buckets))
+        self.max_series = max_series
+        self._lock = threading.Lock()
+        self._request_latency: Dict[Tuple[str, str, str], Histogram] = {}
+        self._command_latency: Dict[Tuple[str, str], Histogram] = {}
+        self._requests: Dict[Tuple[str, str, str, int], int] = {}
+        self._errors: Dict[Tuple[str, str, str], int] = {}
+        self._command_results: Dict[Tuple[str, str], int] = {}
+        self._in_flight = 0
+        self._series = 0
+        # 抓取时才求值的外部指标: 名称 -> (类型, 说明, 标签名, 取值函数)
+        self._gauges: Dict[str, Tuple[str, str, Optional[str], Callable[[], Any]]] = {}
+
+    def add_gauge(self, name: str, help_text: str, func: Callable[[], Any], label: Optional[str] = None,
+                  kind: str = 'gauge'):
+        """注册抓取时才求值的指标（例如输入队列深度）
+
+        label 不为空时 func 返回 {标签值: 数值}；kind 为 gauge 或 counter（其他模块维护的累计计数）。
+        """
+        self._gauges[name] = (kind, help_text, label, func)
+
+    def request_started(self):
+        with self._lock:
+            self._in_flight += 1
+
+    def request_finished(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _action(self, key_exists: bool, action: str) -> str:
+        # 调用方持有锁
+        if key_exists:
+            return action
+        if self._series >= self.max_series:
+            return OVERFLOW_ACTION
+        self._series += 1
+        return action
+
+    def observe_request(self, method: str, route: str, action: Optional[str], status: int,
+                        phases: Dict[str, float]):
+        """记录一个请求；phases 为 阶段 -> 耗时（秒）"""
+        action = action or ''
+        with self._lock:
+            key = (route, action, 'total')
+            action = self._action(key in self._request_latency, action)
+            for phase, seconds in phases.items():
+                histogram = self._request_latency.get((route, action, phase))
+                if histogram is None:
+                    histogram = self._request_latency[(route, action, phase)] = Histogram(self.buckets)
+                histogram.observe(seconds)
+            counter = (route, action, method, status)
+            self._requests[counter] = self._requests.get(counter, 0) + 1
+            if status >= 400:
+                error = (route, action, 'server' if status >= 500 else 'client')
+                self._errors[error] = self._errors.get(error, 0) + 1
+
+    def observe_command(self, name: str, queue_seconds: float, execute_seconds: float, result: str):
+        """记录一个输入命令的排队和执行耗时（由派发线程调用）；result 为 success / failure / dropped"""
+        with self._lock:
+            for phase, seconds in (('queue', queue_seconds), ('execute', execute_seconds)):
+                histogram = self._command_latency.get((name, phase))
+                if histogram is None:
+                    histogram = self._command_latency[(name, phase)] = Histogram(self.buckets)
+                histogram.observe(seconds)
+            key = (name, result)
+            self._command_results[key] = self._command_results.get(key, 0) + 1
+
+    def _copy(self):
+        """在锁内复制全部数据，格式化在锁外进行"""
+        def clone(histogram: Histogram) -> Histogram:
+            copy = Histogram(histogram.bounds)
+            copy.counts = list(histogram.counts)
+            copy.sum, copy.count = histogram.sum, histogram.count
+            return copy
+
+        with self._lock:
+            return (
+                {key: clone(h) for key, h in self._request_latency.items()},
+                {key: clone(h) for key, h in self._command_latency.items()},
+                dict(self._requests),
+                dict(self._errors),
+                dict(self._command_results),
+                self._in_flight,
+            )
+
+    def _gauge_values(self) -> Dict[str, Any]:
+        values = {}
+        for name, (_, _, label, func) in self._gauges.items():
+            try:
+                value = func()
+                values[name] = {str(k): float(v) for k, v in value.items()} if label else float(value)
+            except Exception:
+                continue
+        return values
+
+    def prometheus(self) -> str:
+        """Prometheus 文本格式 (0.0.4)"""
+        request_latency, command_latency, requests, errors, command_results, in_flight = self._copy()
+        lines: List[str] = []
+
+        def histogram_lines(name: str, help_text: str, series: Dict[tuple, Histogram], label_names: Tuple[str, ...]):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for key in sorted(series):
+                histogram = series[key]
+                labels = list(zip(label_names, key))
+                for bound, count in zip(histogram.bounds + (float('inf'),), histogram.cumulative()):
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{name}_bucket{format_labels(labels + [("le", le)])} {count}')
+                lines.append(f'{name}_sum{format_labels(labels)} {histogram.sum!r}')
+                lines.append(f'{name}_count{format_labels(labels)} {histogram.count}')
+
+        def counter_lines(name: str, help_text: str, values: Dict[tuple, int], label_names: Tuple[str, ...]):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for key in sorted(values):
+                lines.append(f'{name}{format_labels(zip(label_names, map(str, key)))} {values[key]}')
+
+        histogram_lines('remote_pc_request_duration_seconds', 'HTTP request latency by route, action and phase',
+                        request_latency, ('route', 'action', 'phase'))
+        counter_lines('remote_pc_requests_total', 'HTTP requests by route, action, method and status',
+                      requests, ('route', 'action', 'method', 'status'))
+        counter_lines('remote_pc_request_errors_total', 'HTTP 4xx (client) and 5xx (server) responses',
+                      errors, ('route', 'action', 'kind'))
+        lines.append('# HELP remote_pc_requests_in_flight HTTP requests currently being handled')
+        lines.append('# TYPE remote_pc_requests_in_flight gauge')
+        lines.append(f'remote_pc_requests_in_flight {in_flight}')
+        histogram_lines('remote_pc_command_duration_seconds', 'Input command latency by command and phase',
+                        command_latency, ('command', 'phase'))
+        counter_lines('remote_pc_commands_total', 'Input commands executed by result',
+                      command_results, ('command', 'result'))
+        for name, value in self._gauge_values().items():
+            kind, help_text, label, _ = self._gauges[name]
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            if label:
+                for key in sorted(value):
+                    lines.append(f'{name}{format_labels([(label, key)])} {value[key]!r}')
+            else:
+                lines.append(f'{name} {value!r}')
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self, route: Optional[str] = None) -> dict:
+        """JSON 形式：每个序列的次数、均值和估算分位数（毫秒）；route 为路由前缀"""
+        request_latency, command_latency, requests, errors, command_results, in_flight = self._copy()
+
+        def summary(histogram: Histogram) -> dict:
+            def ms(value: Optional[float]) -> Optional[float]:
+                return None if value is None else round(value * 1000, 3)
+            return {
+                'count': histogram.count,
+                'mean_ms': ms(histogram.sum / histogram.count) if histogram.count else None,
+                'p50_ms': ms(histogram.quantile(0.5)),
+                'p95_ms': ms(histogram.quantile(0.95)),
+                'p99_ms': ms(histogram.quantile(0.99)),
+            }
+
+        routes: Dict[str, dict] = {}
+        for (path, action, phase), histogram in request_latency.items():
+            if route and not path.startswith(route):
+                continue
+            entry = routes.setdefault(path, {}).setdefault(action, {'phases': {}, 'status': {}, 'errors': {}})
+            entry['phases'][phase] = summary(histogram)
+        for (path, action, method, status), count in requests.items():
+            if path in routes and action in routes[path]:
+                by_status = routes[path][action]['status']
+                by_status[str(status)] = by_status.get(str(status), 0) + count
+        for (path, action, kind), count in errors.items():
+            if path in routes and action in routes[path]:
+                routes[path][action]['errors'][kind] = count
+
+        commands: Dict[str, dict] = {}
+        for (name, phase), histogram in command_latency.items():
+            commands.setdefault(name, {'phases': {}, 'results': {}})['phases'][phase] = summary(histogram)
+        for (name, result), count in command_results.items():
+            commands.setdefault(name, {'phases': {}, 'results': {}})['results'][result] = count
+
+        return {
+            'in_flight': in_flight,
+            'requests_total': sum(requests.values()),
+            'errors_total': sum(errors.values()),
+            'routes': routes,
+            'commands': commands,
+            'gauges': self._gauge_values(),
+            'buckets_ms': [round(bound * 1000, 3) for bound in self.buckets],
+        }
@@ -0,0 +1,234 @@
+import ctypes
+from ctypes import wintypes
+import threading
+from typing import Dict, Optional, Tuple
+
+# 帧缓冲区格式: 自上而下逐行，每像素 4 字节 BGRX（与 GDI 32 位 DIB 一致）
+BYTES_PER_PIXEL = 4
+
+
+class FrameSource:
+    """帧来源接口 - 把屏幕内容按指定分辨率写进调用方预先分配的缓冲区"""
+
+    def screen_size(self) -> Tuple[int, int]:
+        raise NotImplementedError
+
+    def capture(self, buffer: bytearray, width: int, height: int) -> None:
+        """截取一帧并缩放到 width x height，写入 buffer（长度至少 width * height * 4）"""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+# =================== GDI 截屏 ===================
+class _BITMAPINFOHEADER(ctypes.Structure):
+    _fields_ = [
+        ('biSize', wintypes.DWORD),
+        ('biWidth', wintypes.LONG),
+        ('biHeight', wintypes.LONG),
+        ('biPlanes', wintypes.WORD),
+        ('biBitCount', wintypes.WORD),
+        ('biCompression', wintypes.DWORD),
+        ('biSizeImage', wintypes.DWORD),
+        ('biXPelsPerMeter', wintypes.LONG),
+        ('biYPelsPerMeter', wintypes.LONG),
+        ('biClrUsed', wintypes.DWORD),
+        ('biClrImportant', wintypes.DWORD),
+    ]
+
+
+def _gdi_libraries():
+    """加载 user32 / gdi32 并声明用到的函数签名（句柄在 64 位下不能按 int 截断）"""
+    user32 = ctypes.WinDLL('user32', use_last_error=True)
+    gdi32 = ctypes.WinDLL('gdi32', use_last_error=True)
+    user32.GetDC.restype = wintypes.HDC
+    user32.GetDC.argtypes = [wintypes.HWND]
+    user32.ReleaseDC.argtypes = [wintypes.HWND, wintypes.HDC]
+    user32.PrintWindow.argtypes = [wintypes.HWND, wintypes.HDC, wintypes.UINT]
+    user32.GetWindowRect.argtypes = [wintypes.HWND, ctypes.POINTER(wintypes.RECT)]
+    user32.IsIconic.argtypes = [wintypes.HWND]
+    gdi32.CreateCompatibleDC.restype = wintypes.HDC
+    gdi32.CreateCompatibleDC.argtypes = [wintypes.HDC]
+    gdi32.CreateDIBSection.restype = wintypes.HBITMAP
+    gdi32.CreateDIBSection.argtypes = [wintypes.HDC, ctypes.c_void_p, wintypes.UINT,
+                                       ctypes.POINTER(ctypes.c_void_p), wintypes.HANDLE, wintypes.DWORD]
+    gdi32.SelectObject.restype = wintypes.HGDIOBJ
+    gdi32.SelectObject.argtypes = [wintypes.HDC, wintypes.HGDIOBJ]
+    gdi32.DeleteObject.argtypes = [wintypes.HGDIOBJ]
+    gdi32.DeleteDC.argtypes = [wintypes.HDC]
+    gdi32.SetStretchBltMode.argtypes = [wintypes.HDC, ctypes.c_int]
+    gdi32.StretchBlt.argtypes = [wintypes.HDC, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+                                 wintypes.HDC, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+                                 wintypes.DWORD]
+    return user32, gdi32
+
+
+def _create_dib(gdi32, dc, width: int, height: int, bits: ctypes.c_void_p):
+    """创建 32 位自上而下的 DIB Section 并选入 dc"""
+    header = _BITMAPINFOHEADER()
+    header.biSize = ctypes.sizeof(_BITMAPINFOHEADER)
+    header.biWidth = width
+    header.biHeight = -height  # 负数表示自上而下
+    header.biPlanes = 1
+    header.biBitCount = 32
+    header.biCompression = 0  # BI_RGB
+    bitmap = gdi32.CreateDIBSection(dc, ctypes.byref(header), 0, ctypes.byref(bits), None, 0)
+    if not bitmap:
+        raise ctypes.WinError(ctypes.get_last_error())
+    gdi32.SelectObject(dc, bitmap)
+    return bitmap
+
+
+def gdi_capture_window(hwnd: int, width: int, height: int) -> Optional[bytearray]:
+    """用 PrintWindow 渲染窗口（被遮挡也可以）并缩放到 width x height；最小化的窗口返回 None"""
+    PW_RENDERFULLCONTENT = 2
+    HALFTONE = 4
+    SRCCOPY = 0x00CC0020
+    user32, gdi32 = _gdi_libraries()
+    if user32.IsIconic(hwnd):
+        return None
+    rect = wintypes.RECT()
+    if not user32.GetWindowRect(hwnd, ctypes.byref(rect)):
+        return None
+    window_width, window_height = rect.right - rect.left, rect.bottom - rect.top
+    if window_width <= 0 or window_height <= 0:
+        return None
+
+    screen_dc = user32.GetDC(None)
+    window_dc = gdi32.CreateCompatibleDC(screen_dc)
+    thumb_dc = gdi32.CreateCompatibleDC(screen_dc)
+    window_bits, thumb_bits = ctypes.c_void_p(), ctypes.c_void_p()
+    bitmaps = []
+    try:
+        bitmaps.append(_create_dib(gdi32, window_dc, window_width, window_height, window_bits))
+        bitmaps.append(_create_dib(gdi32, thumb_dc, width, height, thumb_bits))
+        if not user32.PrintWindow(hwnd, window_dc, PW_RENDERFULLCONTENT):
+            return None
+        gdi32.SetStretchBltMode(thumb_dc, HALFTONE)
+        gdi32.StretchBlt(thumb_dc, 0, 0, width, height, window_dc, 0, 0, window_width, window_height, SRCCOPY)
+        gdi32.GdiFlush()
+        size = width * height * BYTES_PER_PIXEL
+        buffer = bytearray(size)
+        ctypes.memmove((ctypes.c_char * size).from_buffer(buffer), thumb_bits, size)
+        return buffer
+    finally:
+        for bitmap in bitmaps:
+            gdi32.DeleteObject(bitmap)
+        gdi32.DeleteDC(window_dc)
+        gdi32.DeleteDC(thumb_dc)
+        user32.ReleaseDC(None, screen_dc)
+
+
+class GdiFrameSource(FrameSource):
+    """GDI 截屏 - StretchBlt 在截取时直接缩放到目标分辨率，写入复用的 DIB Section"""
+
+    SM_CXSCREEN = 0
+    SM_CYSCREEN = 1
+    HALFTONE = 4
+    SRCCOPY = 0x00CC0020
+    CAPTUREBLT = 0x40000000
+
+    def __init__(self):
+        self._user32, self._gdi32 = _gdi_libraries()
+        self._screen_dc = self._user32.GetDC(None)
+        self._memory_dc = self._gdi32.CreateCompatibleDC(self._screen_dc)
+        self._gdi32.SetStretchBltMode(self._memory_dc, self.HALFTONE)
+        self._bitmap = None
+        self._bits = ctypes.c_void_p()
+        self._size = (0, 0)
+
+    def screen_size(self) -> Tuple[int, int]:
+        return (self._user32.GetSystemMetrics(self.SM_CXSCREEN),
+                self._user32.GetSystemMetrics(self.SM_CYSCREEN))
+
+    def _create_dib(self, width: int, height: int):
+        """按目标分辨率重建 DIB Section"""
+        if self._bitmap:
+            self._gdi32.DeleteObject(self._bitmap)
+        self._bitmap = _create_dib(self._gdi32, self._memory_dc, width, height, self._bits)
+        self._size = (width, height)
+
+    def capture(self, buffer: bytearray, width: int, height: int) -> None:
+        if self._size != (width, height):
+            self._create_dib(width, height)
+        screen_width, screen_height = self.screen_size()
+        if not self._gdi32.StretchBlt(self._memory_dc, 0, 0, width, height,
+                                      self._screen_dc, 0, 0, screen_width, screen_height,
+                                      self.SRCCOPY | self.CAPTUREBLT):
+            raise ctypes.WinError(ctypes.get_last_error())
+        self._gdi32.GdiFlush()
+        size = width * height * BYTES_PER_PIXEL
+        ctypes.memmove((ctypes.c_char * size).from_buffer(buffer), self._bits, size)
+
+    def close(self) -> None:
+        if self._bitmap:
+            self._gdi32.DeleteObject(self._bitmap)
+            self._bitmap = None
+        if self._memory_dc:
+            self._gdi32.DeleteDC(self._memory_dc)
+            self._memory_dc = None
+        if self._screen_dc:
+            self._user32.ReleaseDC(None, self._screen_dc)
+            self._screen_dc = None
+
+
+# =================== 合成画面 ===================
+class SyntheticFrameSource(FrameSource):
+    """合成画面 - 静态渐变背景上有一个移动的方块和每秒变化的时钟区域，用于模拟后端和基准测试
+
+    每次 capture 推进一帧，画面只由帧序号决定，基准测试结果可复现。
+    """
+
+    def __init__(self, width: int = 1920, height: int = 1080, fps: int = 30):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frame = 0
+        self._backgrounds: Dict[Tuple[int, int], bytes] = {}
+        self._lock = threading.Lock()
+
+    def screen_size(self) -> Tuple[int, int]:
+        return self.width, self.height
+
+    def _background(self, width: int, height: int) -> bytes:
+        """按分辨率缓存的纵向渐变背景"""
+        background = self._backgrounds.get((width, height))
+        if background is None:
+            rows = []
+            for y in range(height):
+                shade = 40 + 80 * y // max(height - 1, 1)
+                rows.append(bytes((shade + 30, shade + 10, shade, 0)) * width)
+            background = b''.join(rows)
+            self._backgrounds[(width, height)] = background
+        return background
+
+    @staticmethod
+    def _fill(buffer: bytearray, width: int, left: int, top: int, right: int, bottom: int,
+              color: Tuple[int, int, int]):
+        row = bytes((*color, 0)) * (right - left)
+        stride = width * BYTES_PER_PIXEL
+        for y in range(top, bottom):
+            start = y * stride + left * BYTES_PER_PIXEL
+            buffer[start:start + len(row)] = row
+
+    def capture(self, buffer: bytearray, width: int, height: int) -> None:
+        with self._lock:
+            frame = self.frame
+            self.frame += 1
+        size = width * height * BYTES_PER_PIXEL
+        buffer[:size] = self._background(width, height)
+
+        # 来回移动的方块，每帧移动约 1/120 屏宽
+        box = max(width // 8, 1)
+        span = max(width - box, 1)
+        offset = frame * max(width // 120, 1) % (2 * span)
+        left = offset if offset < span else 2 * span - offset
+        top = height // 3
+        self._fill(buffer, width, left, top, left + box, min(top + box, height), (40, 160, 240))
+
+        # 右上角的“时钟”，每秒变化一次
+        second = frame // max(self.fps, 1)
+        clock_width, clock_height = max(width // 12, 1), max(height // 30, 1)
+        shade = 80 + second * 37 % 160
+        self._fill(buffer, width, width - clock_width, 0, width, clock_height, (shade, shade, shade))
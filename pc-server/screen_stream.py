@@ -0,0 +1,292 @@
+import io
+import logging
+import struct
+import threading
+import time
+import zlib
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from screen_capture import BYTES_PER_PIXEL, FrameSource
+
+# 流格式（大端），每帧:
+#   magic(4s) seq(I) timestamp_ms(Q) width(H) height(H) codec(B) region_count(H)
+#   之后 region_count 个区域: x(H) y(H) w(H) h(H) length(I) + 编码后的数据
+# 第一帧是覆盖整屏的关键帧，之后只包含变化的区域；画面静止时每秒发送一个空帧作为心跳。
+# zlib 区域解压后是自上而下的 BGRX 像素，jpeg / webp 区域是完整的图片。
+FRAME_MAGIC = b'RPCF'
+FRAME_HEADER = struct.Struct('!4sIQHHBH')
+REGION_HEADER = struct.Struct('!HHHHI')
+CODEC_IDS = {'zlib': 0, 'jpeg': 1, 'webp': 2}
+
+MAX_FPS = 30
+MAX_DIMENSION = 3840
+HEARTBEAT_INTERVAL = 1.0
+
+Region = Tuple[int, int, int, int]
+
+
+def available_codecs() -> List[str]:
+    """可用的编码；jpeg / webp 需要 Pillow"""
+    codecs = ['zlib']
+    try:
+        from PIL import features
+    except ImportError:
+        return codecs
+    codecs.append('jpeg')
+    if features.check('webp'):
+        codecs.append('webp')
+    return codecs
+
+
+def default_codec() -> str:
+    return 'jpeg' if 'jpeg' in available_codecs() else 'zlib'
+
+
+def fit_size(screen: Tuple[int, int], max_width: int, max_height: int) -> Tuple[int, int]:
+    """按比例缩小到不超过上限（宽高取偶数）"""
+    width, height = screen
+    scale = min(1.0, max_width / width, max_height / height)
+    return max(int(width * scale) // 2 * 2, 2), max(int(height * scale) // 2 * 2, 2)
+
+
+class TileEncoder:
+    """脏区域编码器 - 按 tile 大小的行带比较两帧，同一行带内相邻的变化块合并成一个区域再编码"""
+
+    def __init__(self, width: int, height: int, tile: int = 64, codec: str = 'zlib', quality: int = 70):
+        self.width = width
+        self.height = height
+        self.tile = tile
+        self.codec = codec
+        self.quality = quality
+        self.stride = width * BYTES_PER_PIXEL
+        self.tiles_x = (width + tile - 1) // tile
+        # 一个区域最大是整条行带，预先分配好拼接区域像素用的缓冲区
+        self._region = bytearray(self.stride * tile)
+        self._region_view = memoryview(self._region)
+        self._output = io.BytesIO()
+
+    def dirty_regions(self, current: bytearray, previous: Optional[bytearray]) -> List[Region]:
+        """返回变化的区域 (x, y, w, h)；没有上一帧时返回覆盖整屏的区域"""
+        width, height, tile, stride = self.width, self.height, self.tile, self.stride
+        if previous is None:
+            return [(0, top, width, min(tile, height - top)) for top in range(0, height, tile)]
+        if current == previous:
+            return []
+
+        tile_bytes = tile * BYTES_PER_PIXEL
+        regions = []
+        for top in range(0, height, tile):
+            bottom = min(top + tile, height)
+            band_start, band_end = top * stride, bottom * stride
+            if current[band_start:band_end] == previous[band_start:band_end]:
+                continue
+
+            dirty = [False] * self.tiles_x
+            remaining = self.tiles_x
+            for y in range(top, bottom):
+                row = y * stride
+                if current[row:row + stride] == previous[row:row + stride]:
+                    continue
+                for tx in range(self.tiles_x):
+                    if dirty[tx]:
+                        continue
+                    start = row + tx * tile_bytes
+                    end = min(start + tile_bytes, row + stride)
+                    if current[start:end] != previous[start:end]:
+                        dirty[tx] = True
+                        remaining -= 1
+                if not remaining:
+                    break
+
+            tx = 0
+            while tx < self.tiles_x:
+                if not dirty[tx]:
+                    tx += 1
+                    continue
+                first = tx
+                while tx < self.tiles_x and dirty[tx]:
+                    tx += 1
+                left, right = first * tile, min(tx * tile, width)
+                regions.append((left, top, right - left, bottom - top))
+        return regions
+
+    def encode_region(self, frame: memoryview, region: Region) -> bytes:
+        """把区域像素拼到预分配缓冲区后编码"""
+        x, y, w, h = region
+        row_bytes = w * BYTES_PER_PIXEL
+        view = self._region_view
+        for row in range(h):
+            source = (y + row) * self.stride + x * BYTES_PER_PIXEL
+            view[row * row_bytes:(row + 1) * row_bytes] = frame[source:source + row_bytes]
+        pixels = view[:row_bytes * h]
+
+        if self.codec == 'zlib':
+            return zlib.compress(pixels, 1)
+
+        from PIL import Image
+        image = Image.frombuffer('RGB', (w, h), pixels, 'raw', 'BGRX', 0, 1)
+        output = self._output
+        output.seek(0)
+        output.truncate()
+        image.save(output, 'JPEG' if self.codec == 'jpeg' else 'WEBP', quality=self.quality)
+        return output.getvalue()
+
+    def encode(self, frame: bytearray, regions: List[Region], seq: int, timestamp: float) -> bytes:
+        """编码一帧"""
+        view = memoryview(frame)
+        parts = [FRAME_HEADER.pack(FRAME_MAGIC, seq & 0xFFFFFFFF, int(timestamp * 1000),
+                                   self.width, self.height, CODEC_IDS[self.codec], len(regions))]
+        for region in regions:
+            data = self.encode_region(view, region)
+            parts.append(REGION_HEADER.pack(*region, len(data)))
+            parts.append(data)
+        return b''.join(parts)
+
+
+class StreamSession:
+    """单个观看者的推流会话 - 两块预分配的帧缓冲区交替作为当前帧和上一帧"""
+
+    def __init__(self, streamer: 'ScreenStreamer', source: FrameSource, fps: int,
+                 width: int, height: int, codec: str, quality: int, tile: int):
+        self.streamer = streamer
+        self.source = source
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.encoder = TileEncoder(width, height, tile, codec, quality)
+        size = width * height * BYTES_PER_PIXEL
+        self._current = bytearray(size)
+        self._previous = bytearray(size)
+        self._has_previous = False
+        self._seq = 0
+        self._last_sent = 0.0
+        self._closed = False
+
+    def next_frame(self) -> Optional[bytes]:
+        """截取并编码一帧；画面没有变化且不需要心跳时返回 None"""
+        start = time.perf_counter()
+        self.source.capture(self._current, self.width, self.height)
+        captured = time.perf_counter()
+        regions = self.encoder.dirty_regions(self._current, self._previous if self._has_previous else None)
+        now = time.time()
+        if not regions and now - self._last_sent < HEARTBEAT_INTERVAL:
+            self.streamer._record(captured - start, 0.0, None, 0)
+            return None
+
+        payload = self.encoder.encode(self._current, regions, self._seq, now)
+        keyframe = not self._has_previous
+        self._seq += 1
+        self._last_sent = now
+        self._current, self._previous = self._previous, self._current
+        self._has_previous = True
+        self.streamer._record(captured - start, time.perf_counter() - captured, payload, len(regions), keyframe)
+        return payload
+
+    def frames(self, limit: Optional[int] = None, throttle: bool = True) -> Iterator[bytes]:
+        """按帧率产生编码后的帧，limit 为发送的帧数上限；生成器结束时释放会话"""
+        interval = 1.0 / self.fps
+        sent = 0
+        next_at = time.monotonic()
+        try:
+            while limit is None or sent < limit:
+                payload = self.next_frame()
+                if payload is not None:
+                    sent += 1
+                    yield payload
+                if throttle:
+                    next_at += interval
+                    delay = next_at - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        next_at = time.monotonic()
+        finally:
+            self.close()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self.source.close()
+        finally:
+            self.streamer._release()
+
+
+class ScreenStreamer:
+    """屏幕推流管理 - 限制同时推流数量并汇总统计"""
+
+    def __init__(self, source_factory: Callable[[], FrameSource], max_streams: int = 2):
+        self.source_factory = source_factory
+        self.max_streams = max_streams
+        self._active = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            'opened': 0, 'rejected': 0, 'frames': 0, 'skipped': 0, 'bytes': 0, 'regions': 0,
+            'capture_s': 0.0, 'encode_s': 0.0, 'keyframe_bytes': 0,
+        }
+        self._logger = logging.getLogger('ScreenStreamer')
+
+    def open(self, fps: int = 10, max_width: int = 1280, max_height: int = 720,
+             codec: Optional[str] = None, quality: int = 70, tile: int = 64) -> Optional[StreamSession]:
+        """开始一个推流会话；参数错误时抛出 ValueError，推流数已满时返回 None"""
+        codec = codec or default_codec()
+        if codec not in CODEC_IDS:
+            raise ValueError(f'不支持的编码: {codec}，可选: {list(CODEC_IDS)}')
+        if codec not in available_codecs():
+            raise ValueError(f'编码 {codec} 需要安装 Pillow: pip install Pillow')
+        if not 1 <= fps <= MAX_FPS:
+            raise ValueError(f'fps 必须在 1-{MAX_FPS} 之间')
+        if not (16 <= max_width <= MAX_DIMENSION and 16 <= max_height <= MAX_DIMENSION):
+            raise ValueError(f'分辨率上限必须在 16-{MAX_DIMENSION} 之间')
+        if not 1 <= quality <= 95:
+            raise ValueError('quality 必须在 1-95 之间')
+        if tile % 16 or not 16 <= tile <= 256:
+            raise ValueError('tile 必须是 16-256 之间 16 的倍数')
+
+        with self._lock:
+            if self._active >= self.max_streams:
+                self._stats['rejected'] += 1
+                return None
+            self._active += 1
+            self._stats['opened'] += 1
+
+        try:
+            source = self.source_factory()
+            width, height = fit_size(source.screen_size(), max_width, max_height)
+            return StreamSession(self, source, fps, width, height, codec, quality, tile)
+        except Exception:
+            self._release()
+            raise
+
+    def _release(self):
+        with self._lock:
+            self._active -= 1
+
+    def _record(self, capture_s: float, encode_s: float, payload: Optional[bytes], regions: int,
+                keyframe: bool = False):
+        with self._lock:
+            stats = self._stats
+            stats['capture_s'] += capture_s
+            if payload is None:
+                stats['skipped'] += 1
+                return
+            if keyframe:
+                stats['keyframe_bytes'] = len(payload)
+            stats['frames'] += 1
+            stats['bytes'] += len(payload)
+            stats['regions'] += regions
+            stats['encode_s'] += encode_s
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['active'] = self._active
+        frames = stats['frames']
+        captures = frames + stats['skipped']
+        stats['max_streams'] = self.max_streams
+        stats['codecs'] = available_codecs()
+        stats['avg_bytes_per_frame'] = round(stats['bytes'] / frames) if frames else 0
+        stats['avg_capture_ms'] = round(stats.pop('capture_s') * 1000 / captures, 3) if captures else 0.0
+        stats['avg_encode_ms'] = round(stats.pop('encode_s') * 1000 / frames, 3) if frames else 0.0
+        return stats
@@ -1,19 +1,151 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, has_request_context, jsonify, request
 from flask_cors import CORS
-from windows_controller import system_controller
+from windows_controller import LAUNCH_MODES, system_controller
+from input_dispatcher import input_dispatcher
+from input_coalescer import MAX_STEPS, StepCoalescer
+from key_hold import KeyHoldManager
+from ws_channel import CommandChannel
+from udp_channel import UdpCommandListener
+from macro_store import MacroStore
+from command_registry import Command, CommandRegistry, Param
+from admission import AdmissionController, parse_lanes, retry_after_header
+from serving import parse_args, serve
+from process_table import SORT_KEYS
+from request_log import RequestLog, configure_logging
+from request_metrics import RequestMetrics
+from flask.json.provider import DefaultJSONProvider
 import json
+import logging
+import math
+import os
+import time
+from typing import Optional
 
 app = Flask(__name__)
 CORS(app)
+logger = logging.getLogger('Server')
+
+# 最近的请求保存在内存中，/api/debug/recent 查询
+request_log = RequestLog(int(os.environ.get('REMOTE_PC_RECENT_REQUESTS', 500)))
+# 按路由/阶段的延迟直方图和计数，/api/metrics 抓取
+request_metrics = RequestMetrics()
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """jsonify 时累计序列化耗时，作为请求的 serialize 阶段"""
+
+    def response(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().response(*args, **kwargs)
+        finally:
+            if has_request_context():
+                g.serialize_seconds = g.get('serialize_seconds', 0.0) + time.perf_counter() - start
+
+app.json = TimedJSONProvider(app)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    request_metrics.request_started()
+
+@app.after_request
+def record_request(response):
+    """每个请求一条结构化记录和一组阶段耗时，写日志在后台线程进行"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        total = time.perf_counter() - started
+        route = route_label()
+        action = (request.view_args or {}).get('action')
+        parse = g.get('parse_seconds', 0.0)
+        serialize = g.get('serialize_seconds', 0.0)
+        request_metrics.observe_request(
+            request.method,
+            route or '<unmatched>',
+            action,
+            response.status_code,
+            {'parse': parse, 'handler': max(total - parse - serialize, 0.0), 'serialize': serialize, 'total': total}
+        )
+        request_log.record(
+            request.method,
+            route or request.path,
+            action,
+            g.get('request_data'),
+            response.status_code,
+            round(total * 1000, 2),
+            request.remote_addr
+        )
+    return response
+
+def route_label() -> Optional[str]:
+    """请求对应的路由模板；命令路由带上类别，例如 /api/volume/<action>"""
+    rule = request.url_rule
+    if rule is None:
+        return None
+    category = (request.view_args or {}).get('category')
+    if category is not None and rule.rule == '/api/<category>/<action>' and registry.has_category(category):
+        return f'/api/{category}/<action>'
+    return rule.rule
+
+@app.teardown_request
+def finish_request(exc):
+    request_metrics.request_finished()
+
+# 排队超过这个时间的输入命令在执行前丢弃，0 表示不丢弃
+input_dispatcher.max_age = float(os.environ.get('REMOTE_PC_COMMAND_MAX_AGE_MS', 2000)) / 1000 or None
+
+# 音量/亮度的连续点击在短窗口内合并成一次净步数
+step_coalescer = StepCoalescer(input_dispatcher, window=float(os.environ.get('REMOTE_PC_COALESCE_MS', 30)) / 1000)
+step_coalescer.register('volume', system_controller.volume_up, system_controller.volume_down)
+step_coalescer.register('brightness', system_controller.brightness_up, system_controller.brightness_down)
+
+# 按住模式：按下/松开两次请求，自动重复由服务端生成，租约到期自动松开
+key_holds = KeyHoldManager(
+    system_controller, input_dispatcher,
+    rate=float(os.environ.get('REMOTE_PC_HOLD_RATE', 10)),
+    delay=float(os.environ.get('REMOTE_PC_HOLD_DELAY_MS', 300)) / 1000,
+    lease=float(os.environ.get('REMOTE_PC_HOLD_LEASE_MS', 5000)) / 1000
+)
+
+# 输入命令的排队/执行耗时，以及抓取时读取的队列状态
+input_dispatcher.add_listener(lambda command: request_metrics.observe_command(
+    command.name,
+    command.started_at - command.created_at,
+    command.finished_at - command.started_at,
+    {'done': 'success', 'dropped': 'dropped'}.get(command.status, 'failure')
+))
+request_metrics.add_gauge('remote_pc_input_queue_depth', 'Input commands waiting for the dispatcher thread',
+                          lambda: input_dispatcher.stats()['queue_depth'])
+request_metrics.add_gauge('remote_pc_input_running', 'Input commands currently executing on the dispatcher thread',
+                          lambda: input_running(input_dispatcher.stats()))
+request_metrics.add_gauge('remote_pc_coalescer_pending', 'Volume/brightness step batches waiting to be flushed',
+                          lambda: len(step_coalescer.stats()['pending']))
+request_metrics.add_gauge('remote_pc_key_holds_active', 'Keys currently held down by press-and-hold sessions',
+                          lambda: key_holds.stats()['active'])
+request_metrics.add_gauge('remote_pc_key_hold_expired_total', 'Press-and-hold sessions released because their lease expired',
+                          lambda: key_holds.stats()['expired'], kind='counter')
+request_metrics.add_gauge('remote_pc_input_dropped_total', 'Input commands dropped because they waited too long in the queue',
+                          lambda: input_dispatcher.stats()['dropped'], kind='counter')
+
+def input_running(stats: dict) -> int:
+    """已出队但尚未完成的输入命令数"""
+    finished = stats['completed'] + stats['failed'] + stats['dropped']
+    return max(stats['submitted'] - finished - stats['queue_depth'], 0)
 
 # 通用的请求数据获取函数
 def get_request_data():
+    """获取请求数据，并留给请求日志记录参数和 parse 阶段耗时"""
+    start = time.perf_counter()
+    data = read_request_data()
+    g.parse_seconds = g.get('parse_seconds', 0.0) + time.perf_counter() - start
+    g.request_data = data
+    return data
+
+def read_request_data():
     """安全地获取请求数据，避免JSON解析错误"""
     try:
         # 对于GET请求，优先使用查询参数
         if request.method == 'GET':
             return dict(request.args)
-        print(request.data)
         # 对于POST请求
         if request.method == 'POST':
             # 检查是否有JSON数据且Content-Type正确
@@ -26,7 +158,7 @@ def get_request_data():
                     data = json.loads(json_str)
                     return data
                 except Exception as e:
-                    print(f"解析body json出错: {e}")
+                    logger.warning("解析body json出错: %s", e)
                     return {}
             # 如果没有数据，返回空字典
             else:
@@ -36,349 +168,708 @@ def get_request_data():
         return {}
         
     except Exception as e:
-        print(f"获取请求数据时出错: {e}")
+        logger.exception("获取请求数据时出错: %s", e)
         return {}
 
-# =================== 音量控制 API ===================
-@app.route('/api/volume/<action>', methods=['GET', 'POST'])
-def volume_control(action: str):
-    """音量控制"""
+def wants_wait(data: dict) -> bool:
+    """请求是否要求等待命令执行完成"""
+    return str(data.get('wait', '')).lower() in ['true', '1', 'yes']
+
+def submit_input(name: str, func, data: dict):
+    """将键盘注入命令交给输入派发线程，返回 (结果, HTTP 状态码)"""
+    result = input_dispatcher.submit(name, func, wait=wants_wait(data), max_age=requested_max_age(data))
+    return result, input_status_code(result)
+
+def requested_max_age(data: dict) -> Optional[float]:
+    """客户端用 max_age_ms 指定的最长排队时间（秒），只能比服务器默认值更短"""
     try:
-        print(f"收到音量控制请求: {action}, 方法: {request.method}")
-        
-        data = get_request_data()
-        print(f"请求数据: {data}")
-        
-        steps = 1
-        try:
-            steps = int(data.get('steps', 1))
-        except (ValueError, TypeError):
-            steps = 1
-        
-        actions = {
-            'up': lambda: system_controller.volume_up(steps),
-            'down': lambda: system_controller.volume_down(steps),
-            'mute': lambda: system_controller.volume_mute()
-        }
-        
-        if action not in actions:
-            return jsonify({
-                'success': False, 
-                'message': f'不支持的操作: {action}',
-                'available_actions': list(actions.keys())
-            }), 400
-        
-        print(f"执行音量操作: {action}")
-        result = actions[action]()
-        print(f"操作结果: {result}")
-        
-        return jsonify(result), 200 if result.get('success', False) else 400
-        
-    except Exception as e:
-        print(f"音量控制错误: {e}")
-        return jsonify({
-            'success': False, 
-            'message': f'服务器错误: {str(e)}'
-        }), 500
+        max_age = float(data['max_age_ms']) / 1000
+    except (KeyError, ValueError, TypeError):
+        return None
+    if not math.isfinite(max_age) or max_age < 0:
+        return None
+    if input_dispatcher.max_age is not None:
+        max_age = min(max_age, input_dispatcher.max_age)
+    return max_age
+
+def submit_steps(name: str, delta: int, data: dict):
+    """将 up/down 步进交给合并器，返回 (结果, HTTP 状态码)"""
+    result = step_coalescer.submit(name, delta, wait=wants_wait(data))
+    return result, input_status_code(result)
+
+def input_status_code(result: dict) -> int:
+    """输入命令结果对应的 HTTP 状态码"""
+    if result.get('status') == 'rejected':
+        return 503
+    if result.get('status') == 'dropped':
+        return 429
+    if result.get('queued'):
+        return 202
+    return 200 if result.get('success', False) else 400
+
+# =================== 命令注册表 ===================
+def run_direct(command: Command, params: dict):
+    """在请求线程中直接执行"""
+    result = command.func(params)
+    return result, 200 if result.get('success', False) else 400
+
+# 每条命令只在这里声明一次：REST 分发、WebSocket/UDP/批量/宏、参数校验和 /api/info 都由注册表生成
+registry = CommandRegistry({
+    'direct': run_direct,
+    'input': lambda command, params: submit_input(command.name, lambda: command.func(params), params),
+    'steps': lambda command, params: submit_steps(command.category, command.func(params), params),
+})
+
+STEPS = Param('steps', 'int', 1, minimum=1, maximum=MAX_STEPS, description='步数')
+HWND = Param('hwnd', 'int', description='窗口句柄，缺省为前台窗口')
+FORCE = Param('force', 'bool', False, description='强制执行，不等待程序保存')
+
+registry.category('volume', '音量控制')
+registry.add('volume', 'up', lambda p: p['steps'], mode='steps', params=(STEPS,))
+registry.add('volume', 'down', lambda p: -p['steps'], mode='steps', params=(STEPS,))
+registry.add('volume', 'mute', lambda p: system_controller.volume_mute(), mode='input', description='静音切换')
+
+registry.category('media', '媒体播放控制')
+registry.add('media', 'play', lambda p: system_controller.media_play_pause(), mode='input', description='播放/暂停')
+registry.add('media', 'pause', lambda p: system_controller.media_play_pause(), mode='input', description='播放/暂停')
+registry.add('media', 'stop', lambda p: system_controller.media_stop(), mode='input')
+registry.add('media', 'next', lambda p: system_controller.media_next(), mode='input')
+registry.add('media', 'previous', lambda p: system_controller.media_previous(), mode='input')
+
+registry.category('brightness', '屏幕亮度控制')
+registry.add('brightness', 'up', lambda p: p['steps'], mode='steps', params=(STEPS,))
+registry.add('brightness', 'down', lambda p: -p['steps'], mode='steps', params=(STEPS,))
+
+registry.category('hotkey', '快捷键控制')
+registry.add('hotkey', 'alt_tab', lambda p: system_controller.send_alt_tab(), mode='input')
+registry.add('hotkey', 'ctrl_c', lambda p: system_controller.send_ctrl_c(), mode='input')
+registry.add('hotkey', 'ctrl_v', lambda p: system_controller.send_ctrl_v(), mode='input')
+registry.add('hotkey', 'win_d', lambda p: system_controller.send_win_d(), mode='input')
+registry.add(
+    'hotkey', 'custom',
+    lambda p: system_controller.send_key_combination(p['keys'], p['hold_ms'] / 1000),
+    mode='input',
+    params=(
+        Param('keys', 'keys', required=True, description='虚拟键码数组、JSON 数组字符串或 ctrl+c 形式的组合键'),
+        # 个别程序需要组合键按住一段时间才能识别，默认不停顿
+        Param('hold_ms', 'float', 0.0, minimum=0, description='按住的毫秒数'),
+    ),
+    description='自定义组合键',
+    example={'keys': '[17,67]'}
+)
 
-# =================== 媒体控制 API ===================
-@app.route('/api/media/<action>', methods=['GET', 'POST'])
-def media_control(action: str):
-    """媒体控制"""
+def ms_to_seconds(value: Optional[float]) -> Optional[float]:
+    return None if value is None else value / 1000
+
+# 松开必须送达，所以 key 类别走 control 通道，不会被连发的输入命令挤掉
+registry.category('key', '按住模式：down 按下并由服务端自动重复，up 松开；租约到期未续期时自动松开', lane='control')
+registry.add(
+    'key', 'down',
+    lambda p: key_holds.press(p['keys'], p['rate'], ms_to_seconds(p['delay_ms']), ms_to_seconds(p['lease_ms']),
+                              p['repeat']),
+    params=(
+        Param('keys', 'keys', required=True, description='组合键时修饰键一直按住，只重复最后一个键'),
+        Param('rate', 'float', minimum=0.1, maximum=50, description='每秒重复次数，默认 10'),
+        Param('delay_ms', 'float', minimum=0, description='第一次重复前的延迟，默认 300'),
+        Param('lease_ms', 'float', minimum=100, description='租约，默认 5000，最多 30000；到期前可以用 renew 续期'),
+        Param('repeat', 'bool', True, description='false 时只按住不重复'),
+    ),
+    description='按下按键，返回 hold_id',
+    example={'keys': 'volume_up', 'rate': 10}
+)
+registry.add(
+    'key', 'up',
+    lambda p: key_holds.release(p['hold_id'], p['keys']),
+    params=(
+        Param('hold_id', 'int'),
+        Param('keys', 'keys', description='松开包含这些键的按住；hold_id 和 keys 都不传时松开全部'),
+    ),
+    description='松开按键，返回按住时长和重复次数'
+)
+registry.add(
+    'key', 'renew',
+    lambda p: key_holds.renew(p['hold_id'], ms_to_seconds(p['lease_ms'])),
+    params=(Param('hold_id', 'int', required=True), Param('lease_ms', 'float', minimum=100)),
+    description='续期租约'
+)
+registry.add(
+    'key', 'holds',
+    lambda p: {'success': True, 'holds': key_holds.holds(), 'stats': key_holds.stats()},
+    methods=('GET',),
+    description='当前按住的按键'
+)
+
+def list_windows(p: dict) -> dict:
+    return system_controller.list_windows(p['q'], p['all'], p['class_name'], p['process'], p['limit'])
+
+registry.category('window', '窗口控制', lane='control')
+registry.add('window', 'minimize', lambda p: system_controller.minimize_window(p['hwnd']), params=(HWND,))
+registry.add('window', 'maximize', lambda p: system_controller.maximize_window(p['hwnd']), params=(HWND,))
+registry.add('window', 'restore', lambda p: system_controller.restore_window(p['hwnd']), params=(HWND,))
+registry.add('window', 'close', lambda p: system_controller.close_window(p['hwnd']), params=(HWND,))
+registry.add('window', 'focus', lambda p: system_controller.focus_window(p['hwnd']), params=(HWND,),
+             description='切换到前台，最小化的窗口先恢复')
+registry.add('window', 'info', lambda p: system_controller.get_active_window(), description='前台窗口信息')
+registry.add(
+    'window', 'list', list_windows,
+    methods=('GET',),
+    params=(
+        Param('q', description='标题/进程名模糊搜索'),
+        Param('all', 'bool', False, description='包含隐藏和无标题窗口'),
+        Param('class_name'),
+        Param('process', description='进程名子串'),
+        Param('limit', 'int', 100, minimum=1),
+    )
+)
+
+registry.category('system', '系统控制', lane='control')
+registry.add('system', 'lock', lambda p: system_controller.lock_screen())
+registry.add('system', 'shutdown', lambda p: system_controller.shutdown_system(p['force']), params=(FORCE,))
+registry.add('system', 'restart', lambda p: system_controller.restart_system(p['force']), params=(FORCE,))
+registry.add('system', 'sleep', lambda p: system_controller.sleep_system())
+registry.add('system', 'info', lambda p: system_controller.get_system_info())
+registry.add(
+    'system', 'metrics',
+    lambda p: system_controller.get_metrics_history(
+        p['from'], p['to'], p['step'], [name for name in p['metrics'].split(',') if name] or None),
+    methods=('GET',),
+    params=(
+        Param('from', 'float', description='unix 秒，负数表示相对现在，默认最近 10 分钟'),
+        Param('to', 'float', description='unix 秒，负数表示相对现在'),
+        Param('step', 'float', description='秒'),
+        Param('metrics', 'str', '', description='逗号分隔: cpu_percent,memory_percent,disk_percent,send_rate,recv_rate'),
+    ),
+    description='系统指标历史（降采样后的时间序列）'
+)
+
+def check_kill(p: dict) -> Optional[str]:
+    if not (p['names'] or p['name'] or p['pids'] or p['patterns']):
+        return '请提供进程名称、pid 或通配符'
     try:
-        print(f"收到媒体控制请求: {action}, 方法: {request.method}")
-        
-        actions = {
-            'play': lambda: system_controller.media_play_pause(),
-            'pause': lambda: system_controller.media_play_pause(),
-            'stop': lambda: system_controller.media_stop(),
-            'next': lambda: system_controller.media_next(),
-            'previous': lambda: system_controller.media_previous()
-        }
-        
-        if action not in actions:
+        [int(pid) for pid in p['pids']]
+    except (ValueError, TypeError):
+        return 'pids 必须是整数列表'
+    return None
+
+def kill_processes(p: dict) -> dict:
+    """批量终止进程；name 为兼容旧参数的单个名称"""
+    return system_controller.kill_processes(
+        [str(n) for n in p['names'] + p['name']],
+        [int(pid) for pid in p['pids']],
+        [str(pattern) for pattern in p['patterns']],
+        p['grace']
+    )
+
+registry.category('app', '应用程序控制', lane='control')
+registry.add(
+    'app', 'launch',
+    lambda p: system_controller.launch_application(p['path'], p['args'], p['working_dir'], p['id'], p['mode']),
+    params=(
+        Param('path', 'str', '', description='可执行文件路径'),
+        Param('id', description='/api/app/search 返回的应用 id'),
+        Param('args', 'any', '', description='字符串或数组，不经过 shell'),
+        Param('working_dir', 'str', ''),
+        Param('mode', 'str', 'launch', choices=LAUNCH_MODES, description='focus_or_launch: 已运行时切换到已有窗口'),
+    ),
+    check=lambda p: None if p['path'] or p['id'] else '请提供应用程序路径或应用 id',
+    description='启动应用程序，返回 pid 和 launch_id',
+    example={'path': 'C:\\Windows\\System32\\notepad.exe'}
+)
+registry.add(
+    'app', 'search',
+    lambda p: system_controller.search_applications(p['q'], p['limit']),
+    methods=('GET',),
+    params=(Param('q', 'str', '', description='名称模糊搜索'), Param('limit', 'int', 20, minimum=1, description='最多 100')),
+    description='搜索已安装的应用'
+)
+registry.add(
+    'app', 'kill', kill_processes,
+    params=(
+        Param('names', 'list', [], description='进程名'),
+        Param('name', 'list', [], description='兼容旧参数'),
+        Param('pids', 'list', []),
+        Param('patterns', 'list', [], description='支持 * ? 通配符'),
+        Param('grace', 'float', 0.0, minimum=0, description='秒，先发送 WM_CLOSE 等待正常退出，超时再强制结束'),
+    ),
+    check=check_kill,
+    description='批量结束进程，返回每个进程的结果',
+    example={'names': ['notepad.exe'], 'pids': [1234], 'patterns': ['helper*.exe'], 'grace': 3}
+)
+registry.add(
+    'app', 'processes',
+    lambda p: system_controller.get_running_processes(p['name'], p['sort'], p['limit'], p['cursor']),
+    methods=('GET',),
+    params=(
+        Param('name', description='名称子串'),
+        Param('sort', 'str', 'memory', choices=tuple(SORT_KEYS)),
+        Param('limit', 'int', 50, minimum=1, description='最多 500'),
+        Param('cursor', description='上一页返回的 next_cursor'),
+    ),
+    description='进程列表（后台刷新的快照，支持游标分页）'
+)
+registry.add(
+    'app', 'processes_delta',
+    lambda p: system_controller.get_process_changes(p['since']),
+    methods=('GET',),
+    route='/api/app/processes/delta',
+    params=(Param('since', 'int', 0, description='上次的 version；0 或过旧时返回全量'),),
+    description='增量同步进程列表'
+)
+registry.add(
+    'app', 'launches',
+    lambda p: system_controller.get_launches(p['id'], p['running'], p['limit']),
+    methods=('GET',),
+    params=(
+        Param('id', 'int', description='launch_id'),
+        Param('running', 'bool', False, description='只看仍在运行的'),
+        Param('limit', 'int', 50, minimum=1, description='最多 200'),
+    ),
+    description='启动记录: pid、退出码、启动耗时和第一个窗口出现的时间'
+)
+
+# 按客户端和通道的准入控制：令牌桶限流、同时执行数上限，control 通道有保留名额
+admission = AdmissionController(
+    parse_lanes(os.environ.get('REMOTE_PC_ADMISSION_LANES', '')),
+    registry.lane,
+    total_in_flight=int(os.environ.get('REMOTE_PC_ADMISSION_MAX_IN_FLIGHT', 8)),
+    reserved=int(os.environ.get('REMOTE_PC_ADMISSION_RESERVED', 2)),
+    enabled=os.environ.get('REMOTE_PC_ADMISSION', 'on').lower() not in ['off', 'false', '0', 'no']
+)
+
+request_metrics.add_gauge('remote_pc_admission_in_flight', 'Admitted commands currently executing, by lane',
+                          admission.in_flight, label='lane')
+request_metrics.add_gauge('remote_pc_admission_admitted_total', 'Commands admitted, by lane',
+                          lambda: admission.counts('admitted'), label='lane', kind='counter')
+request_metrics.add_gauge('remote_pc_admission_limited_total', 'Commands rejected by the per-client rate limit (429), by lane',
+                          lambda: admission.counts('limited'), label='lane', kind='counter')
+request_metrics.add_gauge('remote_pc_admission_busy_total', 'Commands rejected by the in-flight limits (429), by lane',
+                          lambda: admission.counts('busy'), label='lane', kind='counter')
+
+def execute_command(category: str, action: str, data: dict, client: Optional[str] = None):
+    """按类别和操作执行命令，供 WebSocket 等非 REST 通道复用，返回 (结果, HTTP 状态码)
+
+    client 为发起命令的客户端地址，需要经过准入控制；批量和宏内部的步骤不传，已经整体准入过。
+    """
+    def run():
+        if category == 'macro':
+            result = macro_store.run(action, wait=wants_wait(data))
+            return result, input_status_code(result)
+        return registry.execute(category, action, data)
+
+    if client is None:
+        return run()
+    return admission.run(client, category, run)
+
+def command_response(result: dict, status: int):
+    """命令结果转成 HTTP 响应，准入被拒绝时带 Retry-After"""
+    response = jsonify(result)
+    response.status_code = status
+    if status == 429 and 'retry_after' in result:
+        response.headers['Retry-After'] = retry_after_header(result['retry_after'])
+    return response
+
+# 可选的 WebSocket 命令通道，复用 execute_command；--ws / REMOTE_PC_WS 开启时才启动
+command_channel = CommandChannel(execute_command, port=int(os.environ.get('REMOTE_PC_WS_PORT', 8091)))
+
+# 可选的 UDP 即发即弃通道，仅在配置了密钥时启用
+udp_listener = None
+if os.environ.get('REMOTE_PC_UDP_KEY'):
+    udp_listener = UdpCommandListener(
+        execute_command,
+        os.environ['REMOTE_PC_UDP_KEY'].encode('utf-8'),
+        port=int(os.environ.get('REMOTE_PC_UDP_PORT', 8092)),
+        window=float(os.environ.get('REMOTE_PC_UDP_WINDOW_MS', 10000)) / 1000
+    )
+
+# 服务端宏，定义文件变化时自动重新加载
+macro_store = MacroStore(
+    os.environ.get('REMOTE_PC_MACROS', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'macros.json')),
+    system_controller,
+    input_dispatcher,
+    execute_command,
+    command_validator=lambda category, action: category == 'macro' or registry.validate(category, action)
+)
+try:
+    macro_store.load()
+except Exception as e:
+    logger.error("加载宏文件失败: %s", e)
+
+# =================== 命令 API ===================
+@app.route('/api/<category>/<action>', methods=['GET', 'POST'])
+def dispatch_command(category: str, action: str):
+    """注册表中的命令：/api/<category>/<action>"""
+    try:
+        command = registry.get(category, action)
+        if command is None:
+            if not registry.has_category(category):
+                return jsonify({'success': False, 'message': f'接口不存在: {request.path}'}), 404
             return jsonify({
-                'success': False, 
+                'success': False,
                 'message': f'不支持的操作: {action}',
-                'available_actions': list(actions.keys())
+                'available_actions': registry.actions(category)
             }), 400
-        
-        print(f"执行媒体操作: {action}")
-        result = actions[action]()
-        print(f"操作结果: {result}")
-        
-        return jsonify(result), 200 if result.get('success', False) else 400
-        
+        if request.method not in command.methods:
+            return jsonify({
+                'success': False,
+                'message': f'{command.path} 只支持 {", ".join(command.methods)}'
+            }), 405
+
+        data = get_request_data()
+        result, status = admission.run(request.remote_addr or '', category, lambda: registry.run(command, data))
+        return command_response(result, status)
+
     except Exception as e:
-        print(f"媒体控制错误: {e}")
+        logger.exception("命令执行错误 %s/%s: %s", category, action, e)
         return jsonify({
-            'success': False, 
+            'success': False,
             'message': f'服务器错误: {str(e)}'
         }), 500
 
-# =================== 屏幕亮度 API ===================
-@app.route('/api/brightness/<action>', methods=['GET', 'POST'])
-def brightness_control(action: str):
-    """屏幕亮度控制"""
+# 路径不是 /api/<category>/<action> 形式的命令单独注册路由
+for custom in registry.commands():
+    if custom.route:
+        app.add_url_rule(custom.route, f'command_{custom.name}', dispatch_command, methods=list(custom.methods),
+                         defaults={'category': custom.category, 'action': custom.action})
+
+# =================== 窗口缩略图 API ===================
+@app.route('/api/window/<int:hwnd>/thumbnail', methods=['GET'])
+def get_window_thumbnail(hwnd: int):
+    """窗口缩略图，支持 ETag / If-None-Match"""
     try:
-        print(f"收到亮度控制请求: {action}, 方法: {request.method}")
-        
         data = get_request_data()
-        steps = 1
         try:
-            steps = int(data.get('steps', 1))
+            width = int(data.get('width', 320))
         except (ValueError, TypeError):
-            steps = 1
-        
-        actions = {
-            'up': lambda: system_controller.brightness_up(steps),
-            'down': lambda: system_controller.brightness_down(steps)
-        }
-        
-        if action not in actions:
-            return jsonify({
-                'success': False, 
-                'message': f'不支持的操作: {action}',
-                'available_actions': list(actions.keys())
-            }), 400
-        
-        print(f"执行亮度操作: {action}")
-        result = actions[action]()
-        print(f"操作结果: {result}")
-        
-        return jsonify(result), 200 if result.get('success', False) else 400
-        
+            return jsonify({'success': False, 'message': 'width 必须是整数'}), 400
+        if system_controller.window_index.get(hwnd) is None:
+            return jsonify({'success': False, 'message': f'窗口不存在: {hwnd}'}), 404
+        result = system_controller.get_window_thumbnail(hwnd, width)
+        if not result.get('success', False):
+            return jsonify(result), 400
+
+        thumbnail = result['thumbnail']
+        response = Response(thumbnail.data, mimetype=thumbnail.content_type)
+        response.set_etag(thumbnail.etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        response.make_conditional(request)
+        if response.status_code == 304:
+            system_controller.thumbnail_cache.record_not_modified()
+        return response
     except Exception as e:
-        print(f"亮度控制错误: {e}")
+        logger.exception("获取窗口缩略图错误: %s", e)
         return jsonify({
-            'success': False, 
+            'success': False,
             'message': f'服务器错误: {str(e)}'
         }), 500
 
-# =================== 应用程序控制 API ===================
-@app.route('/api/app/launch', methods=['GET', 'POST'])
-def launch_app():
-    """启动应用程序"""
+@app.route('/api/window/thumbnails/stats', methods=['GET'])
+def thumbnail_stats():
+    """缩略图缓存统计"""
+    return jsonify({'success': True, 'stats': system_controller.thumbnail_cache.stats()})
+
+# =================== 屏幕推流 API ===================
+@app.route('/api/screen/stream', methods=['GET'])
+def screen_stream():
+    """屏幕推流（只发送变化区域的二进制帧流）"""
     try:
-        print(f"收到应用启动请求, 方法: {request.method}")
-        
         data = get_request_data()
-        print(f"请求数据: {data}")
-        
-        if not data or 'path' not in data:
-            return jsonify({
-                'success': False, 
-                'message': '请提供应用程序路径',
-                'example': {'path': 'C:\\Windows\\System32\\notepad.exe'}
-            }), 400
-        
-        result = system_controller.launch_application(
-            data['path'], 
-            data.get('args', ''), 
-            data.get('working_dir', '')
-        )
-        return jsonify(result), 200 if result.get('success', False) else 400
-        
+        try:
+            fps = int(data.get('fps', 10))
+            max_width = int(data.get('max_width', 1280))
+            max_height = int(data.get('max_height', 720))
+            quality = int(data.get('quality', 70))
+            tile = int(data.get('tile', 64))
+            frames = int(data['frames']) if data.get('frames') else None
+        except (ValueError, TypeError):
+            return jsonify({'success': False, 'message': 'fps / max_width / max_height / quality / tile / frames 必须是整数'}), 400
+
+        try:
+            session = system_controller.screen_streamer.open(
+                fps, max_width, max_height, data.get('codec') or None, quality, tile)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        if session is None:
+            return jsonify({'success': False, 'message': '同时推流数量已达上限'}), 503
+
+        response = Response(session.frames(frames), mimetype='application/octet-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Frame-Size'] = f'{session.width}x{session.height}'
+        response.headers['X-Frame-Codec'] = session.encoder.codec
+        # 客户端在开始读取前断开时生成器不会运行，需要在这里释放会话
+        response.call_on_close(session.close)
+        return response
     except Exception as e:
-        print(f"应用启动错误: {e}")
+        logger.exception("屏幕推流错误: %s", e)
         return jsonify({
-            'success': False, 
+            'success': False,
             'message': f'服务器错误: {str(e)}'
         }), 500
 
-@app.route('/api/app/kill', methods=['GET', 'POST'])
-def kill_app():
-    """终止应用程序"""
-    try:
-        print(f"收到应用终止请求, 方法: {request.method}")
+@app.route('/api/screen/stats', methods=['GET'])
+def screen_stats():
+    """屏幕推流统计"""
+    return jsonify({'success': True, 'stats': system_controller.screen_streamer.stats()})
+
+# =================== 批量命令 API ===================
+BATCH_MAX_COMMANDS = 50
+BATCH_MAX_DELAY_MS = 30000
+
+def run_batch(commands: list, stop_on_error: bool = True) -> dict:
+    """按顺序执行一组命令，返回每一步的结果和耗时"""
+    steps = []
+    batch_start = time.perf_counter()
+    total_delay = 0
+    success = True
+    
+    for index, command in enumerate(commands):
+        if not isinstance(command, dict):
+            steps.append({'index': index, 'success': False, 'message': '命令必须是对象'})
+            success = False
+            if stop_on_error:
+                break
+            continue
         
+        try:
+            delay_ms = max(int(command.get('delay_ms', 0)), 0)
+        except (ValueError, TypeError):
+            delay_ms = 0
+        total_delay += delay_ms
+        if total_delay > BATCH_MAX_DELAY_MS:
+            steps.append({'index': index, 'success': False, 'message': f'累计延迟超过 {BATCH_MAX_DELAY_MS}ms'})
+            success = False
+            break
+        if delay_ms:
+            time.sleep(delay_ms / 1000)
+        
+        category = command.get('category')
+        action = command.get('action', '')
+        if not category:
+            # 纯延迟步骤
+            steps.append({'index': index, 'success': True, 'delay_ms': delay_ms})
+            continue
+        
+        params = dict(command.get('params') or {})
+        # 批量中的键盘命令默认等待完成，保证后续步骤按顺序生效
+        params.setdefault('wait', True)
+        
+        step_start = time.perf_counter()
+        try:
+            result, status = execute_command(category, action, params)
+        except Exception as e:
+            result, status = {'success': False, 'message': f'服务器错误: {str(e)}'}, 500
+        step_ok = bool(result.get('success', False)) and status < 400
+        
+        steps.append({
+            'index': index,
+            'category': category,
+            'action': action,
+            'success': step_ok,
+            'status': status,
+            'delay_ms': delay_ms,
+            'elapsed_ms': round((time.perf_counter() - step_start) * 1000, 2),
+            'result': result
+        })
+        if not step_ok:
+            success = False
+            if stop_on_error:
+                break
+    
+    return {
+        'success': success,
+        'message': f'已执行 {len(steps)}/{len(commands)} 步' + ('' if success else '，存在失败步骤'),
+        'steps': steps,
+        'total_ms': round((time.perf_counter() - batch_start) * 1000, 2)
+    }
+
+@app.route('/api/batch', methods=['GET', 'POST'])
+def batch_commands():
+    """一次请求按顺序执行多条命令"""
+    try:
         data = get_request_data()
+        commands = data.get('commands')
+        if isinstance(commands, str):
+            try:
+                commands = json.loads(commands)
+            except ValueError:
+                commands = None
         
-        if not data or 'name' not in data:
+        if not isinstance(commands, list) or not commands:
             return jsonify({
-                'success': False, 
-                'message': '请提供进程名称',
-                'example': {'name': 'notepad.exe'}
+                'success': False,
+                'message': '请提供命令列表 commands',
+                'example': {
+                    'commands': [
+                        {'category': 'app', 'action': 'launch', 'params': {'path': 'notepad.exe'}},
+                        {'category': 'window', 'action': 'maximize', 'delay_ms': 800},
+                        {'category': 'hotkey', 'action': 'custom', 'params': {'keys': [17, 78]}}
+                    ],
+                    'stop_on_error': True
+                }
             }), 400
         
-        result = system_controller.kill_process(data['name'])
-        return jsonify(result), 200 if result.get('success', False) else 400
+        if len(commands) > BATCH_MAX_COMMANDS:
+            return jsonify({
+                'success': False,
+                'message': f'命令数量不能超过 {BATCH_MAX_COMMANDS}'
+            }), 400
         
-    except Exception as e:
-        print(f"应用终止错误: {e}")
-        return jsonify({
-            'success': False, 
-            'message': f'服务器错误: {str(e)}'
-        }), 500
+        stop_on_error = str(data.get('stop_on_error', True)).lower() in ['true', '1', 'yes']
+        def run():
+            result = run_batch(commands, stop_on_error)
+            return result, 200 if result['success'] else 400
 
-@app.route('/api/app/processes', methods=['GET'])
-def get_processes():
-    """获取进程列表"""
-    try:
-        print("收到获取进程列表请求")
-        result = system_controller.get_running_processes()
-        return jsonify(result), 200 if result.get('success', False) else 400
+        result, status = admission.run(request.remote_addr or '', 'batch', run)
+        return command_response(result, status)
+        
     except Exception as e:
-        print(f"获取进程列表错误: {e}")
+        logger.exception("批量命令错误: %s", e)
         return jsonify({
             'success': False, 
             'message': f'服务器错误: {str(e)}'
         }), 500
 
-# =================== 窗口控制 API ===================
-@app.route('/api/window/<action>', methods=['GET', 'POST'])
-def window_control(action: str):
-    """窗口控制"""
+# =================== 宏 API ===================
+@app.route('/api/macro', methods=['GET', 'POST'])
+def macro_list():
+    """列出或注册宏"""
     try:
-        print(f"收到窗口控制请求: {action}, 方法: {request.method}")
+        if request.method == 'GET':
+            macros = macro_store.list()
+            return jsonify({'success': True, 'message': f'共 {len(macros)} 个宏', 'macros': macros})
         
         data = get_request_data()
-        hwnd = data.get('hwnd')
-        if hwnd:
-            try:
-                hwnd = int(hwnd)
-            except (ValueError, TypeError):
-                hwnd = None
-        
-        actions = {
-            'minimize': lambda: system_controller.minimize_window(hwnd),
-            'maximize': lambda: system_controller.maximize_window(hwnd),
-            'restore': lambda: system_controller.restore_window(hwnd),
-            'close': lambda: system_controller.close_window(hwnd),
-            'info': lambda: system_controller.get_active_window()
-        }
-        
-        if action not in actions:
+        if not data or 'id' not in data or 'steps' not in data:
             return jsonify({
-                'success': False, 
-                'message': f'不支持的操作: {action}',
-                'available_actions': list(actions.keys())
+                'success': False,
+                'message': '请提供宏 id 和 steps',
+                'example': {
+                    'id': 'task_manager',
+                    'name': '任务管理器',
+                    'steps': [{'keys': 'ctrl+shift+esc'}]
+                }
             }), 400
         
-        print(f"执行窗口操作: {action}")
-        result = actions[action]()
-        print(f"操作结果: {result}")
+        definition = {key: value for key, value in data.items() if key != 'id'}
+        try:
+            macro = macro_store.register(str(data['id']), definition)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': f'宏定义无效: {e}'}), 400
         
-        return jsonify(result), 200 if result.get('success', False) else 400
+        return jsonify({'success': True, 'message': f'宏已保存: {macro.macro_id}', 'macro': macro.to_dict()})
         
     except Exception as e:
-        print(f"窗口控制错误: {e}")
+        logger.exception("宏管理错误: %s", e)
         return jsonify({
             'success': False, 
             'message': f'服务器错误: {str(e)}'
         }), 500
 
-# =================== 系统控制 API ===================
-@app.route('/api/system/<action>', methods=['GET', 'POST'])
-def system_control(action: str):
-    """系统控制"""
+@app.route('/api/macro/<macro_id>', methods=['GET', 'POST', 'DELETE'])
+def macro_invoke(macro_id: str):
+    """执行或删除宏"""
     try:
-        print(f"收到系统控制请求: {action}, 方法: {request.method}")
-        
-        data = get_request_data()
-        force = str(data.get('force', '')).lower() in ['true', '1', 'yes']
-        
-        actions = {
-            'lock': lambda: system_controller.lock_screen(),
-            'shutdown': lambda: system_controller.shutdown_system(force),
-            'restart': lambda: system_controller.restart_system(force),
-            'sleep': lambda: system_controller.sleep_system(),
-            'info': lambda: system_controller.get_system_info()
-        }
-        
-        if action not in actions:
-            return jsonify({
-                'success': False, 
-                'message': f'不支持的操作: {action}',
-                'available_actions': list(actions.keys())
-            }), 400
+        if request.method == 'DELETE':
+            try:
+                removed = macro_store.remove(macro_id)
+            except ValueError as e:
+                return jsonify({'success': False, 'message': str(e)}), 409
+            if not removed:
+                return jsonify({'success': False, 'message': f'宏不存在: {macro_id}'}), 404
+            return jsonify({'success': True, 'message': f'宏已删除: {macro_id}'})
         
-        print(f"执行系统操作: {action}")
-        result = actions[action]()
-        print(f"操作结果: {result}")
+        if macro_store.get(macro_id) is None:
+            return jsonify({'success': False, 'message': f'宏不存在: {macro_id}'}), 404
         
-        return jsonify(result), 200 if result.get('success', False) else 400
+        data = get_request_data()
+        result, status = admission.run(
+            request.remote_addr or '', 'macro',
+            lambda: execute_command('macro', macro_id, data)
+        )
+        return command_response(result, status)
         
     except Exception as e:
-        print(f"系统控制错误: {e}")
+        logger.exception("宏执行错误: %s", e)
         return jsonify({
             'success': False, 
             'message': f'服务器错误: {str(e)}'
         }), 500
 
-# =================== 快捷键 API ===================
-@app.route('/api/hotkey/<action>', methods=['GET', 'POST'])
-def hotkey_control(action: str):
-    """快捷键控制"""
+# =================== 命令状态 API ===================
+@app.route('/api/command/<int:command_id>', methods=['GET'])
+def command_status(command_id: int):
+    """查询已排队命令的执行状态"""
+    command = input_dispatcher.get_command(command_id)
+    if command is None:
+        return jsonify({
+            'success': False,
+            'message': f'命令不存在或已过期: {command_id}'
+        }), 404
+    return jsonify({'success': True, 'command': command})
+
+@app.route('/api/command/batch/<int:batch_id>', methods=['GET'])
+def coalesced_batch_status(batch_id: int):
+    """查询音量/亮度步进合并批次的状态；批次交给派发线程后带有 command_id"""
+    batch = step_coalescer.get_batch(batch_id)
+    if batch is None:
+        return jsonify({
+            'success': False,
+            'message': f'批次不存在或已过期: {batch_id}'
+        }), 404
+    return jsonify({'success': True, 'batch': batch})
+
+@app.route('/api/input/stats', methods=['GET'])
+def input_stats():
+    """输入派发与步进合并统计"""
+    return jsonify({
+        'success': True,
+        'dispatcher': input_dispatcher.stats(),
+        'coalescer': step_coalescer.stats(),
+        'key_holds': key_holds.stats(),
+        'admission': admission.stats(),
+        'websocket': command_channel.stats(),
+        'udp': udp_listener.stats() if udp_listener else {'running': False}
+    })
+
+# =================== 请求指标 ===================
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """请求延迟直方图和计数；默认 Prometheus 文本格式，format=json 或 Accept: application/json 时返回 JSON"""
     try:
-        print(f"收到快捷键请求: {action}, 方法: {request.method}")
-        
-        actions = {
-            'alt_tab': lambda: system_controller.send_alt_tab(),
-            'ctrl_c': lambda: system_controller.send_ctrl_c(),
-            'ctrl_v': lambda: system_controller.send_ctrl_v(),
-            'win_d': lambda: system_controller.send_win_d()
-        }
-        
-        if action not in actions:
-            return jsonify({
-                'success': False, 
-                'message': f'不支持的操作: {action}',
-                'available_actions': list(actions.keys())
-            }), 400
-        
-        print(f"执行快捷键: {action}")
-        result = actions[action]()
-        print(f"操作结果: {result}")
-        
-        return jsonify(result), 200 if result.get('success', False) else 400
-        
+        data = get_request_data()
+        wants_json = data.get('format') == 'json' or (
+            data.get('format') != 'prometheus' and
+            request.accept_mimetypes.best_match(['text/plain', 'application/json']) == 'application/json'
+        )
+        if wants_json:
+            return jsonify({'success': True, **request_metrics.snapshot(data.get('route') or None)})
+        return Response(request_metrics.prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
     except Exception as e:
-        print(f"快捷键控制错误: {e}")
+        logger.exception("获取请求指标错误: %s", e)
         return jsonify({
-            'success': False, 
+            'success': False,
             'message': f'服务器错误: {str(e)}'
         }), 500
 
-@app.route('/api/hotkey/custom', methods=['GET', 'POST'])
-def custom_hotkey():
-    """自定义组合键"""
+# =================== 调试 ===================
+@app.route('/api/debug/recent', methods=['GET'])
+def recent_requests():
+    """最近的请求记录（新的在前）"""
     try:
-        print(f"收到自定义快捷键请求, 方法: {request.method}")
-        
         data = get_request_data()
-        
-        if not data or 'keys' not in data:
-            return jsonify({
-                'success': False, 
-                'message': '请提供按键列表',
-                'example': {'keys': '[17,67]'}  # Ctrl+C
-            }), 400
-        
-        keys = data['keys']
-        if isinstance(keys, str):
-            try:
-                import json
-                keys = json.loads(keys)
-            except:
-                return jsonify({
-                    'success': False, 
-                    'message': 'keys 格式错误，应为JSON数组'
-                }), 400
-        
-        if not isinstance(keys, list):
-            return jsonify({
-                'success': False, 
-                'message': 'keys 必须是数组'
-            }), 400
-        
-        result = system_controller.send_key_combination(keys)
-        return jsonify(result), 200 if result.get('success', False) else 400
-        
+        try:
+            limit = int(data.get('limit', 50))
+        except (ValueError, TypeError):
+            limit = 50
+        result = request_log.recent(
+            limit,
+            str(data.get('errors', '')).lower() in ['true', '1', 'yes'],
+            data.get('route') or None
+        )
+        return jsonify({'success': True, 'message': f'最近 {len(result["requests"])} 个请求', **result})
     except Exception as e:
-        print(f"自定义快捷键错误: {e}")
+        logger.exception("获取最近请求错误: %s", e)
         return jsonify({
-            'success': False, 
+            'success': False,
             'message': f'服务器错误: {str(e)}'
         }), 500
 
@@ -387,11 +878,8 @@ def custom_hotkey():
 def test_endpoint():
     """测试端点"""
     try:
-        import time
         data = get_request_data()
         
-        print(f"收到测试请求, 方法: {request.method}, 数据: {data}")
-        
         return jsonify({
             'success': True,
             'message': 'API 服务正常运行',
@@ -404,64 +892,85 @@ def test_endpoint():
         })
         
     except Exception as e:
-        print(f"测试端点错误: {e}")
+        logger.exception("测试端点错误: %s", e)
         return jsonify({
             'success': False, 
             'message': f'服务器错误: {str(e)}'
         }), 500
 
 # =================== API 信息 ===================
-@app.route('/api/info', methods=['GET'])
-def api_info():
-    """获取 API 信息"""
-    return jsonify({
+registry.add_endpoint('window', '/api/window/<hwnd>/thumbnail', '窗口缩略图',
+                      {'width': '32-640, 默认320；返回图片并带 ETag，If-None-Match 命中时返回 304'})
+registry.add_endpoint('window', '/api/window/thumbnails/stats', '缩略图缓存统计')
+registry.category('screen', '屏幕推流（二进制帧流，首帧为整屏，之后只包含变化区域）')
+registry.add_endpoint('screen', '/api/screen/stream', '屏幕推流', {
+    'fps': '1-30, 默认10', 'max_width / max_height': '默认1280x720', 'codec': 'jpeg/webp/zlib',
+    'quality': '1-95', 'tile': '16-256', 'frames': '发送帧数上限'
+})
+registry.add_endpoint('screen', '/api/screen/stats', '屏幕推流统计')
+registry.category('batch', '一次请求按顺序执行多条命令', lane='bulk')
+registry.add_endpoint('batch', '/api/batch', '批量命令', {
+    'commands': f'[{{category, action, params, delay_ms}}] (最多 {BATCH_MAX_COMMANDS} 条)',
+    'stop_on_error': 'bool (可选, 默认 true)'
+})
+registry.category('macro', '服务端宏：GET 列表，POST 注册，GET/POST /api/macro/<id> 执行，DELETE 删除')
+registry.add_endpoint('macro', '/api/macro', '列出或注册宏', {
+    'steps': "[{keys: 'ctrl+shift+esc'} | {text} | {delay_ms} | {command: {category, action, params}}]"
+})
+registry.add_endpoint('macro', '/api/macro/<macro_id>', '执行或删除宏')
+registry.category('command', '查询排队命令的执行状态和输入统计')
+registry.add_endpoint('command', '/api/command/<command_id>', '排队命令的执行状态')
+registry.add_endpoint('command', '/api/command/batch/<batch_id>',
+                      '音量/亮度步进合并批次的状态；合并的步进提交时还没有 command_id，用响应里的 batch_id 查询')
+registry.add_endpoint('command', '/api/input/stats', '输入派发、步进合并、按住和准入控制统计')
+registry.category('metrics', '按路由/操作/阶段（parse、handler、serialize、total）的延迟直方图，请求和错误计数，'
+                             '进行中的请求，输入命令的排队/执行耗时和队列深度')
+registry.add_endpoint('metrics', '/api/metrics', '请求指标', {
+    'format': 'prometheus 默认 / json；也可以用 Accept: application/json', 'route': 'JSON 时的路由前缀过滤'
+})
+registry.category('debug', '最近的请求记录（路由、操作、参数、状态码、耗时）')
+registry.add_endpoint('debug', '/api/debug/recent', '最近的请求', {
+    'limit': '默认50, 最多1000', 'errors': '只看状态码 >= 400 的', 'route': '路由前缀，例如 /api/volume'
+})
+registry.category('websocket', 'WebSocket 持久命令通道（--ws 开启），可以执行注册表中的全部命令')
+
+def advertise_websocket():
+    """通道启动后按实际监听的端口登记；端口来自命令行参数，导入模块时还不知道"""
+    registry.add_endpoint('websocket', f'ws://<host>:{command_channel.port}', 'WebSocket 命令通道', {
+        'frame': {'id': 'int', 'c': 'category', 'a': 'action', 'p': 'params 对象'}
+    })
+
+def build_api_info(categories: dict) -> dict:
+    return {
         'success': True,
         'message': 'Windows 系统控制 API',
         'server_info': {
             'version': '1.0.1',
             'supported_methods': ['GET', 'POST'],
             'content_types': ['application/json', 'application/x-www-form-urlencoded', 'query_params'],
-            'note': 'GET请求使用查询参数，POST请求支持JSON和表单数据'
-        },
-        'categories': {
-            'volume': {
-                'endpoints': ['/api/volume/up', '/api/volume/down', '/api/volume/mute'],
-                'description': '音量控制',
-                'parameters': {'steps': 'int (可选, 默认1)'}
-            },
-            'media': {
-                'endpoints': ['/api/media/play', '/api/media/stop', '/api/media/next', '/api/media/previous'],
-                'description': '媒体播放控制'
-            },
-            'brightness': {
-                'endpoints': ['/api/brightness/up', '/api/brightness/down'],
-                'description': '屏幕亮度控制',
-                'parameters': {'steps': 'int (可选, 默认1)'}
-            },
-            'application': {
-                'endpoints': ['/api/app/launch', '/api/app/kill', '/api/app/processes'],
-                'description': '应用程序控制'
-            },
-            'window': {
-                'endpoints': ['/api/window/minimize', '/api/window/maximize', '/api/window/restore', '/api/window/close', '/api/window/info'],
-                'description': '窗口控制'
-            },
-            'system': {
-                'endpoints': ['/api/system/lock', '/api/system/shutdown', '/api/system/restart', '/api/system/sleep', '/api/system/info'],
-                'description': '系统控制'
-            },
-            'hotkey': {
-                'endpoints': ['/api/hotkey/alt_tab', '/api/hotkey/ctrl_c', '/api/hotkey/ctrl_v', '/api/hotkey/win_d', '/api/hotkey/custom'],
-                'description': '快捷键控制'
-            }
+            'note': 'GET请求使用查询参数，POST请求支持JSON和表单数据',
+            'input_commands': '键盘类命令（queued）默认排队后立即返回 202 和 command_id，传 wait=true 等待执行结果；'
+                              '排队超过 max_age_ms（默认 2000）仍未执行的命令被丢弃（status: dropped, 429）',
+            'admission': '按客户端和通道（lane）限流，超过速率或同时执行数上限时返回 429 和 Retry-After，见 /api/input/stats'
         },
+        'categories': categories,
         'examples': {
             'simple_get': 'GET /api/volume/up',
             'get_with_params': 'GET /api/volume/up?steps=3',
             'post_json': 'POST /api/volume/up {"steps": 3}',
-            'post_form': 'POST /api/volume/up (form: steps=3)'
+            'post_form': 'POST /api/volume/up (form: steps=3)',
+            'wait_for_result': 'GET /api/volume/up?steps=3&wait=true'
         }
-    })
+    }
+
+@app.route('/api/info', methods=['GET'])
+def api_info():
+    """获取 API 信息（由命令注册表生成并缓存，支持 ETag / If-None-Match）"""
+    body, etag = registry.document(build_api_info)
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
 
 # =================== 根路径 ===================
 @app.route('/')
@@ -475,10 +984,26 @@ def index():
     })
 
 if __name__ == '__main__':
-    print("🖥️  Windows 系统控制服务器启动中...")
-    print("📡 API 信息: http://localhost:8090/api/info")
-    print("🧪 测试端点: http://localhost:8090/api/test")
-    print("🔊 音量控制: http://localhost:8090/api/volume/up")
-    print("💡 支持 GET 和 POST 请求")
-    print("🔍 调试模式已开启，将显示详细日志")
-    app.run(host='0.0.0.0', port=8090, debug=True)
+    args = parse_args()
+    configure_logging(args.log_level, args.log_file, int(args.log_max_mb * 1024 * 1024), args.log_backups)
+    logger.info("🖥️  Windows 系统控制服务器启动中...")
+    logger.info(f"📡 API 信息: http://localhost:{args.port}/api/info")
+    logger.info(f"🧪 测试端点: http://localhost:{args.port}/api/test")
+    logger.info(f"🔊 音量控制: http://localhost:{args.port}/api/volume/up")
+    logger.info(f"🧩 控制器后端: {system_controller.backend.name}")
+    # 调试模式下重载器的父进程只监视文件变化，后台服务只在实际处理请求的子进程中启动
+    if not args.debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        macro_store.start_watching()
+        system_controller.metrics_sampler.start()
+        system_controller.app_index.start()
+        command_channel.host, command_channel.port = args.host, args.ws_port
+        if args.ws and command_channel.start():
+            advertise_websocket()
+            logger.info(f"🔌 WebSocket 通道: ws://localhost:{command_channel.port}")
+        if udp_listener and udp_listener.start():
+            logger.info(f"📨 UDP 通道: udp://localhost:{udp_listener.port}")
+    logger.info("💡 支持 GET 和 POST 请求")
+    try:
+        serve(app, args)
+    finally:
+        key_holds.shutdown()
@@ -0,0 +1,118 @@
+import argparse
+import logging
+import os
+from typing import List, Optional
+
+from werkzeug.serving import ThreadedWSGIServer, WSGIRequestHandler
+
+SERVERS = ('auto', 'waitress', 'werkzeug')
+
+logger = logging.getLogger('Serving')
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """命令行参数，默认值可以用 REMOTE_PC_* 环境变量覆盖"""
+    env = os.environ.get
+    parser = argparse.ArgumentParser(description='RemotePCController 服务器')
+    parser.add_argument('--host', default=env('REMOTE_PC_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(env('REMOTE_PC_PORT', 8090)))
+    parser.add_argument('--server', choices=SERVERS, default=env('REMOTE_PC_SERVER', 'auto'),
+                        help='auto: 安装了 waitress 时用 waitress，否则用多线程 werkzeug')
+    parser.add_argument('--threads', type=int, default=int(env('REMOTE_PC_THREADS', 8)),
+                        help='工作线程数（waitress）；每个屏幕推流会占用一个线程')
+    parser.add_argument('--keep-alive', type=float, default=float(env('REMOTE_PC_KEEP_ALIVE', 5)),
+                        help='空闲的持久连接保留秒数，0 表示每个响应后关闭连接（waitress）')
+    parser.add_argument('--timeout', type=float, default=float(env('REMOTE_PC_REQUEST_TIMEOUT', 30)),
+                        help='读取请求 / 发送响应时客户端无响应的超时秒数')
+    parser.add_argument('--log-level', default=env('REMOTE_PC_LOG_LEVEL', 'INFO'),
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], type=str.upper,
+                        help='INFO 时每个请求输出一行，WARNING 时只输出失败的请求')
+    parser.add_argument('--log-file', default=env('REMOTE_PC_LOG_FILE') or None,
+                        help='日志文件（JSON 行，按大小轮转）；默认只输出到控制台')
+    parser.add_argument('--log-max-mb', type=float, default=float(env('REMOTE_PC_LOG_MAX_MB', 10)),
+                        help='单个日志文件的大小上限 (MB)')
+    parser.add_argument('--log-backups', type=int, default=int(env('REMOTE_PC_LOG_BACKUPS', 5)),
+                        help='保留的轮转日志文件数')
+    parser.add_argument('--ws', action='store_true',
+                        default=env('REMOTE_PC_WS', '').lower() in ['true', '1', 'yes'],
+                        help='开启 WebSocket 命令通道（没有认证，只在可信网络中使用）')
+    parser.add_argument('--ws-port', type=int, default=int(env('REMOTE_PC_WS_PORT', 8091)),
+                        help='WebSocket 命令通道端口，与 --host 绑定在同一地址')
+    parser.add_argument('--debug', action='store_true',
+                        default=env('REMOTE_PC_DEBUG', '').lower() in ['true', '1', 'yes'],
+                        help='使用 Flask 开发服务器（自动重载 + 调试器），只用于开发')
+    args = parser.parse_args(argv)
+    if args.threads < 1:
+        parser.error('--threads 必须大于 0')
+    if args.keep_alive < 0 or args.timeout <= 0:
+        parser.error('--keep-alive 不能为负数，--timeout 必须大于 0')
+    return args
+
+
+def resolve_server(name: str) -> str:
+    """auto 时按是否安装 waitress 选择；指定 waitress 但未安装时抛出 RuntimeError"""
+    if name == 'werkzeug':
+        return name
+    try:
+        import waitress  # noqa: F401
+    except ImportError:
+        if name == 'waitress':
+            raise RuntimeError('未安装 waitress: pip install waitress')
+        return 'werkzeug'
+    return 'waitress'
+
+
+def connection_close(app):
+    """关闭 keep-alive 时让服务器在每个响应后断开连接"""
+    def wrapped(environ, start_response):
+        def start(status, headers, exc_info=None):
+            return start_response(status, headers + [('Connection', 'close')], exc_info)
+        return app(environ, start)
+    return wrapped
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """只记录错误请求的处理器；timeout 是读写客户端的 socket 超时"""
+
+    timeout = 30.0
+
+    def log_request(self, code='-', size='-'):
+        # 访问日志在生产模式下太吵
+        if str(code).startswith(('4', '5')):
+            super().log_request(code, size)
+
+
+def serve(app, args: argparse.Namespace) -> None:
+    """按参数启动服务器并阻塞"""
+    if args.debug:
+        logger.info('🔍 调试模式: Flask 开发服务器，带自动重载和调试器，不要在生产环境使用')
+        app.run(host=args.host, port=args.port, debug=True)
+        return
+
+    server = resolve_server(args.server)
+    if server == 'waitress':
+        from waitress import serve as waitress_serve
+        # waitress 只有一个连接无活动超时，取两者中较大的
+        channel_timeout = max(args.keep_alive, args.timeout)
+        logger.info(f'🚀 waitress: {args.host}:{args.port}, {args.threads} 线程, 连接超时 {channel_timeout}s')
+        waitress_serve(
+            app if args.keep_alive > 0 else connection_close(app),
+            host=args.host,
+            port=args.port,
+            threads=args.threads,
+            channel_timeout=channel_timeout,
+            cleanup_interval=min(30.0, channel_timeout),
+            ident='RemotePCController',
+        )
+        return
+
+    handler = type('Handler', (QuietRequestHandler,), {'timeout': args.timeout})
+    httpd = ThreadedWSGIServer(args.host, args.port, app, handler=handler)
+    # werkzeug 每个连接一个线程，没有线程池，--threads 不生效。多线程服务器的处理器使用 HTTP/1.1（无长度时分块传输），
+    # 但 werkzeug 在每个响应里都加 Connection: close，连接不会复用，--keep-alive 也不生效
+    logger.info(f'🚀 werkzeug (多线程): {args.host}:{args.port}, 超时 {args.timeout}s；'
+                f'安装 waitress 可获得线程池、keep-alive 和更好的吞吐: pip install waitress')
+    try:
+        httpd.serve_forever()
+    finally:
+        httpd.server_close()
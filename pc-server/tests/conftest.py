@@ -0,0 +1,7 @@
+import os
+import sys
+
+# 服务端模块都在 pc-server 根目录下，以脚本方式互相导入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('REMOTE_PC_BACKEND', 'simulated')
+os.environ.setdefault('REMOTE_PC_APP_INDEX', '')
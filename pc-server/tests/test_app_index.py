@@ -0,0 +1,48 @@
+"""应用索引：存在性探测的缓存不会长时间把新安装的程序当成不存在"""
+import os
+import time
+
+import pytest
+
+from app_index import AppIndex
+
+
+@pytest.fixture
+def start_menu(tmp_path):
+    folder = tmp_path / 'Start Menu'
+    folder.mkdir()
+    return folder
+
+
+def test_refresh_clears_cached_misses(start_menu):
+    index = AppIndex(None, [('start_menu', str(start_menu), True)], miss_ttl=3600)
+    index.refresh()
+    shortcut = start_menu / 'Tool.lnk'
+    assert not index.resolve(str(shortcut))
+
+    shortcut.write_bytes(b'')
+    # 目录 mtime 变化，刷新后新快捷方式进入索引，之前缓存的不存在被清除
+    os.utime(start_menu, (time.time() + 5, time.time() + 5))
+    index.refresh()
+    assert index.stats()['resolved_cache'] == 0
+    assert index.resolve(str(shortcut))
+
+
+def test_misses_expire_quickly(tmp_path):
+    probes = []
+
+    def exists(path):
+        probes.append(path)
+        return os.path.exists(path)
+
+    index = AppIndex(None, [], exists=exists, resolve_ttl=3600, miss_ttl=0.05)
+    program = tmp_path / 'tool.exe'
+    assert not index.resolve(str(program))
+    assert not index.resolve(str(program))
+    assert len(probes) == 1
+
+    program.write_bytes(b'')
+    time.sleep(0.06)
+    assert index.resolve(str(program))
+    # 存在的结果按 resolve_ttl 缓存
+    assert index.resolve(str(program)) and len(probes) == 2
@@ -0,0 +1,64 @@
+"""已运行则切换：可执行文件到窗口的映射（模拟后端）"""
+import pytest
+
+from app_locator import AppLocator
+from controller_backends import SimulatedBackend
+from process_table import ProcessTable
+from window_index import WindowIndex
+
+TOOL = 'C:\\Tools\\tool.exe'
+SW_MINIMIZE = 6
+
+
+@pytest.fixture
+def backend():
+    return SimulatedBackend()
+
+
+@pytest.fixture
+def table(backend):
+    table = ProcessTable(backend, ttl=3600)
+    table.start()
+    return table
+
+
+@pytest.fixture
+def locator(backend, table):
+    index = WindowIndex(backend, ttl=3600)
+    index.start()
+    return AppLocator(table, index)
+
+
+@pytest.fixture
+def pid(backend, table):
+    pid = backend.add_process('tool.exe', executable=TOOL)
+    table.refresh()
+    return pid
+
+
+def test_hidden_and_untitled_windows_are_ignored(backend, locator, pid):
+    backend.add_window('Tooltip', 'tooltips_class32', pid=pid, visible=False)
+    backend.add_window('', 'SimWindow', pid=pid)
+    # 只有辅助窗口时返回 None，由调用方启动新实例
+    assert locator.find_window(TOOL) is None
+
+    hwnd = backend.add_window('Tool', pid=pid)
+    backend.show_window(hwnd, SW_MINIMIZE)
+    # 最小化的窗口仍然可以切换过去
+    assert locator.find_window(TOOL).hwnd == hwnd
+
+
+def test_map_rebuilds_only_on_identity_changes(backend, table, locator, pid):
+    hwnd = backend.add_window('Tool', pid=pid)
+    assert locator.find_window(TOOL).hwnd == hwnd
+    rebuilds = locator.stats()['rebuilds']
+
+    backend.set_window_title(hwnd, 'Tool - untitled')
+    backend.processes[pid].memory_usage += 64 * 1024 * 1024
+    table.refresh()
+    assert locator.find_window(TOOL).title == 'Tool - untitled'
+    assert locator.stats()['rebuilds'] == rebuilds
+
+    other = backend.add_window('Tool 2', pid=pid)
+    assert locator.find_window(TOOL).hwnd == other
+    assert locator.stats()['rebuilds'] == rebuilds + 1
@@ -0,0 +1,74 @@
+"""音量/亮度步进合并：窗口内折叠、相反方向抵消、窗口结束后注入"""
+import threading
+import time
+
+import pytest
+
+from input_coalescer import StepCoalescer
+from input_dispatcher import InputDispatcher
+
+WINDOW = 0.05
+
+
+@pytest.fixture
+def injected():
+    return []
+
+
+@pytest.fixture
+def coalescer(injected):
+    coalescer = StepCoalescer(InputDispatcher(), window=WINDOW, max_steps=10)
+    coalescer.register('volume', lambda steps: injected.append(steps) or {'success': True},
+                       lambda steps: injected.append(-steps) or {'success': True})
+    return coalescer
+
+
+def test_requests_in_window_fold_into_one_batch(coalescer, injected):
+    first = coalescer.submit('volume', 1)
+    second = coalescer.submit('volume', 2)
+    result = coalescer.submit('volume', 1, wait=True)
+
+    assert not first['coalesced'] and second['coalesced']
+    assert first['batch_id'] == second['batch_id'] == result['batch_id']
+    assert result['net_steps'] == 4 and result['requests_merged'] == 3
+    assert injected == [4]
+    assert coalescer.stats()['folded'] == 2
+
+
+def test_opposite_steps_cancel_out(coalescer, injected):
+    coalescer.submit('volume', 3)
+    result = coalescer.submit('volume', -3, wait=True)
+
+    assert result['success'] and result['net_steps'] == 0
+    assert injected == []
+    stats = coalescer.stats()
+    assert stats['noop_batches'] == 1 and stats['steps_cancelled'] == 6
+
+
+def test_flushes_after_window(coalescer, injected):
+    start = time.perf_counter()
+    batch_id = coalescer.submit('volume', -2)['batch_id']
+    # 窗口结束前还没有注入，批次可以查询但还没有 command_id
+    assert injected == [] and coalescer.get_batch(batch_id)['command_id'] is None
+
+    result = coalescer.submit('volume', -1, wait=True)
+    assert time.perf_counter() - start >= WINDOW
+    assert injected == [-3]
+    batch = coalescer.get_batch(batch_id)
+    assert batch['state'] == 'done' and batch['command_id'] is not None
+    assert coalescer.dispatcher.get_command(batch['command_id'])['status'] == 'done'
+
+    # 上一个批次已经执行，新的请求开启新批次
+    assert coalescer.submit('volume', 1, wait=True)['batch_id'] != batch_id
+
+
+def test_steps_are_bounded(coalescer, injected):
+    assert coalescer.submit('volume', 11)['status'] == 'rejected'
+    threads = [threading.Thread(target=coalescer.submit, args=('volume', 10)) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    result = coalescer.submit('volume', 0, wait=True)
+    assert result['net_steps'] == 10 and injected == [10]
+    assert coalescer.stats()['steps_clamped'] == 20
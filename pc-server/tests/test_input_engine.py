@@ -0,0 +1,68 @@
+"""输入引擎与控制器按键序列：用记录型引擎断言注入的精确事件顺序"""
+import pytest
+
+from controller_backends import SimulatedBackend
+from input_engine import InputSequence, KeyEvent, RecordingInputEngine, parse_key_combo
+from windows_controller import SystemKey, WindowsSystemController
+
+CTRL, SHIFT, ESC, C = 0x11, 0x10, 0x1B, 0x43
+
+
+def down(key: int) -> KeyEvent:
+    return KeyEvent(key)
+
+
+def up(key: int) -> KeyEvent:
+    return KeyEvent(key, key_up=True)
+
+
+@pytest.fixture
+def controller():
+    backend = SimulatedBackend()
+    return WindowsSystemController(backend, backend.input_engine)
+
+
+def test_combo_presses_in_order_and_releases_in_reverse(controller):
+    result = controller.send_key_combination(parse_key_combo('ctrl+shift+esc'))
+
+    assert result['success']
+    assert controller.input_engine.recorded() == [down(CTRL), down(SHIFT), down(ESC), up(ESC), up(SHIFT), up(CTRL)]
+    # 没有按住时间时整组合键在同一批内提交
+    assert controller.input_engine.batches == 1
+
+
+def test_combo_hold_splits_press_and_release_batches(controller):
+    controller.send_key_combination([CTRL, C], hold=0.01)
+
+    engine = controller.input_engine
+    assert engine.recorded() == [down(CTRL), down(C), up(C), up(CTRL)]
+    assert engine.batches == 2
+    (press_at, _), _, (release_at, _), _ = engine.events
+    assert release_at - press_at >= 0.01
+
+
+@pytest.mark.parametrize('action, key', [('up', SystemKey.VOLUME_UP.value), ('down', SystemKey.VOLUME_DOWN.value)])
+def test_volume_steps_tap_once_per_step(controller, action, key):
+    result = getattr(controller, f'volume_{action}')(3)
+
+    assert result['success'] and result['steps'] == 3
+    assert controller.input_engine.recorded() == [down(key), up(key)] * 3
+    assert controller.input_engine.batches == 1
+
+
+def test_text_uses_unicode_events():
+    engine = RecordingInputEngine()
+    engine.send(InputSequence().text('a中'))
+
+    assert engine.recorded() == [
+        KeyEvent(ord('a'), unicode=True), KeyEvent(ord('a'), key_up=True, unicode=True),
+        KeyEvent(ord('中'), unicode=True), KeyEvent(ord('中'), key_up=True, unicode=True),
+    ]
+
+
+def test_recording_engine_can_skip_pauses():
+    engine = RecordingInputEngine(honor_pauses=False)
+    engine.send(InputSequence().press(CTRL).pause(5).release(CTRL))
+
+    assert engine.recorded() == [down(CTRL), up(CTRL)]
+    assert engine.last_duration < 1
@@ -0,0 +1,34 @@
+"""按住模式：按下与释放在派发队列积压时不会被丢弃（模拟后端）"""
+import threading
+
+import pytest
+
+from controller_backends import SimulatedBackend
+from input_dispatcher import InputDispatcher
+from input_engine import KeyEvent
+from key_hold import KeyHoldManager
+from windows_controller import WindowsSystemController
+
+RIGHT = 0x27
+
+
+@pytest.fixture
+def controller():
+    backend = SimulatedBackend()
+    return WindowsSystemController(backend, backend.input_engine)
+
+
+def test_press_survives_queue_backlog(controller):
+    # 普通命令排队 50ms 就过期
+    dispatcher = InputDispatcher(max_age=0.05)
+    holds = KeyHoldManager(controller, dispatcher)
+    busy = threading.Event()
+    dispatcher.submit('busy', lambda: busy.wait(1) and {'success': True})
+
+    assert holds.press([RIGHT], repeat=False)['success']
+    threading.Timer(0.2, busy.set).start()
+    holds.release(keys=[RIGHT])
+    dispatcher.submit('sync', lambda: {'success': True}, wait=True, max_age=float('inf'))
+
+    assert controller.input_engine.recorded() == [KeyEvent(RIGHT), KeyEvent(RIGHT, key_up=True)]
+    assert dispatcher.stats()['dropped'] == 0
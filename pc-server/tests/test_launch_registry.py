@@ -0,0 +1,22 @@
+"""启动参数分词：Windows 路径中的反斜杠和单引号原样保留"""
+import pytest
+
+from launch_registry import split_args
+
+
+def test_quoted_windows_paths():
+    assert split_args('--open "C:\\Program Files\\App\\a b.txt" /x') == \
+        ['--open', 'C:\\Program Files\\App\\a b.txt', '/x']
+
+
+def test_apostrophes_are_literal():
+    assert split_args("C:\\Users\\O'Brien\\file.txt") == ["C:\\Users\\O'Brien\\file.txt"]
+    assert split_args("\"C:\\Users\\O'Brien\\my file.txt\" it's") == \
+        ["C:\\Users\\O'Brien\\my file.txt", "it's"]
+
+
+def test_lists_pass_through_and_unclosed_quote_fails():
+    assert split_args(['a b', 1]) == ['a b', '1']
+    assert split_args('') == []
+    with pytest.raises(ValueError, match='参数格式错误'):
+        split_args('"unterminated')
@@ -0,0 +1,95 @@
+"""服务端宏：宏之间的调用检查与等待超时（模拟后端）"""
+import json
+import threading
+
+import pytest
+
+from controller_backends import SimulatedBackend
+from input_dispatcher import InputDispatcher
+from input_engine import KeyEvent
+from macro_store import MacroStore
+from windows_controller import WindowsSystemController
+
+A, B = 0x41, 0x42
+
+
+def call(macro_id: str) -> dict:
+    return {'command': {'category': 'macro', 'action': macro_id}}
+
+
+@pytest.fixture
+def controller():
+    backend = SimulatedBackend()
+    return WindowsSystemController(backend, backend.input_engine)
+
+
+@pytest.fixture
+def store(tmp_path, controller):
+    def executor(category, action, params):
+        if category == 'macro':
+            result = store.run(action, wait=True)
+            return result, 200 if result['success'] else 400
+        return {'success': True, 'message': 'ok'}, 200
+
+    store = MacroStore(str(tmp_path / 'macros.json'), controller, InputDispatcher(), executor, step_timeout=0.1)
+    return store
+
+
+def test_self_call_is_rejected(store):
+    with pytest.raises(ValueError, match='循环引用'):
+        store.register('loop', {'steps': [call('loop')]})
+    assert store.get('loop') is None
+
+
+def test_mutual_calls_are_rejected(store):
+    store.register('ping', {'steps': [{'keys': 'a'}]})
+    store.register('pong', {'steps': [call('ping')]})
+    with pytest.raises(ValueError, match='循环引用'):
+        store.register('ping', {'steps': [call('pong')]})
+    # 被拒绝的定义没有覆盖原来的宏
+    assert store.run('pong')['success']
+
+
+def test_unknown_macro_is_rejected(store):
+    with pytest.raises(ValueError, match='不存在的宏: missing'):
+        store.register('caller', {'steps': [call('missing')]})
+
+
+def test_called_macro_cannot_be_removed(store):
+    store.register('inner', {'steps': [{'keys': 'a'}]})
+    store.register('outer', {'steps': [call('inner'), {'keys': 'b'}]})
+    with pytest.raises(ValueError, match='outer'):
+        store.remove('inner')
+    assert store.remove('outer') and store.remove('inner')
+
+
+def test_load_skips_invalid_calls(store):
+    with open(store.path, 'w', encoding='utf-8') as f:
+        json.dump({'macros': {
+            'loop': {'steps': [call('loop')]},
+            'a': {'steps': [call('b')]},
+            'b': {'steps': [call('a')]},
+            'dangling': {'steps': [call('missing')]},
+            'uses_dangling': {'steps': [call('dangling')]},
+            'inner': {'steps': [{'keys': 'a'}]},
+            'outer': {'steps': [call('inner')]},
+        }}, f)
+    assert store.load() == 2
+    assert sorted(m['id'] for m in store.list()) == ['inner', 'outer']
+
+
+def test_wait_timeout_stops_macro_as_pending(store, controller):
+    store.register('typing', {'steps': [{'keys': 'a'}, {'command': {'category': 'window', 'action': 'minimize'}},
+                                        {'keys': 'b'}]})
+    busy = threading.Event()
+    store.dispatcher.submit('busy', lambda: busy.wait(1) and {'success': True})
+
+    result = store.run('typing')
+    assert not result['success']
+    assert [step.get('pending', False) for step in result['steps']] == [True]
+    assert result['steps'][0]['command_id']
+
+    busy.set()
+    store.dispatcher.submit('sync', lambda: {'success': True}, wait=True)
+    # 排队的步骤执行的是它自己的序列，后面的步骤没有执行
+    assert controller.input_engine.recorded() == [KeyEvent(A), KeyEvent(A, key_up=True)]
@@ -0,0 +1,105 @@
+"""批量结束进程：pid 复用与实时查询（模拟后端）"""
+import pytest
+
+from controller_backends import ProcessInfo, SimulatedBackend
+from process_killer import ProcessKiller
+from process_table import ProcessTable
+from window_index import WindowIndex
+
+
+@pytest.fixture
+def backend():
+    return SimulatedBackend()
+
+
+@pytest.fixture
+def killer(backend):
+    # 生成快照后后台线程一小时内不会再刷新，快照之后的变化只能通过实时查询看到
+    table = ProcessTable(backend, ttl=3600)
+    table.start()
+    return ProcessKiller(backend, table, max_workers=4)
+
+
+def pid_of(backend, name: str) -> int:
+    return next(p.pid for p in backend.processes.values() if p.name == name)
+
+
+def terminated(backend) -> list:
+    return [details['pid'] for _, action, details in backend.actions if action == 'terminate']
+
+
+def test_kill_by_name(backend, killer):
+    pid = pid_of(backend, 'Spotify.exe')
+    result = killer.kill(names=['spotify.exe'])
+    assert [(r['pid'], r['outcome']) for r in result['results']] == [(pid, 'killed')]
+    assert pid not in backend.processes
+
+
+def test_reused_pid_is_not_killed(backend, killer):
+    pid = pid_of(backend, 'Spotify.exe')
+    # 快照之后 Spotify 退出，同一个 pid 被另一个进程复用
+    backend.processes[pid] = ProcessInfo(pid, 'notepad.exe', 'C:\\Windows\\notepad.exe', 0, 1.0)
+
+    result = killer.kill(names=['Spotify.exe'])
+    assert [r['outcome'] for r in result['results']] == ['gone']
+    assert 'notepad.exe' in result['results'][0]['message']
+    assert pid in backend.processes and terminated(backend) == []
+
+
+def test_reused_pid_with_same_name_is_not_killed(backend, killer):
+    pid = pid_of(backend, 'chrome.exe')
+    old = backend.processes[pid]
+    backend.processes[pid] = ProcessInfo(pid, old.name, old.executable, 0, old.create_time + 5)
+
+    result = killer.kill(names=['chrome.exe'])
+    assert [r['outcome'] for r in result['results']] == ['gone']
+    assert terminated(backend) == []
+
+
+def test_pid_reused_during_grace_period(backend, killer):
+    pid = pid_of(backend, 'Spotify.exe')
+    backend.hung_pids.add(pid)
+    original = backend.wait_process
+
+    def wait_and_reuse(target, timeout):
+        if target == pid and backend.processes[pid].name == 'Spotify.exe':
+            backend.processes[pid] = ProcessInfo(pid, 'notepad.exe', '', 0, 1.0)
+            return False
+        return original(target, timeout)
+
+    backend.wait_process = wait_and_reuse
+    result = killer.kill(names=['Spotify.exe'], grace=0.05)
+    assert [r['outcome'] for r in result['results']] == ['gone']
+    assert terminated(backend) == []
+
+
+def test_explicit_pids_are_looked_up_live(backend, killer):
+    # 快照之后才启动的进程
+    pid = backend.add_process('notepad.exe')
+    result = killer.kill(pids=[pid, 99999])
+    outcomes = {r['pid']: (r['name'], r['outcome']) for r in result['results']}
+    assert outcomes == {pid: ('notepad.exe', 'killed'), 99999: ('', 'gone')}
+    assert killer.stats()['gone'] == 1 and killer.stats()['killed'] == 1
+
+
+def test_reserved_pids_are_skipped(killer):
+    result = killer.kill(pids=[0, 4])
+    assert [r['outcome'] for r in result['results']] == ['skipped', 'skipped']
+
+
+def test_grace_uses_one_window_map_per_call(backend):
+    table = ProcessTable(backend, ttl=3600)
+    table.start()
+    index = WindowIndex(backend)
+    index.start()
+    killer = ProcessKiller(backend, table, index, max_workers=4)
+    pids = [pid_of(backend, 'Spotify.exe'), pid_of(backend, 'Code.exe')]
+
+    enumerations = []
+    original = backend.enumerate_windows
+    backend.enumerate_windows = lambda: enumerations.append(1) or original()
+
+    result = killer.kill(pids=pids, grace=1.0)
+    assert {r['pid']: r['outcome'] for r in result['results']} == {pid: 'closed' for pid in pids}
+    assert enumerations == []
+    assert all(window.pid not in pids for window in backend.windows.values())
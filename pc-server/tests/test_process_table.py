@@ -0,0 +1,111 @@
+"""进程表的版本号与增量同步（模拟后端）"""
+import pytest
+
+from controller_backends import SimulatedBackend
+from process_table import ProcessTable
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def backend():
+    return SimulatedBackend()
+
+
+@pytest.fixture
+def table(backend):
+    table = ProcessTable(backend, ttl=3600, history_size=4)
+    table.refresh()
+    return table
+
+
+def apply(full: dict, delta: dict) -> dict:
+    """把增量应用到客户端持有的 {pid: 进程} 上"""
+    if delta['full']:
+        return {p['pid']: p for p in delta['processes']}
+    state = dict(full)
+    for pid in delta['removed']:
+        state.pop(pid)
+    for process in delta['added'] + delta['changed']:
+        state[process['pid']] = process
+    return state
+
+
+def full_state(table: ProcessTable) -> dict:
+    return apply({}, table.delta(0))
+
+
+def test_unchanged_refresh_keeps_version(table):
+    version = table.version
+    table.refresh()
+    assert table.version == version
+    assert table.delta(version) == {'version': version, 'full': False, 'added': [], 'removed': [], 'changed': []}
+
+
+def test_delta_reports_added_removed_and_changed(backend, table):
+    base = table.version
+    client = full_state(table)
+    chrome = next(p.pid for p in backend.processes.values() if p.name == 'chrome.exe')
+    spotify = next(p.pid for p in backend.processes.values() if p.name == 'Spotify.exe')
+
+    new_pid = backend.add_process('notepad.exe', 4 * MB)
+    backend.exit_process(spotify)
+    backend.processes[chrome].memory_usage += 10 * MB
+    table.refresh()
+
+    delta = table.delta(base)
+    assert delta['version'] == base + 1 and not delta['full']
+    assert [p['pid'] for p in delta['added']] == [new_pid]
+    assert delta['removed'] == [spotify]
+    assert [p['pid'] for p in delta['changed']] == [chrome]
+    assert apply(client, delta) == full_state(table)
+
+
+def test_small_memory_change_is_not_a_change(backend, table):
+    base = table.version
+    pid = next(iter(backend.processes))
+    backend.processes[pid].memory_usage += MB // 2
+    table.refresh()
+    assert table.version == base
+
+
+def test_deltas_fold_across_versions(backend, table):
+    base = table.version
+    client = full_state(table)
+
+    short_lived = backend.add_process('short.exe')
+    table.refresh()
+    backend.exit_process(short_lived)
+    kept = backend.add_process('kept.exe')
+    table.refresh()
+
+    delta = table.delta(base)
+    assert delta['version'] == base + 2
+    # 先增后删的进程不出现在合并后的增量里
+    assert [p['pid'] for p in delta['added']] == [kept]
+    assert delta['removed'] == [] and delta['changed'] == []
+    assert apply(client, delta) == full_state(table)
+
+
+def test_old_or_future_version_gets_full_resync(backend, table):
+    base = table.version
+    for i in range(6):
+        backend.add_process(f'p{i}.exe')
+        table.refresh()
+
+    stale = table.delta(base)
+    assert stale['full'] and len(stale['processes']) == len(backend.processes)
+    assert table.delta(table.version + 10)['full']
+    assert not table.delta(table.version - 1)['full']
+
+
+def test_query_counts_only_matching_processes(backend, table):
+    for _ in range(3):
+        backend.add_process('worker.exe', MB)
+    table.refresh()
+
+    first = table.query('WORKER', limit=2)
+    assert first['total_count'] == 3 and len(first['processes']) == 2
+    second = table.query('worker', limit=2, cursor=first['next_cursor'])
+    assert second['total_count'] == 3 and len(second['processes']) == 1 and second['next_cursor'] is None
+    assert table.query()['total_count'] == len(backend.processes)
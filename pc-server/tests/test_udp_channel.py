@@ -0,0 +1,133 @@
+"""UDP 通道的签名、序列号和时间窗口防重放"""
+import socket
+
+import pytest
+
+import udp_channel
+from udp_channel import (ACK_DROPPED, ACK_OK, COMMAND_CODES, PACKET_SIZE, UdpCommandListener, decode_ack,
+                         decode_packet, encode_packet)
+
+KEY = b'test-key'
+NOW = 1_700_000_000.0
+NEXT = COMMAND_CODES[('media', 'next')]
+
+
+class Clock:
+    def __init__(self):
+        self.now = NOW
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def listener(clock):
+    executed = []
+
+    def executor(category, action, params, client=None):
+        executed.append((category, action, params['steps'], client))
+        return {'success': True}, 202
+
+    listener = UdpCommandListener(executor, KEY, window=10.0, clock=clock)
+    listener.executed = executed
+    return listener
+
+
+def packet(seq, sender=7, at=NOW, ack=True, key=KEY):
+    return encode_packet(key, NEXT, seq, ack=ack, sender=sender, timestamp_ms=int(at * 1000))
+
+
+def status(reply):
+    return decode_ack(reply)[0]
+
+
+def test_round_trip_and_signature():
+    data = packet(5, sender=0xDEADBEEF)
+    assert len(data) == PACKET_SIZE
+    assert decode_packet(KEY, data) == (udp_channel.FLAG_ACK, NEXT, 1, 0xDEADBEEF, 5, int(NOW * 1000))
+    assert decode_packet(b'other', data) is None
+    # 篡改时间戳或发送方后签名失效
+    tampered = bytearray(data)
+    tampered[udp_channel.HEADER.size - 1] ^= 1
+    assert decode_packet(KEY, bytes(tampered)) is None
+
+
+def test_duplicate_is_dropped_from_any_address(listener):
+    data = packet(100)
+    assert status(listener.handle_packet(data, ('10.0.0.1', 5000))) == ACK_OK
+    assert status(listener.handle_packet(data, ('10.0.0.1', 5000))) == ACK_DROPPED
+    assert status(listener.handle_packet(data, ('10.0.0.2', 6000))) == ACK_DROPPED
+    assert len(listener.executed) == 1
+    assert listener.stats()['duplicate'] == 2
+
+
+def test_replay_after_idle_is_dropped(listener, clock):
+    data = packet(100)
+    listener.handle_packet(data, ('10.0.0.1', 5000))
+    # 空闲很久后重放：时间戳已在窗口之外
+    clock.now += 3600
+    assert status(listener.handle_packet(data, ('10.0.0.3', 5000))) == ACK_DROPPED
+    assert listener.stats()['stale'] == 1
+    # 同一发送方的序列号不会因为空闲而重置
+    assert status(listener.handle_packet(packet(99, at=clock.now), ('10.0.0.1', 5000))) == ACK_DROPPED
+    assert status(listener.handle_packet(packet(101, at=clock.now), ('10.0.0.1', 5000))) == ACK_OK
+
+
+def test_sequence_order_and_wraparound(listener):
+    address = ('10.0.0.1', 5000)
+    assert status(listener.handle_packet(packet(0xFFFFFFFE), address)) == ACK_OK
+    assert status(listener.handle_packet(packet(0xFFFFFFFF), address)) == ACK_OK
+    assert status(listener.handle_packet(packet(1), address)) == ACK_OK
+    assert status(listener.handle_packet(packet(0), address)) == ACK_DROPPED
+
+
+def test_senders_are_tracked_independently(listener):
+    assert status(listener.handle_packet(packet(50, sender=1), ('10.0.0.1', 5000))) == ACK_OK
+    assert status(listener.handle_packet(packet(10, sender=2), ('10.0.0.1', 5000))) == ACK_OK
+    assert listener.stats()['senders'] == 2
+
+
+def test_future_timestamp_and_bad_signature_rejected(listener, clock):
+    assert status(listener.handle_packet(packet(1, at=NOW + 60), ('10.0.0.1', 5000))) == ACK_DROPPED
+    assert listener.handle_packet(packet(2, key=b'wrong'), ('10.0.0.1', 5000)) is None
+    assert listener.stats()['stale'] == 1 and listener.stats()['invalid'] == 1
+    assert listener.executed == []
+
+
+def test_no_ack_without_flag(listener):
+    assert listener.handle_packet(packet(1, ack=False), ('10.0.0.1', 5000)) is None
+    assert listener.executed == [('media', 'next', 1, '10.0.0.1')]
+
+
+def test_prune_only_forgets_senders_outside_window(listener, clock, monkeypatch):
+    monkeypatch.setattr(udp_channel, 'MAX_SENDERS', 2)
+    listener.handle_packet(packet(1, sender=1), ('10.0.0.1', 5000))
+    listener.handle_packet(packet(1, sender=2), ('10.0.0.1', 5000))
+    # 表满且都在窗口内：新发送方被拒绝
+    assert status(listener.handle_packet(packet(1, sender=3), ('10.0.0.1', 5000))) == ACK_DROPPED
+    assert listener.stats()['overflow'] == 1
+
+    clock.now += 11
+    assert status(listener.handle_packet(packet(1, sender=3, at=clock.now), ('10.0.0.1', 5000))) == ACK_OK
+    # 被清理的发送方的旧包仍然被时间窗口拒绝
+    assert status(listener.handle_packet(packet(1, sender=1), ('10.0.0.1', 5000))) == ACK_DROPPED
+
+
+def test_start_on_busy_port_returns_false(listener):
+    busy = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    busy.bind(('127.0.0.1', 0))
+    try:
+        listener.host, listener.port = '127.0.0.1', busy.getsockname()[1]
+        assert listener.start() is False
+        assert not listener.stats()['running']
+    finally:
+        busy.close()
+
+    # 端口释放后可以正常启动
+    assert listener.start()
+    listener.stop()
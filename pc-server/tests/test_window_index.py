@@ -0,0 +1,72 @@
+"""窗口索引由窗口事件增量维护（模拟后端）"""
+import pytest
+
+from controller_backends import SimulatedBackend
+from window_index import WindowIndex
+
+
+@pytest.fixture
+def backend():
+    return SimulatedBackend()
+
+
+@pytest.fixture
+def index(backend):
+    index = WindowIndex(backend, ttl=3600)
+    index.start()
+    return index
+
+
+def titles(index: WindowIndex):
+    return sorted(window['title'] for window in index.query()['windows'])
+
+
+def test_events_update_index_without_rebuild(backend, index):
+    assert index.live
+    version = index.version
+
+    hwnd = backend.add_window('Notepad', pid=1)
+    assert index.get(hwnd).title == 'Notepad'
+    backend.set_window_title(hwnd, '*Notepad')
+    assert index.get(hwnd).title == '*Notepad'
+    assert index.revision(hwnd) == index.version
+    backend.remove_window(hwnd)
+    assert index.get(hwnd) is None
+
+    assert index.version == version + 3
+    assert index.stats()['rebuilds'] == 1
+    assert index.stats()['windows'] == len(backend.windows)
+
+
+def test_query_reflects_incremental_changes(backend, index):
+    before = titles(index)
+    hwnd = backend.add_window('Calculator')
+    assert titles(index) == sorted(before + ['Calculator'])
+    assert index.query('calc')['windows'][0]['hwnd'] == hwnd
+    backend.remove_window(hwnd)
+    assert titles(index) == before
+
+
+def test_unknown_window_destroy_does_not_bump_version(backend, index):
+    version = index.version
+    backend._emit_window('destroyed', 0xDEAD)
+    assert index.version == version
+
+
+def test_listeners_see_events(backend, index):
+    events = []
+    index.add_listener(lambda event, hwnd, window: events.append((event, hwnd, window.title if window else None)))
+    hwnd = backend.add_window('Paint')
+    backend.set_window_title(hwnd, 'Paint - a.png')
+    backend.remove_window(hwnd)
+    assert events == [('created', hwnd, 'Paint'), ('changed', hwnd, 'Paint - a.png'), ('destroyed', hwnd, None)]
+
+
+def test_polling_fallback_rebuilds_after_ttl(backend, monkeypatch):
+    monkeypatch.setattr(backend, 'watch_windows', lambda callback: False)
+    index = WindowIndex(backend, ttl=0)
+    index.start()
+    assert not index.live
+    hwnd = backend.add_window('Late')
+    assert index.get(hwnd).title == 'Late'
+    assert index.stats()['rebuilds'] >= 2
@@ -0,0 +1,158 @@
+import hashlib
+import io
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+
+from screen_capture import BYTES_PER_PIXEL
+from window_index import WindowIndex
+
+MIN_THUMBNAIL_WIDTH = 32
+MAX_THUMBNAIL_WIDTH = 640
+
+
+def encode_png(pixels: bytes, width: int, height: int) -> bytes:
+    """把 BGRX 像素编码成 PNG（只用标准库，未安装 Pillow 时使用）"""
+    rgb = bytearray(width * height * 3)
+    rgb[0::3] = pixels[2::BYTES_PER_PIXEL]
+    rgb[1::3] = pixels[1::BYTES_PER_PIXEL]
+    rgb[2::3] = pixels[0::BYTES_PER_PIXEL]
+    row_bytes = width * 3
+    # 每行前加一个过滤类型字节 0
+    raw = b''.join(b'\x00' + rgb[y * row_bytes:(y + 1) * row_bytes] for y in range(height))
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack('!I', len(data)) + kind + data + struct.pack('!I', zlib.crc32(kind + data))
+
+    header = struct.pack('!IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(raw, 6)) + chunk(b'IEND', b'')
+
+
+def encode_thumbnail(pixels: bytes, width: int, height: int, quality: int = 75) -> Tuple[bytes, str]:
+    """编码缩略图，返回 (数据, Content-Type)；有 Pillow 时用 JPEG，否则用 PNG"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return encode_png(pixels, width, height), 'image/png'
+    image = Image.frombuffer('RGB', (width, height), bytes(pixels), 'raw', 'BGRX', 0, 1)
+    output = io.BytesIO()
+    image.save(output, 'JPEG', quality=quality)
+    return output.getvalue(), 'image/jpeg'
+
+
+@dataclass
+class Thumbnail:
+    """缓存的缩略图"""
+    hwnd: int
+    width: int
+    height: int
+    data: bytes
+    content_type: str
+    content_hash: str
+    revision: int
+    checked_at: float
+
+    @property
+    def etag(self) -> str:
+        return f'{self.hwnd:x}-{self.width}-{self.content_hash}'
+
+
+class ThumbnailCache:
+    """窗口缩略图 LRU 缓存 - 按 (hwnd, 宽度) 缓存编码结果，总字节数不超过 max_bytes
+
+    窗口没有收到变化事件且缓存未超过 ttl 时直接返回；否则重新截取窗口，
+    像素哈希与缓存一致时只刷新检查时间，不重新编码。
+    """
+
+    def __init__(self, capture: Callable[[int, int, int], Optional[bytearray]], window_index: WindowIndex,
+                 max_bytes: int = 8 * 1024 * 1024, ttl: float = 5.0):
+        self.capture = capture
+        self.window_index = window_index
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: 'OrderedDict[Tuple[int, int], Thumbnail]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'stale': 0, 'not_modified': 0, 'evictions': 0}
+
+    def get(self, hwnd: int, width: int = 320) -> Optional[Thumbnail]:
+        """获取窗口缩略图；窗口不存在或无法截取且没有缓存时返回 None，宽度无效时抛出 ValueError"""
+        if not MIN_THUMBNAIL_WIDTH <= width <= MAX_THUMBNAIL_WIDTH:
+            raise ValueError(f'width 必须在 {MIN_THUMBNAIL_WIDTH}-{MAX_THUMBNAIL_WIDTH} 之间')
+        window = self.window_index.get(hwnd)
+        if window is None:
+            self._discard(hwnd)
+            return None
+
+        key = (hwnd, width)
+        revision = self.window_index.revision(hwnd)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.revision == revision and now - entry.checked_at < self.ttl:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return entry
+
+        left, top, right, bottom = window.rect
+        window_width, window_height = right - left, bottom - top
+        height = round(width * window_height / window_width) if window_width > 0 and window_height > 0 else width * 9 // 16
+        height = min(max(height, 1), width * 4)
+        pixels = self.capture(hwnd, width, height)
+
+        if pixels is None:
+            # 最小化等无法截取的窗口返回最后一次的缩略图
+            with self._lock:
+                if entry is not None and key in self._entries:
+                    self._entries.move_to_end(key)
+                    self._stats['stale'] += 1
+            return entry
+
+        content_hash = hashlib.blake2b(pixels, digest_size=8).hexdigest()
+        with self._lock:
+            if entry is not None and entry.content_hash == content_hash and entry.height == height:
+                entry.revision = revision
+                entry.checked_at = now
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                self._stats['revalidated'] += 1
+                return entry
+
+        data, content_type = encode_thumbnail(pixels, width, height)
+        thumbnail = Thumbnail(hwnd, width, height, data, content_type, content_hash, revision, now)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous.data)
+            self._entries[key] = thumbnail
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.data)
+                self._stats['evictions'] += 1
+            self._stats['misses'] += 1
+        return thumbnail
+
+    def _discard(self, hwnd: int):
+        """丢弃已关闭窗口的缓存"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == hwnd]:
+                self._bytes -= len(self._entries.pop(key).data)
+
+    def record_not_modified(self):
+        with self._lock:
+            self._stats['not_modified'] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+        stats['max_bytes'] = self.max_bytes
+        lookups = stats['hits'] + stats['revalidated'] + stats['misses'] + stats['stale']
+        stats['hit_ratio'] = round((lookups - stats['misses']) / lookups, 3) if lookups else 0.0
+        return stats
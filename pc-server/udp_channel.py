@@ -0,0 +1,226 @@
+import hashlib
+import hmac
+import logging
+import socket
+import struct
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+# 数据报格式（大端）:
+#   magic(B) version(B) flags(B) command(B) steps(B) sender(I) seq(I) timestamp_ms(Q) | hmac(8 字节)
+# hmac = HMAC-SHA256(key, 前 21 字节)[:8]
+# sender 是客户端启动时随机生成的 id，timestamp_ms 是发送时的 unix 毫秒时间，都在签名范围内
+# 应答（仅在 flags 带 FLAG_ACK 时发送）: magic(B) version(B) flags(B) status(B) seq(I)
+MAGIC = 0x52
+VERSION = 2
+FLAG_ACK = 0x01
+FLAG_REPLY = 0x80
+HEADER = struct.Struct('!BBBBBIIQ')
+ACK = struct.Struct('!BBBBI')
+MAC_SIZE = 8
+PACKET_SIZE = HEADER.size + MAC_SIZE
+
+ACK_OK = 0
+ACK_FAILED = 1
+ACK_DROPPED = 2
+
+# 同时跟踪的发送方上限；只有最近 window 内发过包的发送方需要保留
+MAX_SENDERS = 4096
+
+# 命令码 -> (category, action)
+UDP_COMMANDS: Dict[int, Tuple[str, str]] = {
+    1: ('volume', 'up'),
+    2: ('volume', 'down'),
+    3: ('volume', 'mute'),
+    4: ('media', 'play'),
+    5: ('media', 'stop'),
+    6: ('media', 'next'),
+    7: ('media', 'previous'),
+    8: ('brightness', 'up'),
+    9: ('brightness', 'down'),
+}
+COMMAND_CODES = {value: code for code, value in UDP_COMMANDS.items()}
+
+
+def _mac(key: bytes, header: bytes) -> bytes:
+    return hmac.new(key, header, hashlib.sha256).digest()[:MAC_SIZE]
+
+
+def encode_packet(key: bytes, command: int, seq: int, steps: int = 1, ack: bool = False,
+                  sender: int = 0, timestamp_ms: Optional[int] = None) -> bytes:
+    """编码命令数据报；timestamp_ms 缺省为当前时间"""
+    if timestamp_ms is None:
+        timestamp_ms = int(time.time() * 1000)
+    header = HEADER.pack(MAGIC, VERSION, FLAG_ACK if ack else 0, command, steps,
+                         sender & 0xFFFFFFFF, seq & 0xFFFFFFFF, timestamp_ms)
+    return header + _mac(key, header)
+
+
+def decode_packet(key: bytes, packet: bytes) -> Optional[Tuple[int, int, int, int, int, int]]:
+    """解码并校验数据报，返回 (flags, command, steps, sender, seq, timestamp_ms)；格式或签名错误返回 None"""
+    if len(packet) != PACKET_SIZE:
+        return None
+    header, mac = packet[:HEADER.size], packet[HEADER.size:]
+    magic, version, flags, command, steps, sender, seq, timestamp_ms = HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION:
+        return None
+    if not hmac.compare_digest(mac, _mac(key, header)):
+        return None
+    return flags, command, steps, sender, seq, timestamp_ms
+
+
+def decode_ack(packet: bytes) -> Optional[Tuple[int, int]]:
+    """解码应答，返回 (status, seq)"""
+    if len(packet) != ACK.size:
+        return None
+    magic, version, flags, status, seq = ACK.unpack(packet)
+    if magic != MAGIC or version != VERSION or not flags & FLAG_REPLY:
+        return None
+    return status, seq
+
+
+class UdpCommandListener:
+    """UDP 命令监听器 - 面向媒体/音量键的即发即弃协议
+
+    防重放: 时间戳与服务器时间相差超过 window 秒的包直接丢弃；窗口内按发送方 id（不是来源地址）
+    维护最近接受的序列号，重复包和乱序的旧包丢弃。序列号不会因为空闲而重置，
+    客户端重启时生成新的发送方 id，并以当前毫秒时间作为起始序列号。
+    """
+
+    def __init__(self, executor: Callable[..., Tuple[dict, int]], key: bytes,
+                 host: str = '0.0.0.0', port: int = 8092, window: float = 10.0,
+                 clock: Callable[[], float] = time.time):
+        self.executor = executor
+        self.key = key
+        self.host = host
+        self.port = port
+        self.window = window
+        self._clock = clock
+        self._sock: Optional[socket.socket] = None
+        # 发送方 id -> (最近接受的序列号, 它的时间戳毫秒)
+        self._last_seq: Dict[int, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self._stats = {'received': 0, 'accepted': 0, 'invalid': 0, 'stale': 0, 'duplicate': 0, 'overflow': 0,
+                       'unknown': 0, 'failed': 0, 'limited': 0}
+        self._logger = logging.getLogger('UdpCommandListener')
+
+    def start(self) -> bool:
+        """绑定端口并在后台线程监听；端口无法绑定时返回 False"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.bind((self.host, self.port))
+        except OSError as e:
+            # 端口被占用等情况只影响这个通道，不能让 REST 服务起不来
+            sock.close()
+            self._logger.warning(f'UDP 通道启动失败 {self.host}:{self.port}: {e}')
+            return False
+        self._sock = sock
+        self.port = sock.getsockname()[1]
+        threading.Thread(target=self._run, name='udp-channel', daemon=True).start()
+        return True
+
+    def stop(self):
+        """关闭监听"""
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def stats(self) -> dict:
+        """监听器统计信息"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['senders'] = len(self._last_seq)
+        stats['port'] = self.port
+        stats['running'] = self._sock is not None
+        return stats
+
+    def handle_packet(self, packet: bytes, address: Tuple[str, int]) -> Optional[bytes]:
+        """处理一个数据报，需要应答时返回应答内容"""
+        with self._lock:
+            self._stats['received'] += 1
+
+        decoded = decode_packet(self.key, packet)
+        if decoded is None:
+            with self._lock:
+                self._stats['invalid'] += 1
+            return None
+        flags, command, steps, sender, seq, timestamp_ms = decoded
+
+        rejected = self._check_replay(sender, seq, timestamp_ms)
+        if rejected:
+            with self._lock:
+                self._stats[rejected] += 1
+            return self._ack(flags, ACK_DROPPED, seq)
+
+        if command not in UDP_COMMANDS:
+            with self._lock:
+                self._stats['unknown'] += 1
+            return self._ack(flags, ACK_FAILED, seq)
+
+        category, action = UDP_COMMANDS[command]
+        try:
+            result, status = self.executor(category, action, {'steps': max(steps, 1)}, client=address[0])
+            success = bool(result.get('success', False))
+        except Exception as e:
+            self._logger.error(f"UDP 命令执行失败 {category}/{action}: {e}")
+            status, success = 500, False
+
+        if status == 429:
+            # 被准入控制限流或排队过期丢弃
+            with self._lock:
+                self._stats['limited'] += 1
+            return self._ack(flags, ACK_DROPPED, seq)
+        with self._lock:
+            self._stats['accepted' if success else 'failed'] += 1
+        return self._ack(flags, ACK_OK if success else ACK_FAILED, seq)
+
+    def _check_replay(self, sender: int, seq: int, timestamp_ms: int) -> Optional[str]:
+        """防重放检查，接受时返回 None，否则返回拒绝原因 stale / duplicate / overflow（发送方太多）"""
+        now_ms = int(self._clock() * 1000)
+        window_ms = int(self.window * 1000)
+        if abs(now_ms - timestamp_ms) > window_ms:
+            return 'stale'
+        with self._lock:
+            last = self._last_seq.get(sender)
+            if last is not None:
+                # 只接受比上次更新的序列号（按 32 位回绕比较）
+                diff = (seq - last[0]) & 0xFFFFFFFF
+                if diff == 0 or diff >= 0x80000000:
+                    return 'duplicate'
+            elif len(self._last_seq) >= MAX_SENDERS:
+                self._prune(now_ms - window_ms)
+                if len(self._last_seq) >= MAX_SENDERS:
+                    return 'overflow'
+            self._last_seq[sender] = (seq, timestamp_ms)
+        return None
+
+    def _prune(self, oldest_ms: int):
+        """删除最近一次接受的包已在时间窗口之外的发送方（调用方持有锁）
+
+        这些发送方之前的包都会被时间窗口拒绝，删掉记录不会重新打开重放的机会。
+        """
+        for sender, (_, timestamp_ms) in list(self._last_seq.items()):
+            if timestamp_ms < oldest_ms:
+                del self._last_seq[sender]
+
+    @staticmethod
+    def _ack(flags: int, status: int, seq: int) -> Optional[bytes]:
+        if not flags & FLAG_ACK:
+            return None
+        return ACK.pack(MAGIC, VERSION, FLAG_REPLY, status, seq)
+
+    def _run(self):
+        """监听线程主循环"""
+        sock = self._sock
+        while sock is not None:
+            try:
+                packet, address = sock.recvfrom(64)
+            except OSError:
+                break
+            reply = self.handle_packet(packet, address)
+            if reply is not None:
+                try:
+                    sock.sendto(reply, address)
+                except OSError:
+                    pass
@@ -0,0 +1,76 @@
+"""UDP 命令测试客户端
+
+用法:
+    python udp_client.py --key 密钥 media next
+    python udp_client.py --host 192.168.1.10 --key 密钥 volume up --steps 3 --ack
+"""
+import argparse
+import os
+import socket
+import sys
+import time
+from typing import Optional, Tuple
+
+from udp_channel import COMMAND_CODES, decode_ack, encode_packet
+
+
+class UdpCommandClient:
+    """UDP 命令客户端"""
+
+    def __init__(self, host: str, port: int, key: bytes, timeout: float = 1.0):
+        self.address = (host, port)
+        self.key = key
+        # 每次启动随机生成发送方 id；以毫秒时间作为起始序列号，客户端重启后序列号仍然递增
+        self.sender = int.from_bytes(os.urandom(4), 'big')
+        self.seq = int(time.time() * 1000) & 0xFFFFFFFF
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.settimeout(timeout)
+
+    def send(self, category: str, action: str, steps: int = 1, ack: bool = False) -> Optional[Tuple[int, int]]:
+        """发送命令；ack 为 True 时等待应答并返回 (status, seq)，超时返回 None"""
+        command = COMMAND_CODES[(category, action)]
+        self.seq = (self.seq + 1) & 0xFFFFFFFF
+        self._sock.sendto(encode_packet(self.key, command, self.seq, steps, ack, self.sender), self.address)
+        if not ack:
+            return None
+        try:
+            while True:
+                reply = decode_ack(self._sock.recv(64))
+                if reply is not None and reply[1] == self.seq:
+                    return reply
+        except socket.timeout:
+            return None
+
+    def close(self):
+        self._sock.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='RemotePCController UDP 测试客户端')
+    parser.add_argument('category', help='volume / media / brightness')
+    parser.add_argument('action', help='例如 up / down / mute / play / next')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8092)
+    parser.add_argument('--key', required=True, help='与服务器 REMOTE_PC_UDP_KEY 相同的密钥')
+    parser.add_argument('--steps', type=int, default=1)
+    parser.add_argument('--ack', action='store_true', help='请求服务器应答并显示往返耗时')
+    args = parser.parse_args()
+
+    if (args.category, args.action) not in COMMAND_CODES:
+        print(f'不支持的命令，可选: {sorted(COMMAND_CODES)}')
+        return 2
+
+    client = UdpCommandClient(args.host, args.port, args.key.encode('utf-8'))
+    start = time.perf_counter()
+    reply = client.send(args.category, args.action, args.steps, args.ack)
+    elapsed = (time.perf_counter() - start) * 1000
+    if args.ack:
+        print(f'应答: {reply}, 往返 {elapsed:.2f}ms' if reply else '等待应答超时')
+    else:
+        print(f'已发送 seq={client.seq}')
+    client.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,234 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from controller_backends import ControllerBackend, WindowInfo
+
+MAX_WINDOW_RESULTS = 500
+
+
+def fuzzy_score(query: str, text: str) -> Optional[int]:
+    """模糊匹配打分，query 须为小写；不匹配返回 None，分数越高越相关
+
+    连续子串匹配得分最高（越靠前越高），否则按字符顺序的子序列匹配，连续命中和词首命中加分。
+    """
+    text = text.lower()
+    index = text.find(query)
+    if index >= 0:
+        return 1000 - min(index, 500) + (100 if index == 0 or not text[index - 1].isalnum() else 0)
+
+    score = 0
+    position = -1
+    for char in query:
+        found = text.find(char, position + 1)
+        if found < 0:
+            return None
+        if found == position + 1:
+            score += 10
+        elif found == 0 or not text[found - 1].isalnum():
+            score += 5
+        score -= min(found - position - 1, 10)
+        position = found
+    return score
+
+
+def window_to_dict(window: WindowInfo, process: str = '') -> dict:
+    left, top, right, bottom = window.rect
+    return {
+        'hwnd': window.hwnd,
+        'title': window.title,
+        'class_name': window.class_name,
+        'pid': window.pid,
+        'process': process,
+        'rect': {
+            'left': left,
+            'top': top,
+            'right': right,
+            'bottom': bottom,
+            'width': right - left,
+            'height': bottom - top
+        },
+        'is_visible': window.is_visible
+    }
+
+
+class WindowIndex:
+    """顶层窗口索引 - 首次使用时枚举一次，之后由后端的窗口创建/销毁/变化事件增量维护
+
+    按 hwnd 查找是 O(1) 的字典访问。后端不支持事件时退化为按 ttl 重新枚举。
+    """
+
+    def __init__(self, backend: ControllerBackend, process_name: Callable[[int], str] = lambda pid: '',
+                 ttl: float = 2.0):
+        self.backend = backend
+        self.process_name = process_name
+        self.ttl = ttl
+        self.live = False
+        self.version = 0
+        # 只在窗口出现或消失时递增，标题、位置等变化不影响；用于只依赖窗口归属的缓存
+        self.identity_version = 0
+        self._windows: Dict[int, WindowInfo] = {}
+        # 每个窗口最近一次事件时的版本号，用于判断窗口是否变化过
+        self._revisions: Dict[int, int] = {}
+        self._built_at: Optional[float] = None
+        # 重新枚举期间到达的事件，枚举结束后补到新索引上
+        self._pending: Optional[List[tuple]] = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._started = False
+        self._listeners: List[Callable[[str, int, Optional[WindowInfo]], None]] = []
+        self._stats = {'rebuilds': 0, 'events': 0, 'last_rebuild_ms': 0.0}
+        self._logger = logging.getLogger('WindowIndex')
+
+    def start(self):
+        """订阅窗口事件并生成第一份索引"""
+        if self._started:
+            return
+        with self._start_lock:
+            if self._started:
+                return
+            try:
+                self.live = self.backend.watch_windows(self._on_event)
+            except Exception as e:
+                self._logger.error(f"订阅窗口事件失败，改为定期枚举: {e}")
+                self.live = False
+            self.rebuild()
+            self._started = True
+
+    def add_listener(self, listener: Callable[[str, int, Optional[WindowInfo]], None]):
+        """注册监听器，窗口变化时以 (事件, hwnd, 窗口信息) 调用；定期枚举模式下只会收到新出现窗口的 created"""
+        self._listeners.append(listener)
+
+    def _notify(self, event: str, hwnd: int, window: Optional[WindowInfo]):
+        for listener in self._listeners:
+            try:
+                listener(event, hwnd, window)
+            except Exception as e:
+                self._logger.error(f"窗口监听器出错: {e}")
+
+    def rebuild(self):
+        """重新枚举全部顶层窗口"""
+        with self._refresh_lock:
+            start = time.perf_counter()
+            with self._lock:
+                self._pending = []
+            try:
+                windows = {window.hwnd: window for window in self.backend.enumerate_windows()}
+            except Exception:
+                with self._lock:
+                    self._pending = None
+                raise
+            with self._lock:
+                for hwnd, window in self._pending:
+                    if window is None:
+                        windows.pop(hwnd, None)
+                    else:
+                        windows[hwnd] = window
+                self._pending = None
+                created = [] if self.live or self._built_at is None else \
+                    [window for hwnd, window in windows.items() if hwnd not in self._windows]
+                if windows.keys() != self._windows.keys():
+                    self.identity_version += 1
+                self._windows = windows
+                self._built_at = time.monotonic()
+                self.version += 1
+                self._stats['rebuilds'] += 1
+                self._stats['last_rebuild_ms'] = round((time.perf_counter() - start) * 1000, 2)
+            for window in created:
+                self._notify('created', window.hwnd, window)
+
+    def _on_event(self, event: str, hwnd: int):
+        """窗口事件: created / destroyed / changed"""
+        window = None if event == 'destroyed' else self.backend.get_window_info(hwnd)
+        with self._lock:
+            self._stats['events'] += 1
+            if self._pending is not None:
+                self._pending.append((hwnd, window))
+            if window is None:
+                self._revisions.pop(hwnd, None)
+                if self._windows.pop(hwnd, None) is None:
+                    return
+                self.identity_version += 1
+            else:
+                if hwnd not in self._windows:
+                    self.identity_version += 1
+                self._windows[hwnd] = window
+            self.version += 1
+            if window is not None:
+                self._revisions[hwnd] = self.version
+        self._notify(event, hwnd, window)
+
+    def _ensure_fresh(self):
+        self.start()
+        if not self.live and time.monotonic() - self._built_at >= self.ttl:
+            self.rebuild()
+
+    def get(self, hwnd: int) -> Optional[WindowInfo]:
+        """按 hwnd 查找窗口"""
+        self._ensure_fresh()
+        return self._windows.get(hwnd)
+
+    def snapshot(self) -> Tuple[int, List[WindowInfo]]:
+        """当前索引的 (版本号, 窗口列表)，包括隐藏窗口"""
+        self._ensure_fresh()
+        with self._lock:
+            return self.version, list(self._windows.values())
+
+    def identity(self) -> int:
+        """当前的 identity_version（窗口集合的版本号）"""
+        self._ensure_fresh()
+        return self.identity_version
+
+    def revision(self, hwnd: int) -> int:
+        """窗口最近一次变化时的索引版本号（没有收到过事件时为 0）"""
+        return self._revisions.get(hwnd, 0)
+
+    def query(self, search: Optional[str] = None, include_hidden: bool = False,
+              class_name: Optional[str] = None, process: Optional[str] = None,
+              limit: int = 100) -> dict:
+        """过滤并按模糊匹配程度排序；默认只返回可见且有标题的窗口"""
+        self._ensure_fresh()
+        limit = min(max(int(limit), 1), MAX_WINDOW_RESULTS)
+        with self._lock:
+            windows = list(self._windows.values())
+            version = self.version
+
+        needle = search.lower() if search else None
+        process = process.lower() if process else None
+        matches = []
+        for window in windows:
+            if not include_hidden and not (window.is_visible and window.title):
+                continue
+            if class_name and window.class_name != class_name:
+                continue
+            name = self.process_name(window.pid) if window.pid else ''
+            if process and process not in name.lower():
+                continue
+            score = 0
+            if needle:
+                title_score = fuzzy_score(needle, window.title)
+                name_score = fuzzy_score(needle, name) if name else None
+                if title_score is None and name_score is None:
+                    continue
+                score = max(s for s in (title_score, name_score) if s is not None)
+            matches.append((score, window, name))
+
+        if needle:
+            matches.sort(key=lambda match: -match[0])
+        return {
+            'windows': [dict(window_to_dict(window, name), score=score) if needle else window_to_dict(window, name)
+                        for score, window, name in matches[:limit]],
+            'total_count': len(matches),
+            'version': version,
+            'live': self.live,
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['windows'] = len(self._windows)
+            stats['version'] = self.version
+        stats['live'] = self.live
+        return stats
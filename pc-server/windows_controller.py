@@ -1,14 +1,22 @@
-import ctypes
-from ctypes import wintypes
 from enum import Enum
-import time
 import os
-import subprocess
+import time
 import logging
-from typing import Optional, Union, Dict, List, Tuple
+from typing import Iterable, Optional, Union, Dict, List, Tuple
 import json
-from dataclasses import dataclass
-import shutil
+import subprocess
+from controller_backends import ControllerBackend, ProcessInfo, WindowInfo, create_backend
+from input_engine import InputEngine, InputSequence
+from process_table import ProcessTable
+from process_killer import TERMINATED, ProcessKiller
+from metrics_sampler import ALL_METRICS, MetricsSampler
+from metrics_history import DEFAULT_TIERS, MetricsHistory, parse_tiers
+from window_index import WindowIndex, window_to_dict
+from screen_stream import ScreenStreamer
+from thumbnail_cache import ThumbnailCache
+from app_index import AppIndex, default_app_dirs, requires_shell
+from app_locator import AppLocator
+from launch_registry import LaunchRegistry, split_args
 
 class SystemKey(Enum):
     """系统控制按键枚举"""
@@ -49,56 +57,65 @@ class WindowState(Enum):
     MAXIMIZED = 3
     RESTORE = 9
 
-@dataclass
-class ProcessInfo:
-    """进程信息"""
-    pid: int
-    name: str
-    executable: str
-    memory_usage: int
+# 启动模式: launch 总是启动新实例，focus_or_launch 已有窗口时切换过去
+LAUNCH_MODES = ('launch', 'focus_or_launch')
 
-@dataclass
-class WindowInfo:
-    """窗口信息"""
-    hwnd: int
-    title: str
-    class_name: str
-    rect: Tuple[int, int, int, int]
-    is_visible: bool
 
 class WindowsSystemController:
     """Windows 系统控制器 - 全功能版本"""
     
-    def __init__(self):
+    def __init__(self, backend: Optional[ControllerBackend] = None,
+                 input_engine: Optional[InputEngine] = None):
         """初始化系统控制器"""
-        self.user32 = ctypes.windll.user32
-        self.kernel32 = ctypes.windll.kernel32
-        self.shell32 = ctypes.windll.shell32
-        self.psapi = ctypes.windll.psapi
+        self.backend = backend or create_backend()
+        self.input_engine = input_engine or self.backend.create_input_engine()
+        self.process_table = ProcessTable(self.backend, ttl=float(os.environ.get('REMOTE_PC_PROCESS_TTL', 2.0)))
+        self.metrics_sampler = MetricsSampler(
+            self.backend,
+            interval=float(os.environ.get('REMOTE_PC_METRICS_INTERVAL', 1.0)),
+            metrics=os.environ.get('REMOTE_PC_METRICS', ','.join(ALL_METRICS)).split(',')
+        )
+        tiers = os.environ.get('REMOTE_PC_METRICS_TIERS')
+        self.metrics_history = MetricsHistory(parse_tiers(tiers) if tiers else DEFAULT_TIERS)
+        self.metrics_sampler.add_listener(self.metrics_history.record)
+        self.window_index = WindowIndex(self.backend, self._process_name)
+        self.thumbnail_cache = ThumbnailCache(
+            self.backend.capture_window,
+            self.window_index,
+            max_bytes=int(os.environ.get('REMOTE_PC_THUMBNAIL_CACHE_KB', 8192)) * 1024
+        )
+        self.app_index = AppIndex(
+            os.environ.get('REMOTE_PC_APP_INDEX', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app_index.json')),
+            default_app_dirs(os.environ.get('REMOTE_PC_APP_DIRS', '').split(os.pathsep)),
+            exists=self.backend.app_exists
+        )
+        self.app_locator = AppLocator(self.process_table, self.window_index)
+        self.launch_registry = LaunchRegistry(self.window_index)
+        self.process_killer = ProcessKiller(self.backend, self.process_table, self.window_index)
+        self.screen_streamer = ScreenStreamer(
+            self.backend.create_frame_source,
+            max_streams=int(os.environ.get('REMOTE_PC_MAX_STREAMS', 2))
+        )
+        self._platform_info = None
         self._logger = self._setup_logger()
         
     def _setup_logger(self) -> logging.Logger:
-        """设置日志"""
-        logger = logging.getLogger('SystemController')
-        if not logger.handlers:
-            handler = logging.StreamHandler()
-            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-            handler.setFormatter(formatter)
-            logger.addHandler(handler)
-            logger.setLevel(logging.INFO)
-        return logger
-    
-    def _send_key_event(self, key_code: int, delay: float = 0.05) -> bool:
-        """发送键盘事件"""
+        """设置日志（输出目标由 request_log.configure_logging 统一配置）"""
+        return logging.getLogger('SystemController')
+    
+    def _send_sequence(self, sequence: InputSequence) -> bool:
+        """通过输入引擎一次性发送整个按键序列"""
         try:
-            self.user32.keybd_event(key_code, 0, 0, 0)
-            time.sleep(delay)
-            self.user32.keybd_event(key_code, 0, 2, 0)
+            self.input_engine.send(sequence)
             return True
         except Exception as e:
             self._logger.error(f"发送键盘事件失败: {e}")
             return False
     
+    def _send_key_event(self, key_code: int, times: int = 1) -> bool:
+        """发送键盘事件（按下并释放，可重复多次）"""
+        return self._send_sequence(InputSequence().tap(key_code, times))
+    
     # =================== 音量控制 ===================
     def volume_up(self, steps: int = 1) -> dict:
         """增加音量"""
@@ -122,11 +139,8 @@ class WindowsSystemController:
         try:
             key_code = SystemKey.VOLUME_UP.value if action == 'up' else SystemKey.VOLUME_DOWN.value
             
-            for i in range(steps):
-                if not self._send_key_event(key_code):
-                    return {'success': False, 'message': f'音量{action}失败，在第{i + 1}步'}
-                if steps > 1:
-                    time.sleep(0.1)
+            if not self._send_key_event(key_code, steps):
+                return {'success': False, 'message': f'音量{action}失败'}
             
             return {
                 'success': True,
@@ -177,11 +191,8 @@ class WindowsSystemController:
         try:
             key_code = SystemKey.BRIGHTNESS_UP.value if action == 'up' else SystemKey.BRIGHTNESS_DOWN.value
             
-            for i in range(steps):
-                if not self._send_key_event(key_code):
-                    return {'success': False, 'message': f'亮度{action}失败，在第{i + 1}步'}
-                if steps > 1:
-                    time.sleep(0.2)
+            if not self._send_key_event(key_code, steps):
+                return {'success': False, 'message': f'亮度{action}失败'}
             
             return {
                 'success': True,
@@ -194,141 +205,193 @@ class WindowsSystemController:
     
     # =================== 应用程序控制 ===================
     def app_exists(self, app_path):
-        # 先判断是否是绝对路径
-        if os.path.isabs(app_path):
-            return os.path.exists(app_path)
-        # 否则尝试在 PATH 里查找
-        return shutil.which(app_path) is not None
+        return self.app_index.resolve(app_path)
+
+    def search_applications(self, query: str, limit: int = 20) -> dict:
+        """在已安装应用索引中模糊搜索"""
+        try:
+            result = self.app_index.search(query, limit)
+            return {
+                'success': True,
+                'message': f'找到 {result["total_count"]} 个应用',
+                **result
+            }
+        except Exception as e:
+            return {'success': False, 'message': f'搜索应用失败: {str(e)}'}
+
+    def launch_application(self, app_path: str, args: Union[str, List[str]] = "", working_dir: str = "",
+                           app_id: Optional[str] = None, mode: str = 'launch') -> dict:
+        """启动应用程序（可以传路径，也可以传应用索引中的 id）
 
-    def launch_application(self, app_path: str, args: str = "", working_dir: str = "") -> dict:
-        """启动应用程序"""
+        mode 为 focus_or_launch 时，如果该程序已有窗口则切换到前台（最小化的先恢复），不再启动新实例。
+        """
         try:
+            if mode not in LAUNCH_MODES:
+                return {'success': False, 'message': f'不支持的启动模式: {mode}，可选: {list(LAUNCH_MODES)}'}
+            if app_id:
+                entry = self.app_index.get(app_id)
+                if entry is None:
+                    return {'success': False, 'message': f'应用不存在: {app_id}'}
+                app_path = entry.path
 
-            if not self.app_exists(app_path):
-                print(f'应用程序不存在')
+            if mode == 'focus_or_launch':
+                window = self.app_locator.find_window(self.app_index.executable_for(app_path))
+                if window is not None:
+                    self.backend.focus_window(window.hwnd)
+                    return {
+                        'success': True,
+                        'message': f'已切换到运行中的应用: {window.title or os.path.basename(app_path)}',
+                        'pid': window.pid,
+                        'hwnd': window.hwnd,
+                        'launched': False,
+                        'action': 'focus_app'
+                    }
 
+            if not self.app_exists(app_path):
+                self._logger.warning(f'应用程序不存在: {app_path}')
                 return {'success': False, 'message': f'应用程序不存在: {app_path}'}
-            
-            command = f'"{app_path}"'
-            if args:
-                command += f' {args}'
-            
-            print(f'dd {command}')
 
-            process = subprocess.Popen(
-                command,
-                cwd=working_dir if working_dir else None,
-                shell=True
-            )
-            
+            argv = [app_path, *split_args(args)]
+            self._logger.debug(f'启动: {subprocess.list2cmdline(argv)}')
+
+            # 先订阅窗口事件，才能记录第一个窗口出现的时间
+            self.window_index.start()
+            started = time.perf_counter()
+            try:
+                if requires_shell(app_path):
+                    child = None
+                    self.backend.shell_open(app_path, subprocess.list2cmdline(argv[1:]), working_dir or None)
+                else:
+                    child = self.backend.spawn(argv, working_dir or None)
+            except OSError:
+                self.app_index.invalidate(app_path)
+                raise
+            record = self.launch_registry.add(app_path, argv, child, started, time.perf_counter() - started)
+
             return {
                 'success': True,
                 'message': f'应用程序已启动: {os.path.basename(app_path)}',
-                'pid': process.pid,
+                'pid': record.pid,
+                'launch_id': record.launch_id,
+                'spawn_ms': record.spawn_ms,
+                'launched': True,
                 'action': 'launch_app'
             }
         except Exception as e:
-            print( f'启动应用程序失败: {str(e)}')
+            self._logger.error(f'启动应用程序失败: {e}')
             return {'success': False, 'message': f'启动应用程序失败: {str(e)}'}
+
+    def get_launches(self, launch_id: Optional[int] = None, running: bool = False, limit: int = 50) -> dict:
+        """查询启动记录：pid、退出码、启动耗时和第一个窗口出现的时间"""
+        try:
+            result = self.launch_registry.query(launch_id, running, limit)
+            return {
+                'success': True,
+                'message': f'获取到 {len(result["launches"])} 条启动记录',
+                **result,
+                'stats': self.launch_registry.stats()
+            }
+        except KeyError:
+            return {'success': False, 'message': f'启动记录不存在: {launch_id}'}
+        except Exception as e:
+            return {'success': False, 'message': f'获取启动记录失败: {str(e)}'}
     
-    def kill_process(self, process_name: str) -> dict:
-        """终止进程"""
+    def kill_processes(self, names: Iterable[str] = (), pids: Iterable[int] = (),
+                       patterns: Iterable[str] = (), grace: float = 0.0) -> dict:
+        """按名称、pid 或通配符批量终止进程，grace 秒内先尝试正常关闭"""
         try:
-            result = subprocess.run(['taskkill', '/f', '/im', process_name], 
-                                  capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                return {
-                    'success': True,
-                    'message': f'进程已终止: {process_name}',
-                    'action': 'kill_process'
-                }
+            result = self.process_killer.kill(names, pids, patterns, grace)
+            outcomes = [r['outcome'] for r in result['results']]
+            terminated = sum(outcome in TERMINATED for outcome in outcomes)
+            if not outcomes:
+                message = f'没有找到匹配的进程: {", ".join(result["unmatched"])}'
             else:
-                return {
-                    'success': False,
-                    'message': f'终止进程失败: {result.stderr.strip()}'
-                }
+                message = f'已终止 {terminated}/{len(outcomes)} 个进程'
+            return {
+                'success': terminated > 0 and all(o in TERMINATED or o == 'skipped' for o in outcomes),
+                'message': message,
+                **result,
+                'action': 'kill_process'
+            }
+        except ValueError as e:
+            return {'success': False, 'message': str(e)}
         except Exception as e:
             return {'success': False, 'message': f'终止进程操作失败: {str(e)}'}
     
-    def get_running_processes(self) -> dict:
-        """获取运行中的进程列表"""
+    def get_running_processes(self, name: Optional[str] = None, sort: str = 'memory',
+                              limit: int = 50, cursor: Optional[str] = None) -> dict:
+        """获取运行中的进程列表（读取后台刷新的进程快照，支持过滤、排序和游标分页）"""
         try:
-            result = subprocess.run(['tasklist', '/fo', 'csv'], 
-                                  capture_output=True, text=True, encoding='gbk')
-            
-            if result.returncode != 0:
-                return {'success': False, 'message': '获取进程列表失败'}
-            
-            lines = result.stdout.strip().split('\n')[1:]  # 跳过标题行
-            processes = []
-            
-            for line in lines:
-                parts = line.split('","')
-                if len(parts) >= 5:
-                    name = parts[0].strip('"')
-                    pid = parts[1].strip('"')
-                    memory = parts[4].strip('"').replace(',', '').replace(' K', '')
-                    
-                    try:
-                        processes.append({
-                            'name': name,
-                            'pid': int(pid),
-                            'memory_kb': int(memory) if memory.isdigit() else 0
-                        })
-                    except ValueError:
-                        continue
-            
+            page = self.process_table.query(name, sort, limit, cursor)
             return {
                 'success': True,
-                'message': f'获取到 {len(processes)} 个进程',
-                'processes': processes[:50],  # 限制返回数量
-                'total_count': len(processes)
+                'message': f'获取到 {len(page["processes"])} 个进程',
+                **page
             }
+        except ValueError as e:
+            return {'success': False, 'message': str(e)}
         except Exception as e:
             return {'success': False, 'message': f'获取进程列表失败: {str(e)}'}
     
+    def get_process_changes(self, since: int) -> dict:
+        """获取某个版本之后的进程变化（版本太旧时返回全量）"""
+        try:
+            changes = self.process_table.delta(since)
+            if changes['full']:
+                message = f'全量同步 {len(changes["processes"])} 个进程'
+            else:
+                message = f'新增 {len(changes["added"])}，退出 {len(changes["removed"])}，变化 {len(changes["changed"])}'
+            return {'success': True, 'message': message, **changes}
+        except Exception as e:
+            return {'success': False, 'message': f'获取进程变化失败: {str(e)}'}
+    
     # =================== 窗口控制 ===================
+    def _process_name(self, pid: int) -> str:
+        """从进程表快照中取进程名"""
+        process = self.process_table.get(pid)
+        return process.name if process else ''
+    
     def get_active_window(self) -> dict:
         """获取当前活动窗口信息"""
         try:
-            hwnd = self.user32.GetForegroundWindow()
-            if not hwnd:
+            hwnd = self.backend.get_foreground_window()
+            window = self.backend.get_window_info(hwnd) if hwnd else None
+            if window is None:
                 return {'success': False, 'message': '无法获取活动窗口'}
             
-            # 获取窗口标题
-            title_length = self.user32.GetWindowTextLengthW(hwnd)
-            title_buffer = ctypes.create_unicode_buffer(title_length + 1)
-            self.user32.GetWindowTextW(hwnd, title_buffer, title_length + 1)
-            
-            # 获取窗口类名
-            class_buffer = ctypes.create_unicode_buffer(256)
-            self.user32.GetClassNameW(hwnd, class_buffer, 256)
-            
-            # 获取窗口位置和大小
-            rect = wintypes.RECT()
-            self.user32.GetWindowRect(hwnd, ctypes.byref(rect))
-            
             return {
                 'success': True,
-                'window': {
-                    'hwnd': hwnd,
-                    'title': title_buffer.value,
-                    'class_name': class_buffer.value,
-                    'rect': {
-                        'left': rect.left,
-                        'top': rect.top,
-                        'right': rect.right,
-                        'bottom': rect.bottom,
-                        'width': rect.right - rect.left,
-                        'height': rect.bottom - rect.top
-                    },
-                    'is_visible': bool(self.user32.IsWindowVisible(hwnd))
-                }
+                'window': window_to_dict(window, self._process_name(window.pid) if window.pid else '')
             }
         except Exception as e:
             return {'success': False, 'message': f'获取活动窗口失败: {str(e)}'}
     
+    def list_windows(self, search: Optional[str] = None, include_hidden: bool = False,
+                     class_name: Optional[str] = None, process: Optional[str] = None,
+                     limit: int = 100) -> dict:
+        """列出顶层窗口，支持按类名、进程名过滤和标题模糊搜索"""
+        try:
+            result = self.window_index.query(search, include_hidden, class_name, process, limit)
+            return {
+                'success': True,
+                'message': f'找到 {result["total_count"]} 个窗口',
+                **result
+            }
+        except Exception as e:
+            return {'success': False, 'message': f'获取窗口列表失败: {str(e)}'}
+    
+    def get_window_thumbnail(self, hwnd: int, width: int = 320) -> dict:
+        """获取窗口缩略图（带缓存）"""
+        try:
+            thumbnail = self.thumbnail_cache.get(hwnd, width)
+            if thumbnail is None:
+                return {'success': False, 'message': f'窗口不存在或无法截取: {hwnd}'}
+            return {'success': True, 'thumbnail': thumbnail}
+        except ValueError as e:
+            return {'success': False, 'message': str(e)}
+        except Exception as e:
+            return {'success': False, 'message': f'获取窗口缩略图失败: {str(e)}'}
+    
     def minimize_window(self, hwnd: Optional[int] = None) -> dict:
         """最小化窗口"""
         return self._control_window('minimize', WindowState.MINIMIZED, hwnd)
@@ -341,18 +404,32 @@ class WindowsSystemController:
         """恢复窗口"""
         return self._control_window('restore', WindowState.RESTORE, hwnd)
     
+    def focus_window(self, hwnd: int) -> dict:
+        """把窗口切换到前台，最小化的窗口先恢复"""
+        try:
+            if not hwnd:
+                return {'success': False, 'message': '无法获取目标窗口'}
+            self.backend.focus_window(hwnd)
+            return {
+                'success': True,
+                'message': '窗口已切换到前台',
+                'action': 'focus_window',
+                'hwnd': hwnd
+            }
+        except Exception as e:
+            return {'success': False, 'message': f'切换窗口失败: {str(e)}'}
+
     def close_window(self, hwnd: Optional[int] = None) -> dict:
         """关闭窗口"""
         try:
             if hwnd is None:
-                hwnd = self.user32.GetForegroundWindow()
+                hwnd = self.backend.get_foreground_window()
             
             if not hwnd:
                 return {'success': False, 'message': '无法获取目标窗口'}
             
             # 发送关闭消息
-            WM_CLOSE = 0x0010
-            self.user32.SendMessageW(hwnd, WM_CLOSE, 0, 0)
+            self.backend.close_window(hwnd)
             
             return {
                 'success': True,
@@ -367,12 +444,12 @@ class WindowsSystemController:
         """窗口控制核心方法"""
         try:
             if hwnd is None:
-                hwnd = self.user32.GetForegroundWindow()
+                hwnd = self.backend.get_foreground_window()
             
             if not hwnd:
                 return {'success': False, 'message': '无法获取目标窗口'}
             
-            self.user32.ShowWindow(hwnd, state.value)
+            self.backend.show_window(hwnd, state.value)
             
             return {
                 'success': True,
@@ -387,7 +464,7 @@ class WindowsSystemController:
     def lock_screen(self) -> dict:
         """锁定屏幕"""
         try:
-            self.user32.LockWorkStation()
+            self.backend.lock_workstation()
             return {'success': True, 'message': '屏幕已锁定', 'action': 'lock_screen'}
         except Exception as e:
             return {'success': False, 'message': f'锁定屏幕失败: {str(e)}'}
@@ -395,11 +472,7 @@ class WindowsSystemController:
     def shutdown_system(self, force: bool = False) -> dict:
         """关机"""
         try:
-            flags = '/s /t 0'
-            if force:
-                flags += ' /f'
-            
-            subprocess.run(['shutdown', *flags.split()], check=True)
+            self.backend.power('shutdown', force)
             return {'success': True, 'message': '系统关机命令已发送', 'action': 'shutdown'}
         except Exception as e:
             return {'success': False, 'message': f'关机失败: {str(e)}'}
@@ -407,11 +480,7 @@ class WindowsSystemController:
     def restart_system(self, force: bool = False) -> dict:
         """重启"""
         try:
-            flags = '/r /t 0'
-            if force:
-                flags += ' /f'
-            
-            subprocess.run(['shutdown', *flags.split()], check=True)
+            self.backend.power('restart', force)
             return {'success': True, 'message': '系统重启命令已发送', 'action': 'restart'}
         except Exception as e:
             return {'success': False, 'message': f'重启失败: {str(e)}'}
@@ -419,24 +488,16 @@ class WindowsSystemController:
     def sleep_system(self) -> dict:
         """休眠系统"""
         try:
-            subprocess.run(['rundll32.exe', 'powrprof.dll,SetSuspendState', '0,1,0'], check=True)
+            self.backend.power('sleep')
             return {'success': True, 'message': '系统休眠命令已发送', 'action': 'sleep'}
         except Exception as e:
             return {'success': False, 'message': f'休眠失败: {str(e)}'}
     
     # =================== 快捷键发送 ===================
-    def send_key_combination(self, keys: List[int], delay: float = 0.05) -> dict:
-        """发送组合键"""
+    def send_key_combination(self, keys: List[int], hold: float = 0.0) -> dict:
+        """发送组合键（按下与逆序释放在同一次 SendInput 中提交；hold > 0 时按住后再释放）"""
         try:
-            # 按下所有键
-            for key in keys:
-                self.user32.keybd_event(key, 0, 0, 0)
-                time.sleep(delay)
-            
-            # 释放所有键（逆序）
-            for key in reversed(keys):
-                self.user32.keybd_event(key, 0, 2, 0)
-                time.sleep(delay)
+            self.input_engine.send(InputSequence().combo(keys, hold))
             
             return {
                 'success': True,
@@ -447,6 +508,20 @@ class WindowsSystemController:
         except Exception as e:
             return {'success': False, 'message': f'发送组合键失败: {str(e)}'}
     
+    def send_input_sequence(self, sequence: InputSequence, name: str = 'sequence') -> dict:
+        """发送预先构建好的输入序列"""
+        try:
+            self.input_engine.send(sequence)
+            
+            return {
+                'success': True,
+                'message': f'输入序列已发送: {name}',
+                'action': 'send_input_sequence',
+                'events': sequence.event_count
+            }
+        except Exception as e:
+            return {'success': False, 'message': f'发送输入序列失败: {str(e)}'}
+    
     def send_alt_tab(self) -> dict:
         """发送 Alt+Tab"""
         return self.send_key_combination([0x12, 0x09])  # Alt + Tab
@@ -465,34 +540,41 @@ class WindowsSystemController:
     
     # =================== 系统信息 ===================
     def get_system_info(self) -> dict:
-        """获取系统信息"""
+        """获取系统信息（读取后台采样的最新快照，不阻塞）"""
         try:
-            import platform
-            import psutil
+            snapshot = self.metrics_sampler.latest()
+            if snapshot is None:
+                return {'success': False, 'message': self.metrics_sampler.error or '系统指标尚未就绪'}
+            
+            if self._platform_info is None:
+                self._platform_info = self.backend.platform_info()
             
+            system_info = dict(self._platform_info)
+            system_info.update(snapshot)
+            system_info['sample_age_ms'] = round((time.time() - snapshot['sampled_at']) * 1000, 1)
             return {
                 'success': True,
-                'system_info': {
-                    'platform': platform.platform(),
-                    'processor': platform.processor(),
-                    'architecture': platform.architecture(),
-                    'memory': {
-                        'total': psutil.virtual_memory().total,
-                        'available': psutil.virtual_memory().available,
-                        'percent': psutil.virtual_memory().percent
-                    },
-                    'disk': {
-                        'total': psutil.disk_usage('C:').total,
-                        'free': psutil.disk_usage('C:').free,
-                        'percent': psutil.disk_usage('C:').percent
-                    },
-                    'cpu_percent': psutil.cpu_percent(interval=1)
-                }
+                'system_info': system_info
             }
-        except ImportError:
-            return {'success': False, 'message': '需要安装 psutil: pip install psutil'}
         except Exception as e:
             return {'success': False, 'message': f'获取系统信息失败: {str(e)}'}
+    
+    def get_metrics_history(self, start: Optional[float] = None, end: Optional[float] = None,
+                            step: Optional[float] = None, names: Optional[List[str]] = None) -> dict:
+        """获取系统指标历史（降采样后的时间序列）"""
+        try:
+            self.metrics_sampler.start()
+            history = self.metrics_history.query(start, end, step, names)
+            return {
+                'success': True,
+                'message': f'{len(history["timestamps"])} 个数据点，步长 {history["step"]} 秒',
+                **history,
+                'memory_bytes': self.metrics_history.memory_bytes
+            }
+        except ValueError as e:
+            return {'success': False, 'message': str(e)}
+        except Exception as e:
+            return {'success': False, 'message': f'获取指标历史失败: {str(e)}'}
 
 # 创建全局实例
 system_controller = WindowsSystemController()
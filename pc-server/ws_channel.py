@@ -0,0 +1,133 @@
+import json
+import logging
+import threading
+import time
+from typing import Callable, Optional, Set, Tuple
+
+# 命令执行函数: (category, action, params, client=客户端地址) -> (结果, 状态码)
+CommandExecutor = Callable[..., Tuple[dict, int]]
+
+
+class CommandChannel:
+    """WebSocket 命令通道 - 与 REST API 并行的持久连接
+
+    请求帧: {"id": 7, "c": "volume", "a": "up", "p": {"steps": 2}}
+    （也接受完整字段名 category / action / params）
+    应答帧: {"id": 7, "ok": true, "code": 202, "msg": "...", "cmd": 15}
+    （key/down 的应答带 "hold": 按住 id）
+    发送 {"c": "ping"} 得到 {"pong": 时间戳}；应答中加 "full": true 时附带完整结果。
+    """
+
+    def __init__(self, executor: CommandExecutor, host: str = '0.0.0.0', port: int = 8091):
+        self.executor = executor
+        self.host = host
+        self.port = port
+        self._server = None
+        self._clients: Set[object] = set()
+        self._lock = threading.Lock()
+        self._stats = {'connections': 0, 'frames': 0, 'errors': 0}
+        self._logger = logging.getLogger('CommandChannel')
+
+    def start(self) -> bool:
+        """在后台线程启动 WebSocket 服务；未安装 websockets 或端口无法绑定时返回 False"""
+        try:
+            from websockets.sync.server import serve
+        except ImportError:
+            self._logger.warning('未安装 websockets，WebSocket 通道不可用: pip install websockets')
+            return False
+
+        try:
+            self._server = serve(self._handle, self.host, self.port, compression=None)
+        except OSError as e:
+            # 端口被占用等情况只影响这个通道，不能让 REST 服务起不来
+            self._logger.warning(f'WebSocket 通道启动失败 {self.host}:{self.port}: {e}')
+            return False
+        threading.Thread(target=self._server.serve_forever, name='ws-channel', daemon=True).start()
+        return True
+
+    def stop(self):
+        """停止服务"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+
+    def broadcast(self, message: dict):
+        """向所有已连接的客户端推送消息"""
+        payload = json.dumps(message, ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            clients = list(self._clients)
+        for client in clients:
+            try:
+                client.send(payload)
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        """通道统计信息"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['clients'] = len(self._clients)
+        stats['port'] = self.port
+        stats['running'] = self._server is not None
+        return stats
+
+    def handle_frame(self, raw, client: str = '') -> Optional[dict]:
+        """处理一条请求帧，返回应答帧；client 为客户端地址，用于准入控制"""
+        try:
+            frame = json.loads(raw)
+            if not isinstance(frame, dict):
+                raise ValueError('帧必须是 JSON 对象')
+        except (ValueError, TypeError) as e:
+            return {'ok': False, 'code': 400, 'msg': f'帧格式错误: {e}'}
+
+        request_id = frame.get('id')
+        category = frame.get('c') or frame.get('category')
+        action = frame.get('a') or frame.get('action') or ''
+        params = frame.get('p') or frame.get('params') or {}
+
+        if category == 'ping':
+            return {'id': request_id, 'ok': True, 'pong': time.time()}
+        if not category or not isinstance(params, dict):
+            return {'id': request_id, 'ok': False, 'code': 400, 'msg': '缺少 category 或 params 不是对象'}
+
+        try:
+            result, status = self.executor(category, action, params, client=client)
+        except Exception as e:
+            self._logger.error(f"WebSocket 命令执行失败 {category}/{action}: {e}")
+            with self._lock:
+                self._stats['errors'] += 1
+            return {'id': request_id, 'ok': False, 'code': 500, 'msg': f'服务器错误: {str(e)}'}
+
+        ack = {
+            'id': request_id,
+            'ok': bool(result.get('success', False)),
+            'code': status,
+            'msg': result.get('message', ''),
+        }
+        if result.get('command_id') is not None:
+            ack['cmd'] = result['command_id']
+        if result.get('hold_id') is not None:
+            ack['hold'] = result['hold_id']
+        if frame.get('full'):
+            ack['result'] = result
+        return ack
+
+    def _handle(self, websocket):
+        """单个连接的处理循环"""
+        with self._lock:
+            self._clients.add(websocket)
+            self._stats['connections'] += 1
+        address = websocket.remote_address
+        client = str(address[0]) if address else ''
+        try:
+            for raw in websocket:
+                with self._lock:
+                    self._stats['frames'] += 1
+                ack = self.handle_frame(raw, client)
+                if ack is not None:
+                    websocket.send(json.dumps(ack, ensure_ascii=False, separators=(',', ':')))
+        except Exception as e:
+            self._logger.info(f"WebSocket 连接断开: {e}")
+        finally:
+            with self._lock:
+                self._clients.discard(websocket)